@@ -202,7 +202,16 @@ function NewInspectionContent() {
             })
 
             if (!response.ok) throw new Error('Erro na análise')
-            const result = await response.json()
+            const job = await response.json()
+
+            // A analise roda em background: consulta o status ate concluir (max ~90s)
+            let result = job
+            for (let attempt = 0; attempt < 45 && result.status === 'pendente'; attempt++) {
+                await new Promise(resolve => setTimeout(resolve, 2000))
+                const statusResponse = await fetch(`${baseUrl}/api/v1/inspections/analyze-damage/${job.job_id}`)
+                if (statusResponse.ok) result = await statusResponse.json()
+            }
+            if (result.status !== 'concluida' || !result.analysis) throw new Error('Análise não concluída')
 
             // Atualizar dados do pneu ativo com a analise da IA
             setInspectedTires(prev => ({
@@ -3,14 +3,11 @@ from typing import List, Optional
 from pydantic import BaseModel
 from app.core.config import settings
 from app.core.secrets import secrets_manager
-from supabase import Client, create_client
+from supabase import Client
+from app.core.database import get_supabase, execute
 
 router = APIRouter()
 
-# Supabase client lazy initialization
-def get_supabase() -> Client:
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-
 # Schemas
 class CompanyCreate(BaseModel):
     razao_social: str
@@ -161,7 +158,7 @@ async def create_company(company: CompanyCreate, background_tasks: BackgroundTas
     Cria uma nova empresa (tenant) e agenda o onboarding (link + email).
     """
     # 1. Verificar se CNPJ ja existe
-    existing = supabase.table("tenants").select("id").eq("cnpj", company.cnpj).execute()
+    existing = await execute(supabase.table("tenants").select("id").eq("cnpj", company.cnpj))
     if existing.data:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -181,7 +178,7 @@ async def create_company(company: CompanyCreate, background_tasks: BackgroundTas
         "max_vehicles": 100
     }
     
-    result = supabase.table("tenants").insert(new_tenant).execute()
+    result = await execute(supabase.table("tenants").insert(new_tenant))
     if not result.data:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -202,7 +199,7 @@ async def create_company(company: CompanyCreate, background_tasks: BackgroundTas
 @router.get("/companies", response_model=List[CompanyResponse])
 async def list_companies(supabase: Client = Depends(get_supabase)):
     """Lista todas as empresas."""
-    result = supabase.table("tenants").select("*").execute()
+    result = await execute(supabase.table("tenants").select("*"))
     
     # Map fields for frontend
     for item in result.data:
@@ -213,7 +210,7 @@ async def list_companies(supabase: Client = Depends(get_supabase)):
 @router.get("/companies/{company_id}", response_model=CompanyResponse)
 async def get_company(company_id: str, supabase: Client = Depends(get_supabase)):
     """Busca detalhes de uma empresa especifica."""
-    result = supabase.table("tenants").select("*").eq("id", company_id).execute()
+    result = await execute(supabase.table("tenants").select("*").eq("id", company_id))
     if not result.data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa nao encontrada")
     
@@ -234,7 +231,7 @@ async def update_company(company_id: str, company: CompanyCreate, supabase: Clie
         "endereco": company.endereco
     }
     
-    result = supabase.table("tenants").update(update_data).eq("id", company_id).execute()
+    result = await execute(supabase.table("tenants").update(update_data).eq("id", company_id))
     if not result.data:
         raise HTTPException(status_code=404, detail="Empresa não encontrada")
     
@@ -260,12 +257,12 @@ async def delete_company(company_id: str, supabase: Client = Depends(get_supabas
         }
         
         # 1. Buscar os IDs dos usuarios vinculados ANTES de qualquer delete
-        users_res = supabase.table("users").select("id").eq("tenant_id", company_id).execute()
+        users_res = await execute(supabase.table("users").select("id").eq("tenant_id", company_id))
         user_ids = [u["id"] for u in users_res.data]
         print(f"DEBUG: Encontrados {len(user_ids)} usuarios para limpar do Auth: {user_ids}")
         
         # 2. Verificar se o tenant existe antes de prosseguir
-        tenant_check = supabase.table("tenants").select("id").eq("id", company_id).execute()
+        tenant_check = await execute(supabase.table("tenants").select("id").eq("id", company_id))
         if not tenant_check.data:
             print(f"DEBUG ERROR: Empresa {company_id} nao encontrada.")
             raise HTTPException(status_code=404, detail="Empresa não encontrada")
@@ -293,7 +290,7 @@ async def delete_company(company_id: str, supabase: Client = Depends(get_supabas
         
         # 4. DEPOIS: Excluir o Tenant (o cascade limpara as tabelas public.*)
         print(f"DEBUG: Deletando tenant {company_id}...")
-        result = supabase.table("tenants").delete().eq("id", company_id).execute()
+        result = await execute(supabase.table("tenants").delete().eq("id", company_id))
         
         if not result.data:
             print(f"DEBUG ERROR: Falha ao deletar tenant {company_id}.")
@@ -316,14 +313,14 @@ async def delete_company(company_id: str, supabase: Client = Depends(get_supabas
 async def resend_company_onboarding(company_id: str, background_tasks: BackgroundTasks, supabase: Client = Depends(get_supabase)):
     """Reenvia o e-mail de onboarding para o admin da empresa."""
     # 1. Buscar a empresa
-    res_tenant = supabase.table("tenants").select("*").eq("id", company_id).single().execute()
+    res_tenant = await execute(supabase.table("tenants").select("*").eq("id", company_id).single())
     if not res_tenant.data:
         raise HTTPException(status_code=404, detail="Empresa não encontrada")
     
     tenant = res_tenant.data
     
     # 2. Buscar o usuário admin vinculado a esse tenant
-    res_user = supabase.table("users").select("*").eq("tenant_id", company_id).eq("role", "admin").execute()
+    res_user = await execute(supabase.table("users").select("*").eq("tenant_id", company_id).eq("role", "admin"))
     if not res_user.data:
         raise HTTPException(status_code=400, detail="Usuário admin não encontrado para esta empresa.")
 
@@ -1,64 +1,106 @@
-from fastapi import APIRouter, Depends, HTTPException
-from supabase import Client, create_client
+from fastapi import APIRouter, Depends, HTTPException, Query
+from postgrest.exceptions import APIError
+from supabase import Client
+from app.core.database import get_supabase, execute
 from app.core.config import get_settings
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
+import asyncio
+import logging
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 settings = get_settings()
 
-def get_supabase() -> Client:
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+# Desativado quando a funcao dashboard_stats ainda nao foi migrada no banco
+_stats_rpc_available = True
 
-@router.get("/dashboard/stats")
-async def get_dashboard_stats(tenant_id: str, supabase: Client = Depends(get_supabase)):
-    """Retorna estatisticas resumidas para o dashboard principal."""
-    try:
+
+async def _count(query) -> int:
+    result = await execute(query)
+    return result.count if result.count is not None else 0
+
+
+async def _stats_via_rpc(supabase: Client, tenant_id: str) -> Dict[str, int]:
+    """Todos os contadores em um unico round trip (funcao dashboard_stats)."""
+    result = await execute(supabase.rpc("dashboard_stats", {"p_tenant_id": tenant_id}))
+    return {key: int(value or 0) for key, value in (result.data or {}).items()}
+
+
+async def _stats_via_counts(supabase: Client, tenant_id: str) -> Dict[str, int]:
+    """Fallback: contadores individuais disparados em paralelo."""
+    seven_days_ago = (datetime.now() - timedelta(days=7)).isoformat()
+    thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
+
+    tires_in_use, total_tires, urgent, pressure_alerts, recent_inspections = await asyncio.gather(
         # 1. Pneus em uso
-        in_use = supabase.table("tire_inventory")\
-            .select("id", count="exact")\
-            .eq("tenant_id", tenant_id)\
-            .eq("status", "em_uso")\
-            .execute()
-        tires_in_use = in_use.count if in_use.count is not None else 0
-        
+        _count(
+            supabase.table("tire_inventory")
+            .select("id", count="exact")
+            .eq("tenant_id", tenant_id)
+            .eq("status", "em_uso")
+        ),
         # 2. Total de pneus (para calcular saúde)
-        total_tires = supabase.table("tire_inventory")\
-            .select("id", count="exact")\
-            .eq("tenant_id", tenant_id)\
-            .neq("status", "descarte")\
-            .execute()
-        total = total_tires.count if total_tires.count is not None else 0
-        
+        _count(
+            supabase.table("tire_inventory")
+            .select("id", count="exact")
+            .eq("tenant_id", tenant_id)
+            .neq("status", "descarte")
+        ),
         # 3. Trocas urgentes (sulco < 3mm)
-        urgent = supabase.table("tire_inventory")\
-            .select("id", count="exact")\
-            .eq("tenant_id", tenant_id)\
-            .eq("status", "em_uso")\
-            .lt("sulco_atual", 3.0)\
-            .execute()
-        urgent_count = urgent.count if urgent.count is not None else 0
-        
+        _count(
+            supabase.table("tire_inventory")
+            .select("id", count="exact")
+            .eq("tenant_id", tenant_id)
+            .eq("status", "em_uso")
+            .lt("sulco_atual", 3.0)
+        ),
         # 4. Alertas de pressão (inspeções com alerta_pressao = true nos últimos 7 dias)
-        seven_days_ago = (datetime.now() - timedelta(days=7)).isoformat()
-        pressure_alerts = supabase.table("inspection_details")\
-            .select("id", count="exact")\
-            .eq("tenant_id", tenant_id)\
-            .eq("alerta_pressao", True)\
-            .gte("created_at", seven_days_ago)\
-            .execute()
-        pressure_alert_count = pressure_alerts.count if pressure_alerts.count is not None else 0
-        
+        _count(
+            supabase.table("inspection_details")
+            .select("id", count="exact")
+            .eq("tenant_id", tenant_id)
+            .eq("alerta_pressao", True)
+            .gte("created_at", seven_days_ago)
+        ),
         # 5. Inspeções nos últimos 30 dias
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
-        recent_inspections = supabase.table("inspections")\
-            .select("id", count="exact")\
-            .eq("tenant_id", tenant_id)\
-            .gte("created_at", thirty_days_ago)\
-            .execute()
-        inspections_count = recent_inspections.count if recent_inspections.count is not None else 0
-        
-        # 6. Calcular saúde da frota (% de pneus OK)
+        _count(
+            supabase.table("inspections")
+            .select("id", count="exact")
+            .eq("tenant_id", tenant_id)
+            .gte("created_at", thirty_days_ago)
+        ),
+    )
+    return {
+        "tires_in_use": tires_in_use,
+        "total_tires": total_tires,
+        "urgent_replacements": urgent,
+        "pressure_alerts": pressure_alerts,
+        "recent_inspections": recent_inspections,
+    }
+
+
+@router.get("/dashboard/stats")
+async def get_dashboard_stats(tenant_id: str, supabase: Client = Depends(get_supabase)):
+    """Retorna estatisticas resumidas para o dashboard principal."""
+    global _stats_rpc_available
+    try:
+        stats = None
+        if _stats_rpc_available:
+            try:
+                stats = await _stats_via_rpc(supabase, tenant_id)
+            except APIError as e:
+                # PGRST202 = funcao inexistente no schema cache; nao tenta de novo
+                if e.code == "PGRST202":
+                    _stats_rpc_available = False
+                logger.warning(f"RPC dashboard_stats indisponivel, usando contagens: {e}")
+        if stats is None:
+            stats = await _stats_via_counts(supabase, tenant_id)
+
+        total = stats["total_tires"]
+        urgent_count = stats["urgent_replacements"]
+
+        # Calcular saúde da frota (% de pneus OK)
         # Pneus OK = não tem alerta de sulco (sulco >= 3mm)
         if total > 0:
             healthy_percent = round(((total - urgent_count) / total) * 100)
@@ -66,11 +108,11 @@ async def get_dashboard_stats(tenant_id: str, supabase: Client = Depends(get_sup
             healthy_percent = 100
         
         return {
-            "tires_in_use": tires_in_use,
+            "tires_in_use": stats["tires_in_use"],
             "total_tires": total,
-            "heat_alerts": pressure_alert_count,  # Renomeado semanticamente
+            "heat_alerts": stats["pressure_alerts"],  # Renomeado semanticamente
             "urgent_replacements": urgent_count,
-            "recent_inspections": inspections_count,
+            "recent_inspections": stats["recent_inspections"],
             "total_fleet_health": healthy_percent
         }
     except Exception as e:
@@ -86,46 +128,39 @@ async def get_dashboard_stats(tenant_id: str, supabase: Client = Depends(get_sup
 
 
 @router.get("/dashboard/brand-ranking")
-async def get_brand_ranking(tenant_id: str, supabase: Client = Depends(get_supabase)):
-    """Retorna ranking de marcas baseado em desempenho médio (sulco atual / sulco inicial)."""
+async def get_brand_ranking(
+    tenant_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    by_model: bool = Query(False, description="Quebrar o ranking por modelo"),
+    by_size: bool = Query(False, description="Quebrar o ranking por medida"),
+    supabase: Client = Depends(get_supabase)
+):
+    """
+    Retorna ranking de marcas baseado em desempenho médio (sulco atual / sulco inicial).
+    A agregação roda no banco (funcao brand_ranking) e devolve apenas o top-N.
+    """
     try:
-        # Buscar todos os pneus em uso com sulco inicial e atual
-        tires = supabase.table("tire_inventory")\
-            .select("marca, sulco_inicial, sulco_atual")\
-            .eq("tenant_id", tenant_id)\
-            .eq("status", "em_uso")\
-            .gt("sulco_inicial", 0)\
-            .execute()
-        
-        # Agrupar por marca e calcular média de desgaste
-        brand_stats: Dict[str, Dict] = {}
-        for tire in tires.data:
-            marca = tire.get("marca", "Desconhecida")
-            sulco_inicial = tire.get("sulco_inicial", 1)
-            sulco_atual = tire.get("sulco_atual", 0)
-            
-            # Percentual de vida restante
-            vida_restante = (sulco_atual / sulco_inicial) * 100 if sulco_inicial > 0 else 0
-            
-            if marca not in brand_stats:
-                brand_stats[marca] = {"count": 0, "total_vida": 0}
-            brand_stats[marca]["count"] += 1
-            brand_stats[marca]["total_vida"] += vida_restante
-        
-        # Calcular média e criar ranking
+        result = await execute(supabase.rpc("brand_ranking", {
+            "p_tenant_id": tenant_id,
+            "p_limit": limit,
+            "p_by_model": by_model,
+            "p_by_size": by_size,
+        }))
+
         ranking = []
-        for marca, stats in brand_stats.items():
-            avg_vida = stats["total_vida"] / stats["count"] if stats["count"] > 0 else 0
-            ranking.append({
-                "marca": marca,
-                "quantidade": stats["count"],
-                "vida_media_percent": round(avg_vida, 1)
-            })
-        
-        # Ordenar por vida média (melhor primeiro)
-        ranking.sort(key=lambda x: x["vida_media_percent"], reverse=True)
-        
-        return {"ranking": ranking[:10]}  # Top 10
+        for row in result.data or []:
+            entry = {
+                "marca": row["marca"],
+                "quantidade": row["quantidade"],
+                "vida_media_percent": float(row["vida_media_percent"] or 0)
+            }
+            if by_model:
+                entry["modelo"] = row.get("modelo")
+            if by_size:
+                entry["medida"] = row.get("medida")
+            ranking.append(entry)
+
+        return {"ranking": ranking}
     except Exception as e:
         print(f"Erro ao calcular ranking: {e}")
         return {"ranking": []}
@@ -1,21 +1,31 @@
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Query
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, Depends, Request, status, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field, ValidationError, field_validator
 from app.core.config import get_settings
-from app.services.storage.r2 import R2Service
-from app.services.ai.vision import VisionAnalysisService
-from supabase import Client, create_client
-from datetime import datetime
+from app.services.storage.images import InvalidImageError
+from app.services.storage.photos import (
+    UPLOAD_CONTENT_TYPES, PhotoUploadError, check_uploaded_photo, photo_key_base,
+    presigned_photo_upload, store_photo,
+)
+from app.services.ai.vision import damage_fields
+from app.services.export.inspections import EXPORT_FORMATS, STREAMERS, iter_export_pages
+from supabase import Client
+from app.core.database import get_supabase, execute, run_sync
+from app.core.uploads import check_upload_size
+from app.services.prediction.memo import invalidate_tire_metrics
+from datetime import datetime, timedelta, timezone
 import uuid
 import logging
 import json
+import zlib
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 settings = get_settings()
 
-def get_supabase() -> Client:
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+# Tolerância para o relógio do aparelho em inspected_at
+SYNC_MAX_CLOCK_SKEW_MINUTES = 10
 
 
 # ============================================================================
@@ -46,6 +56,36 @@ class InspectionCreate(BaseModel):
     items: List[InspectionItemCreate]
 
 
+class InspectionSyncItem(InspectionCreate):
+    """
+    Inspeção feita offline; client_id é a chave de idempotência gerada no aparelho.
+    inspected_at: quando a inspeção foi feita (gravada como created_at); sem ela,
+    vale a hora da sincronização.
+    """
+    client_id: str = Field(min_length=1, max_length=64)
+    inspected_at: Optional[datetime] = None
+
+    @field_validator("inspected_at")
+    @classmethod
+    def check_inspected_at(cls, value: Optional[datetime]) -> Optional[datetime]:
+        if value is None:
+            return None
+        # Sem fuso: hora UTC do aparelho
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        if value > datetime.now(timezone.utc) + timedelta(minutes=SYNC_MAX_CLOCK_SKEW_MINUTES):
+            raise ValueError("inspected_at no futuro")
+        return value
+
+
+class InspectionSyncBatch(BaseModel):
+    """
+    Lote de inspeções enfileiradas no app. Os itens são validados um a um
+    (InspectionSyncItem): um item inválido não barra o resto da fila.
+    """
+    inspections: List[Any]
+
+
 class DamageAnalysisRequest(BaseModel):
     """Request para análise de avaria por IA."""
     tenant_id: str
@@ -73,6 +113,107 @@ def determine_alerts(sulco_medio: float, pressao_atual: float, pressao_recomenda
     return alerta_sulco, alerta_pressao
 
 
+def build_inspection_records(request: InspectionCreate) -> tuple:
+    """
+    Monta a linha de inspections e as de inspection_details (colunas reais do banco)
+    para a RPC create_inspection.
+    sulco_medio é GENERATED em inspection_details: vai no item só para atualizar
+    tire_inventory.sulco_atual. inspected_at (sync offline) vira o created_at.
+    """
+    inspection_id = str(uuid.uuid4())
+    inspection_record = {
+        "id": inspection_id,
+        "tenant_id": request.tenant_id,
+        "vehicle_id": request.vehicle_id,
+        "inspector_id": request.inspector_id,
+        "km_hodometro": request.odometer_km,
+        "tipo": "rotina",
+        "status": "concluida"
+    }
+    inspected_at = getattr(request, "inspected_at", None)
+    if inspected_at is not None:
+        inspection_record["created_at"] = inspected_at.isoformat()
+
+    detail_records = []
+    for item in request.items:
+        sulco_medio = calculate_sulco_medio(
+            item.sulco_interno,
+            item.sulco_central,
+            item.sulco_externo
+        )
+        alerta_sulco, alerta_pressao = determine_alerts(
+            sulco_medio,
+            item.pressao_atual or 0,
+            item.pressao_recomendada or 110
+        )
+        detail_records.append({
+            "id": str(uuid.uuid4()),
+            "tenant_id": request.tenant_id,  # OBRIGATÓRIO
+            "inspection_id": inspection_id,
+            "tire_id": item.tire_id,
+            "posicao_veiculo": item.posicao_veiculo,  # OBRIGATÓRIO
+            "sulco_interno": item.sulco_interno,
+            "sulco_central": item.sulco_central,
+            "sulco_externo": item.sulco_externo,
+            "sulco_medio": sulco_medio,
+            "pressao_atual": item.pressao_atual,
+            "pressao_recomendada": item.pressao_recomendada,
+            "tem_avaria": item.tem_avaria,
+            "descricao_avaria": item.descricao_avaria,
+            "checklist_avarias": item.checklist_avarias or {},
+            "alerta_sulco": alerta_sulco,
+            "alerta_pressao": alerta_pressao,
+            "observacoes": item.observacoes
+        })
+
+    return inspection_record, detail_records
+
+
+async def read_sync_body(request: Request) -> bytes:
+    """
+    Lê o corpo da sincronização, descompactando gzip/deflate (Content-Encoding)
+    com limites de tamanho antes e depois da descompressão.
+    """
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > settings.SYNC_MAX_BODY_BYTES:
+            raise HTTPException(status_code=413, detail="Lote de sincronização muito grande")
+
+    encoding = request.headers.get("content-encoding", "identity").lower()
+    if encoding in ("", "identity"):
+        return bytes(body)
+    if encoding not in ("gzip", "deflate"):
+        raise HTTPException(status_code=415, detail=f"Content-Encoding não suportado: {encoding}")
+
+    # wbits 32+ aceita gzip e zlib; max_length limita a memória (zip bomb)
+    decompressor = zlib.decompressobj(wbits=47)
+    try:
+        inflated = decompressor.decompress(bytes(body), settings.SYNC_MAX_INFLATED_BYTES)
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Corpo compactado inválido")
+    if decompressor.unconsumed_tail:
+        raise HTTPException(status_code=413, detail="Lote de sincronização muito grande")
+    if not decompressor.eof:
+        raise HTTPException(status_code=400, detail="Corpo compactado incompleto")
+    return inflated
+
+
+def sync_item_error(raw: Any, error: ValidationError) -> Dict[str, Any]:
+    """Resultado 'error' de um item do lote que não passou na validação."""
+    client_id = raw.get("client_id") if isinstance(raw, dict) else None
+    message = "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}"
+        for err in error.errors(include_url=False)
+    )
+    return {
+        "client_id": client_id if isinstance(client_id, str) else None,
+        "inspection_id": None,
+        "status": "error",
+        "error": message,
+    }
+
+
 # ============================================================================
 # ENDPOINTS
 # ============================================================================
@@ -87,69 +228,18 @@ async def create_inspection(
     Atualiza o hodômetro do veículo e o sulco/status de cada pneu.
     """
     try:
-        # 1. Registrar a inspeção mestre
-        inspection_id = str(uuid.uuid4())
-        inspection_record = {
-            "id": inspection_id,
-            "tenant_id": request.tenant_id,
-            "vehicle_id": request.vehicle_id,
-            "inspector_id": request.inspector_id,
-            "km_hodometro": request.odometer_km,
-            "tipo": "rotina",
-            "status": "concluida"
-        }
-        
-        supabase.table("inspections").insert(inspection_record).execute()
-        logger.info(f"Inspeção {inspection_id} criada para veículo {request.vehicle_id}")
-
-        # 2. Atualizar KM do veículo (usando coluna correta)
-        supabase.table("vehicles").update({
-            "km_atual": request.odometer_km
-        }).eq("id", request.vehicle_id).execute()
-
-        # 3. Registrar medições de cada pneu
-        for item in request.items:
-            # Calcular sulco médio
-            sulco_medio = calculate_sulco_medio(
-                item.sulco_interno, 
-                item.sulco_central, 
-                item.sulco_externo
-            )
-            
-            # Determinar alertas
-            alerta_sulco, alerta_pressao = determine_alerts(
-                sulco_medio, 
-                item.pressao_atual or 0, 
-                item.pressao_recomendada or 110
-            )
-            
-            # Registrar item da inspeção (colunas reais do banco)
-            detail_record = {
-                "id": str(uuid.uuid4()),
-                "tenant_id": request.tenant_id,  # OBRIGATÓRIO
-                "inspection_id": inspection_id,
-                "tire_id": item.tire_id,
-                "posicao_veiculo": item.posicao_veiculo,  # OBRIGATÓRIO
-                "sulco_interno": item.sulco_interno,
-                "sulco_central": item.sulco_central,
-                "sulco_externo": item.sulco_externo,
-                # sulco_medio é GENERATED - não incluir
-                "pressao_atual": item.pressao_atual,
-                "pressao_recomendada": item.pressao_recomendada,
-                "tem_avaria": item.tem_avaria,
-                "descricao_avaria": item.descricao_avaria,
-                "checklist_avarias": item.checklist_avarias or {},
-                "alerta_sulco": alerta_sulco,
-                "alerta_pressao": alerta_pressao,
-                "observacoes": item.observacoes
-            }
-            
-            supabase.table("inspection_details").insert(detail_record).execute()
-            
-            # Atualizar inventário de pneus (coluna correta: sulco_atual)
-            supabase.table("tire_inventory").update({
-                "sulco_atual": sulco_medio
-            }).eq("id", item.tire_id).execute()
+        inspection_record, detail_records = build_inspection_records(request)
+        inspection_id = inspection_record["id"]
+
+        # Cabeçalho, hodômetro, medições e sulco dos pneus em uma única transação
+        await execute(supabase.rpc("create_inspection", {
+            "p_inspection": inspection_record,
+            "p_items": detail_records,
+        }))
+        logger.info(f"Inspeção {inspection_id} criada para veículo {request.vehicle_id} ({len(detail_records)} pneus)")
+
+        # Novas medições: descarta as métricas memoizadas dos pneus inspecionados
+        await run_sync(invalidate_tire_metrics, [item.tire_id for item in request.items])
 
         return {
             "success": True, 
@@ -162,110 +252,345 @@ async def create_inspection(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/inspections/analyze-damage")
+@router.post("/inspections/sync")
+async def sync_inspections(
+    request: Request,
+    supabase: Client = Depends(get_supabase)
+):
+    """
+    Sincroniza em lote as inspeções feitas offline no app.
+
+    Corpo: {"inspections": [{client_id, inspected_at, ...InspectionCreate}]}, opcionalmente com
+    Content-Encoding: gzip. Tudo é gravado em uma chamada ao banco; reenvios do
+    mesmo client_id não duplicam dados. Retorna o resultado de cada item, na ordem
+    do lote (created, duplicate ou error) para o app limpar a fila; itens inválidos
+    (ex.: relógio do aparelho adiantado) voltam como error sem barrar os demais.
+    """
+    try:
+        batch = InspectionSyncBatch.model_validate_json(await read_sync_body(request))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+    if len(batch.inspections) > settings.SYNC_MAX_INSPECTIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo de {settings.SYNC_MAX_INSPECTIONS} inspeções por lote"
+        )
+    if not batch.inspections:
+        return {"results": []}
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(batch.inspections)
+    positions: List[int] = []
+    payload = []
+    tire_ids: Dict[str, List[str]] = {}
+    for index, raw in enumerate(batch.inspections):
+        try:
+            item = InspectionSyncItem.model_validate(raw)
+        except ValidationError as e:
+            results[index] = sync_item_error(raw, e)
+            continue
+        positions.append(index)
+        inspection_record, detail_records = build_inspection_records(item)
+        payload.append({"client_id": item.client_id, "inspection": inspection_record, "items": detail_records})
+        tire_ids[item.client_id] = [detail["tire_id"] for detail in detail_records]
+
+    if payload:
+        try:
+            result = await execute(supabase.rpc("sync_inspections", {"p_batch": payload}))
+        except Exception as e:
+            logger.exception("Erro ao sincronizar inspeções")
+            raise HTTPException(status_code=500, detail=str(e))
+        # sync_inspections devolve uma linha por item, na ordem de p_batch
+        for index, row in zip(positions, result.data or []):
+            results[index] = row
+
+    created = [row for row in results if row["status"] == "created"]
+    await run_sync(invalidate_tire_metrics, [
+        tire_id for row in created for tire_id in tire_ids.get(row["client_id"], [])
+    ])
+
+    logger.info(
+        f"Sincronização: {len(created)} criadas, "
+        f"{sum(row['status'] == 'duplicate' for row in results)} duplicadas, "
+        f"{sum(row['status'] == 'error' for row in results)} com erro"
+    )
+    return {"results": results}
+
+
+async def _save_damage_detail(
+    supabase: Client,
+    tenant_id: str,
+    tire_id: str,
+    inspection_id: Optional[str],
+    fields: Callable[[bool], Dict[str, Any]],
+) -> Tuple[str, str, bool]:
+    """
+    Grava a foto de avaria em inspection_details: no item da inspeção informada ou,
+    sem ele, em uma inspeção pontual criada para a avaria.
+    fields(new_detail) devolve as colunas da foto/análise.
+
+    Returns:
+        (inspection_id, detail_id, new_detail)
+    """
+    # Se tem inspection_id, vincula ao item existente
+    if inspection_id:
+        existing = await execute(
+            supabase.table("inspection_details")
+            .select("id")
+            .eq("inspection_id", inspection_id)
+            .eq("tire_id", tire_id)
+            .maybe_single()
+        )
+        
+        if existing and existing.data:
+            detail_id = existing.data["id"]
+            await execute(supabase.table("inspection_details").update(fields(False)).eq("id", detail_id))
+            return inspection_id, detail_id, False
+
+    # Se não tem inspection_id, cria uma inspeção pontual de avaria
+    inspection_id = str(uuid.uuid4())
+
+    # Buscar vehicle_id do pneu
+    tire_info = await execute(
+        supabase.table("tire_inventory")
+        .select("vehicle_id")
+        .eq("id", tire_id)
+        .maybe_single()
+    )
+
+    vehicle_id = tire_info.data.get("vehicle_id") if tire_info and tire_info.data else None
+
+    # Criar inspeção mestre pontual
+    await execute(supabase.table("inspections").insert({
+        "id": inspection_id,
+        "tenant_id": tenant_id,
+        "vehicle_id": vehicle_id,
+        "status": "avaria_detectada"
+    }))
+
+    detail_id = str(uuid.uuid4())
+    await execute(supabase.table("inspection_details").insert({
+        "id": detail_id,
+        "tenant_id": tenant_id,
+        "inspection_id": inspection_id,
+        "tire_id": tire_id,
+        "posicao_veiculo": "N/A",  # Será preenchido depois se necessário
+        "tem_avaria": True,
+        "descricao_avaria": "Avaria em análise por IA",
+        **fields(True),
+    }))
+    return inspection_id, detail_id, True
+
+
+@router.post("/inspections/photo-uploads", status_code=status.HTTP_201_CREATED)
+async def create_photo_upload(
+    tenant_id: str = Query(..., description="ID do tenant"),
+    tire_id: str = Query(..., description="ID do pneu"),
+    content_type: str = Query("image/jpeg", description="Content-Type da foto"),
+):
+    """
+    URL assinada (PUT, curta duração) para o app enviar a foto direto ao R2,
+    sem passar pela API. Depois do envio, chame POST /inspections/analyze-damage
+    com o object_key retornado (sem arquivo).
+    """
+    if content_type not in UPLOAD_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail=f"Content-Type não suportado: {content_type}")
+    try:
+        return await presigned_photo_upload(tenant_id, tire_id, content_type)
+    except ValueError as e:
+        logger.exception("Erro ao gerar URL de upload")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/inspections/analyze-damage", status_code=status.HTTP_202_ACCEPTED)
 async def analyze_damage(
     tenant_id: str = Query(..., description="ID do tenant"),
     tire_id: str = Query(..., description="ID do pneu"),
     inspection_id: Optional[str] = Query(None, description="ID da inspeção para vincular"),
-    file: UploadFile = File(...),
+    object_key: Optional[str] = Query(None, description="Foto já enviada ao R2 (POST /inspections/photo-uploads)"),
+    file: Optional[UploadFile] = File(None),
 ):
     """
-    Fluxo de Análise de Avaria: Upload R2 -> IA Vision -> Registro em inspection_details.
-    
+    Fluxo de Análise de Avaria: cache por conteúdo (sha256 dos bytes; opcionalmente
+    dHash da foto pré-processada, só entre fotos do mesmo pneu) -> pré-processamento
+    (orientação, sem EXIF, resolução limitada + miniatura) -> Upload R2 -> registro em inspection_details
+    (ai_status pendente) -> análise IA em background (Celery).
+
+    A foto vem no multipart (`file`) ou, enviada antes direto ao R2 com URL
+    assinada, pelo `object_key`: nesse caso a API só valida a chave e registra o
+    item; download, pré-processamento e análise ficam no worker.
+
+    Retorna assim que a foto é registrada, com o job_id (id do inspection_detail).
+    O resultado chega em inspection_details.ai_analysis: consulte
+    GET /inspections/analyze-damage/{job_id} ou assine o Supabase Realtime da linha.
+    Foto já analisada (reenvio da mesma foto): reutiliza foto e análise, sem
+    upload nem chamada ao modelo, e retorna já com status concluida.
+
     Nota: Em vez de usar tabela tire_damages (que não existe), 
     armazena em inspection_details.ai_analysis (JSONB).
     """
+    if (file is None) == (object_key is None):
+        raise HTTPException(status_code=400, detail="Envie o arquivo ou o object_key (apenas um)")
+
     try:
-        # 1. Upload para R2
-        storage = R2Service()
-        file_content = await file.read()
-        filename = f"inspections/{tenant_id}/{tire_id}/{uuid.uuid4()}.jpg"
-        photo_url = await storage.upload_file(file_content, filename, file.content_type)
-        logger.info(f"Foto uploaded: {photo_url}")
-
-        # 2. Análise via IA
-        ai_service = VisionAnalysisService()
-        analysis = await ai_service.analyze_tire_photo(photo_url)
-        logger.info(f"Análise IA concluída: severity={analysis.get('severity')}")
-
-        # 3. Salvar no banco de dados
         supabase = get_supabase()
-        
-        # Se tem inspection_id, atualiza o item existente
-        if inspection_id:
-            # Buscar o inspection_detail correspondente
-            existing = supabase.table("inspection_details")\
-                .select("id")\
-                .eq("inspection_id", inspection_id)\
-                .eq("tire_id", tire_id)\
-                .maybe_single()\
-                .execute()
-            
-            if existing.data:
-                # Atualizar com análise de IA
-                supabase.table("inspection_details").update({
-                    "photo_lateral_url": photo_url,
-                    "ai_analysis": analysis,
-                    "ai_severity": analysis.get("severity", "baixa"),
-                    "tem_avaria": analysis.get("has_damage", False),
-                    "descricao_avaria": analysis.get("description")
-                }).eq("id", existing.data["id"]).execute()
-                
-                return {
-                    "success": True,
-                    "photo_url": photo_url,
-                    "analysis": analysis,
-                    "updated_detail_id": existing.data["id"]
-                }
-        
-        # Se não tem inspection_id, cria uma inspeção pontual de avaria
-        inspection_id = str(uuid.uuid4())
-        
-        # Buscar vehicle_id do pneu
-        tire_info = supabase.table("tire_inventory")\
-            .select("vehicle_id")\
-            .eq("id", tire_id)\
-            .maybe_single()\
-            .execute()
-        
-        vehicle_id = tire_info.data.get("vehicle_id") if tire_info.data else None
-        
-        # Criar inspeção mestre pontual
-        supabase.table("inspections").insert({
-            "id": inspection_id,
-            "tenant_id": tenant_id,
-            "vehicle_id": vehicle_id,
-            "status": "avaria_detectada"
-        }).execute()
-        
-        # Criar detalhe com análise de IA
-        detail_id = str(uuid.uuid4())
-        supabase.table("inspection_details").insert({
-            "id": detail_id,
-            "tenant_id": tenant_id,
-            "inspection_id": inspection_id,
-            "tire_id": tire_id,
-            "posicao_veiculo": "N/A",  # Será preenchido depois se necessário
-            "photo_lateral_url": photo_url,
-            "ai_analysis": analysis,
-            "ai_severity": analysis.get("severity", "baixa"),
-            "tem_avaria": True,
-            "descricao_avaria": analysis.get("description", "Avaria detectada por IA")
-        }).execute()
-        
+
+        # Upload direto: valida a chave e delega todo o processamento ao worker
+        if object_key is not None:
+            try:
+                await check_uploaded_photo(tenant_id, tire_id, object_key)
+            except PhotoUploadError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+            inspection_id, detail_id, new_detail = await _save_damage_detail(
+                supabase, tenant_id, tire_id, inspection_id, lambda new: {"ai_status": "pendente"}
+            )
+            from app.tasks.celery_app import process_damage_upload
+            # Publicar no broker e I/O bloqueante: fora do event loop
+            await run_sync(lambda: process_damage_upload.apply_async(
+                args=[detail_id, tenant_id, tire_id, object_key, new_detail], task_id=detail_id
+            ))
+            return {
+                "success": True,
+                "job_id": detail_id,
+                "status": "pendente",
+                "cached": False,
+                "photo_url": None,
+                "thumbnail_url": None,
+                "inspection_id": inspection_id,
+                "detail_id": detail_id
+            }
+
+        # 1. Cache por conteúdo; sem acerto, pré-processamento e upload para R2
+        # Lido do spool do upload em streaming (sem copiar o arquivo para a memória)
+        check_upload_size(file, settings.PHOTO_MAX_BYTES)
+        try:
+            photo = await store_photo(tenant_id, tire_id, photo_key_base(tenant_id, tire_id), file.file)
+        except InvalidImageError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        cached = photo["cached"]
+        photo_url, thumbnail_url = photo["photo_url"], photo["thumbnail_url"]
+        if cached is not None:
+            logger.info(f"Análise de avaria reaproveitada do cache: {photo_url}")
+        else:
+            logger.info(
+                f"Foto uploaded: {photo_url} ({photo['original_bytes']} -> {photo['processed_bytes']} bytes, "
+                f"{photo['width']}x{photo['height']})"
+            )
+
+        # 2. Registrar a foto no banco (análise pendente ou, do cache, concluída)
+        analyzed_at = datetime.now(timezone.utc).isoformat()
+
+        def photo_fields(new_detail: bool) -> Dict[str, Any]:
+            fields = {"photo_lateral_url": photo_url, "photo_thumbnail_url": thumbnail_url}
+            if cached is not None:
+                fields.update(damage_fields(cached["analysis"], new_detail))
+                fields["ai_analyzed_at"] = analyzed_at
+            else:
+                fields["ai_status"] = "pendente"
+            return fields
+
+        inspection_id, detail_id, new_detail = await _save_damage_detail(
+            supabase, tenant_id, tire_id, inspection_id, photo_fields
+        )
+
+        if cached is not None:
+            return {
+                "success": True,
+                "job_id": detail_id,
+                "status": photo_fields(new_detail)["ai_status"],
+                "cached": True,
+                "photo_url": photo_url,
+                "thumbnail_url": thumbnail_url,
+                "inspection_id": inspection_id,
+                "detail_id": detail_id,
+                "analysis": cached["analysis"],
+            }
+
+        # 3. Análise via IA em background (job_id = id do inspection_detail)
+        from app.tasks.celery_app import analyze_damage_photo
+        await run_sync(lambda: analyze_damage_photo.apply_async(
+            args=[detail_id, photo_url, new_detail, photo["cache_key"]], task_id=detail_id
+        ))
+
         return {
             "success": True,
+            "job_id": detail_id,
+            "status": "pendente",
+            "cached": False,
             "photo_url": photo_url,
-            "analysis": analysis,
+            "thumbnail_url": thumbnail_url,
             "inspection_id": inspection_id,
             "detail_id": detail_id
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Erro na análise de avaria")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/inspections/analyze-damage/{job_id}")
+async def get_damage_analysis(job_id: str, supabase: Client = Depends(get_supabase)):
+    """
+    Status da análise de avaria (polling). ai_status: pendente, concluida ou erro;
+    analysis vem preenchido quando concluída.
+    """
+    result = await execute(
+        supabase.table("inspection_details")
+        .select("id, inspection_id, tire_id, photo_lateral_url, photo_thumbnail_url, ai_status, ai_analysis, ai_severity, ai_analyzed_at")
+        .eq("id", job_id)
+        .maybe_single()
+    )
+
+    if not result or not result.data:
+        raise HTTPException(status_code=404, detail="Análise não encontrada")
+
+    detail = result.data
+    return {
+        "job_id": job_id,
+        "status": detail.get("ai_status") or "concluida",
+        "photo_url": detail.get("photo_lateral_url"),
+        "thumbnail_url": detail.get("photo_thumbnail_url"),
+        "analysis": detail.get("ai_analysis"),
+        "severity": detail.get("ai_severity"),
+        "analyzed_at": detail.get("ai_analyzed_at"),
+        "inspection_id": detail.get("inspection_id"),
+        "detail_id": detail["id"]
+    }
+
+
+@router.get("/inspections/export")
+async def export_inspections(
+    tenant_id: str = Query(..., description="ID do tenant"),
+    start: Optional[datetime] = Query(None, description="Início do período (inclusivo)"),
+    end: Optional[datetime] = Query(None, description="Fim do período (exclusivo)"),
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    supabase: Client = Depends(get_supabase)
+):
+    """
+    Exportação completa das inspeções do tenant (auditoria), uma linha por item de
+    inspeção com a inspeção e o veículo. Sem limite de linhas: o resultado é
+    paginado internamente (keyset) e enviado em streaming, página a página.
+    """
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Exportação Parquet indisponível (pyarrow não instalado)")
+
+    media_type, extension = EXPORT_FORMATS[format]
+    pages = iter_export_pages(supabase, tenant_id, start, end)
+    filename = f"inspecoes_{tenant_id}_{datetime.now(timezone.utc):%Y%m%d%H%M%S}.{extension}"
+    return StreamingResponse(
+        STREAMERS[format](pages),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/inspections")
 async def list_inspections(
     tenant_id: str = Query(..., description="ID do tenant"),
@@ -274,12 +599,13 @@ async def list_inspections(
 ):
     """Lista histórico de inspeções de um tenant."""
     try:
-        result = supabase.table("inspections")\
-            .select("*, vehicles(placa)")\
-            .eq("tenant_id", tenant_id)\
-            .order("created_at", desc=True)\
-            .limit(limit)\
-            .execute()
+        result = await execute(
+            supabase.table("inspections")
+            .select("*, vehicles(placa)")
+            .eq("tenant_id", tenant_id)
+            .order("created_at", desc=True)
+            .limit(limit)
+        )
         
         # Retorna lista vazia se não houver dados (evita erros)
         return result.data or []
@@ -296,25 +622,22 @@ async def get_inspection_details(
 ):
     """Retorna detalhes completos de uma inspeção."""
     try:
-        # Buscar inspeção mestre
-        inspection = supabase.table("inspections")\
-            .select("*, vehicles(placa, modelo, marca)")\
-            .eq("id", inspection_id)\
-            .maybe_single()\
-            .execute()
+        # Inspeção mestre, veículo e itens (com o pneu) em uma única consulta
+        inspection = await execute(
+            supabase.table("inspections")
+            .select("*, vehicles(placa, modelo, marca), inspection_details(*, tire_inventory(dot, marca, modelo))")
+            .eq("id", inspection_id)
+            .maybe_single()
+        )
         
-        if not inspection.data:
+        if not inspection or not inspection.data:
             raise HTTPException(status_code=404, detail="Inspeção não encontrada")
         
-        # Buscar itens detalhados
-        details = supabase.table("inspection_details")\
-            .select("*, tire_inventory(dot, marca, modelo)")\
-            .eq("inspection_id", inspection_id)\
-            .execute()
+        details = inspection.data.pop("inspection_details", None)
         
         return {
             "inspection": inspection.data,
-            "details": details.data or []
+            "details": details or []
         }
     
     except HTTPException:
@@ -3,7 +3,9 @@ from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from app.core.config import get_settings
 from app.services.nfe.nfe_service import NFeService
-from supabase import Client, create_client
+from supabase import Client
+from app.core.database import get_supabase, execute
+from app.core.uploads import check_upload_size
 import logging
 import datetime
 
@@ -11,9 +13,6 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/nfe", tags=["NFe Import"])
 settings = get_settings()
 
-def get_supabase() -> Client:
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-
 class InvoiceItemReview(BaseModel):
     description: str
     quantity: float
@@ -44,13 +43,13 @@ async def upload_xml(
     supabase: Client = Depends(get_supabase)
 ):
     """Processa XML e retorna dados para revisao."""
-    content = await file.read()
+    check_upload_size(file, settings.NFE_XML_MAX_BYTES)
     try:
         service = NFeService() # Assumindo que NFeService ja lida com XML
-        data = await service.process_file(content, file.filename)
+        data = await service.process_file(file.file, file.filename)
         
         # Match de Fornecedor
-        supplier_match = supabase.table("suppliers").select("id").eq("tenant_id", tenant_id).eq("cnpj", data["supplier"]["cnpj"]).execute()
+        supplier_match = await execute(supabase.table("suppliers").select("id").eq("tenant_id", tenant_id).eq("cnpj", data["supplier"]["cnpj"]))
         
         data["supplier"]["exists"] = len(supplier_match.data) > 0
         if data["supplier"]["exists"]:
@@ -69,10 +68,10 @@ async def upload_pdf(
 ):
     """Processa PDF via OCR e retorna dados para revisao."""
     # Similar ao XML mas usando OCR service
-    content = await file.read()
+    check_upload_size(file, settings.NFE_PDF_MAX_BYTES)
     try:
         service = NFeService()
-        data = await service.process_file(content, file.filename) # Service ja deve rotear para OCR se PDF
+        data = await service.process_file(file.file, file.filename) # Service ja deve rotear para OCR se PDF
         return data
     except Exception as e:
         logger.exception("Erro no upload PDF")
@@ -88,7 +87,7 @@ async def confirm_import(
     try:
         # 1. Garantir Fornecedor
         supplier_cnpj = data["supplier"]["cnpj"]
-        res_supp = supabase.table("suppliers").select("id").eq("tenant_id", tenant_id).eq("cnpj", supplier_cnpj).execute()
+        res_supp = await execute(supabase.table("suppliers").select("id").eq("tenant_id", tenant_id).eq("cnpj", supplier_cnpj))
         
         if not res_supp.data:
             # Criar fornecedor se nao existir
@@ -100,7 +99,7 @@ async def confirm_import(
                 "contato_telefone": data["supplier"].get("phone"),
                 "status": "ativo"
             }
-            res_supp = supabase.table("suppliers").insert(new_supp).execute()
+            res_supp = await execute(supabase.table("suppliers").insert(new_supp))
         
         supplier_id = res_supp.data[0]["id"]
 
@@ -115,7 +114,7 @@ async def confirm_import(
             "quantidade_itens": len(data["items"]),
             "tipo": "xml" if data.get("source") == "xml" else "pdf"
         }
-        res_import = supabase.table("nfe_imports").insert(import_record).execute()
+        res_import = await execute(supabase.table("nfe_imports").insert(import_record))
         import_id = res_import.data[0]["id"] if res_import.data else None
 
         # 3. Criar Pneus no Inventario
@@ -141,7 +140,7 @@ async def confirm_import(
                 })
 
         if tires_to_create:
-            supabase.table("tire_inventory").insert(tires_to_create).execute()
+            await execute(supabase.table("tire_inventory").insert(tires_to_create))
 
         return {"success": True, "message": f"{len(tires_to_create)} pneus importados com sucesso."}
 
@@ -153,7 +152,7 @@ async def confirm_import(
 async def get_history(tenant_id: str, supabase: Client = Depends(get_supabase)):
     """Retorna historico de importacoes com join de fornecedor."""
     # Usando nfe_imports
-    result = supabase.table("nfe_imports").select("*, suppliers(razao_social)").eq("tenant_id", tenant_id).order("created_at", desc=True).execute()
+    result = await execute(supabase.table("nfe_imports").select("*, suppliers(razao_social)").eq("tenant_id", tenant_id).order("created_at", desc=True))
     
     # Flattening para o frontend
     for item in result.data:
@@ -1,52 +1,50 @@
-from fastapi import APIRouter, Depends
-from supabase import Client, create_client
+from fastapi import APIRouter, Depends, HTTPException, Query
+from supabase import Client
+from app.core.database import get_supabase, execute, run_sync
 from app.core.config import get_settings
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
+from app.services.prediction.engine import PredictionService
+from app.services.prediction.brand_benchmarks import market_benchmarks, tenant_benchmarks
+from app.services.prediction.memo import live_tire_metrics
+from typing import List, Dict, Any, Optional
+from datetime import date, datetime, timedelta
+from uuid import UUID
 
 router = APIRouter()
 settings = get_settings()
 
-def get_supabase() -> Client:
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-
 
 @router.get("/predictions/wear-history")
-async def get_wear_history(tenant_id: str, supabase: Client = Depends(get_supabase)):
+async def get_wear_history(
+    tenant_id: str,
+    marca: Optional[str] = None,
+    posicao: Optional[str] = None,
+    supabase: Client = Depends(get_supabase)
+):
     """
     Retorna histórico de desgaste agregado dos últimos 6 meses.
     Usado para gráficos de tendência no dashboard.
+    Lê os rollups mensais (wear_monthly_rollups), opcionalmente por marca/posição.
     """
     try:
-        # Buscar inspeções dos últimos 6 meses
-        six_months_ago = (datetime.now() - timedelta(days=180)).isoformat()
-        
-        inspections = supabase.table("inspection_details")\
-            .select("created_at, sulco_medio")\
-            .eq("tenant_id", tenant_id)\
-            .gte("created_at", six_months_ago)\
-            .order("created_at")\
-            .execute()
-        
-        # Agregar por mês
-        monthly_data: Dict[str, List[float]] = {}
-        for insp in inspections.data:
-            date = datetime.fromisoformat(insp["created_at"].replace("Z", "+00:00"))
-            month_key = date.strftime("%Y-%m")
-            sulco = insp.get("sulco_medio") or 0
-            
-            if month_key not in monthly_data:
-                monthly_data[month_key] = []
-            monthly_data[month_key].append(sulco)
-        
-        # Calcular média por mês
+        six_months_ago = (datetime.now() - timedelta(days=180)).date().isoformat()
+
+        rollups = await execute(supabase.rpc("wear_history", {
+            "p_tenant_id": tenant_id,
+            "p_since": six_months_ago,
+            "p_marca": marca,
+            "p_posicao": posicao,
+        }))
+
         result = []
-        for month, values in sorted(monthly_data.items()):
-            avg_sulco = sum(values) / len(values) if values else 0
+        for row in rollups.data or []:
+            count = int(row["sulco_count"] or 0)
+            avg_sulco = float(row["sulco_sum"] or 0) / count if count else 0
             result.append({
-                "month": month,
+                "month": row["month"][:7],
                 "sulco_medio": round(avg_sulco, 2),
-                "inspections_count": len(values)
+                "sulco_min": float(row["sulco_min"]) if row["sulco_min"] is not None else None,
+                "sulco_max": float(row["sulco_max"]) if row["sulco_max"] is not None else None,
+                "inspections_count": count
             })
         
         return {"history": result}
@@ -56,62 +54,166 @@ async def get_wear_history(tenant_id: str, supabase: Client = Depends(get_supaba
 
 
 @router.get("/predictions/tire-lifecycle")
-async def get_tire_lifecycle(tenant_id: str, limit: int = 10, supabase: Client = Depends(get_supabase)):
+async def get_tire_lifecycle(
+    tenant_id: str,
+    limit: int = Query(10, ge=1, le=200),
+    after_date: Optional[date] = Query(None, description="Cursor: urgency_date do último pneu já lido"),
+    after_sulco: Optional[float] = Query(None, description="Cursor: sulco_atual do último pneu já lido"),
+    after_id: Optional[UUID] = Query(None, description="Cursor: id do último pneu já lido"),
+    supabase: Client = Depends(get_supabase)
+):
     """
     Retorna previsão de vida útil dos pneus com base em desgaste.
-    Ordenado por pneus que precisam de troca mais urgente.
+    Ordenado por pneus que precisam de troca mais urgente (data prevista de troca
+    dos snapshots de tire_predictions). Pneus em uso sem previsão (sem snapshot ou
+    aguardando dados) também entram: abaixo do sulco mínimo contam como troca
+    imediata; os demais vêm depois, pelo sulco atual.
+
+    Paginação por chave: next_cursor traz after_date, after_sulco e after_id do
+    último pneu da página; passe-os para a próxima (null quando não há mais).
     """
     try:
-        # Buscar pneus em uso com dados de sulco
-        tires = supabase.table("tire_inventory")\
-            .select("id, numero_serie, marca, modelo, sulco_inicial, sulco_atual, km_rodados")\
-            .eq("tenant_id", tenant_id)\
-            .eq("status", "em_uso")\
-            .gt("sulco_inicial", 0)\
-            .order("sulco_atual")\
-            .limit(limit)\
-            .execute()
-        
+        service = PredictionService()
+        # Uma linha a mais só para saber se há próxima página
+        result = await execute(supabase.rpc("tire_lifecycle", {
+            "p_tenant_id": tenant_id,
+            "p_min_tread": service.MIN_TREAD_DEPTH,
+            "p_limit": limit + 1,
+            "p_after_date": after_date.isoformat() if after_date else None,
+            "p_after_sulco": after_sulco,
+            "p_after_id": str(after_id) if after_id else None,
+        }))
+        rows = result.data or []
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        today = datetime.now().date()
         predictions = []
-        for tire in tires.data:
-            sulco_inicial = tire.get("sulco_inicial", 1)
-            sulco_atual = tire.get("sulco_atual", 0)
-            km_rodados = tire.get("km_rodados", 0)
+        for tire in rows:
+            sulco_inicial = tire.get("sulco_inicial") or 0
+            sulco_atual = tire.get("sulco_atual") or 0
             
             # Calcular vida restante percentual
             vida_percent = (sulco_atual / sulco_inicial) * 100 if sulco_inicial > 0 else 0
-            
-            # Estimar km restantes (se tiver km_rodados)
-            if km_rodados > 0 and sulco_inicial > sulco_atual:
-                desgaste_por_km = (sulco_inicial - sulco_atual) / km_rodados
-                # Sulco mínimo legal = 1.6mm
-                sulco_restante = sulco_atual - 1.6
-                km_restantes = int(sulco_restante / desgaste_por_km) if desgaste_por_km > 0 else 0
-            else:
-                km_restantes = None
-            
-            # Classificar urgência
-            if sulco_atual < 2:
-                urgencia = "CRÍTICO"
-            elif sulco_atual < 3:
-                urgencia = "URGENTE"
-            elif sulco_atual < 5:
-                urgencia = "ATENÇÃO"
-            else:
-                urgencia = "OK"
+
+            retirement_date = tire.get("estimated_retirement_date")
+            dias_restantes = (
+                (datetime.fromisoformat(retirement_date).date() - today).days
+                if retirement_date else None
+            )
+            km_restantes = tire.get("expected_remaining_km")
             
             predictions.append({
-                "id": tire["id"],
+                "id": tire["tire_id"],
                 "numero_serie": tire.get("numero_serie", ""),
                 "marca": tire.get("marca", ""),
                 "modelo": tire.get("modelo", ""),
                 "sulco_atual": sulco_atual,
                 "vida_percent": round(vida_percent, 1),
-                "km_restantes": km_restantes,
-                "urgencia": urgencia
+                "km_restantes": int(km_restantes) if km_restantes is not None else None,
+                "dias_restantes": dias_restantes,
+                "data_troca_estimada": retirement_date,
+                "tem_previsao": tire.get("has_prediction", False),
+                "urgencia": service.classify_urgency(sulco_atual)
             })
         
-        return {"predictions": predictions}
+        last = rows[-1] if has_more else None
+        return {
+            "predictions": predictions,
+            "next_cursor": {
+                "after_date": last["urgency_date"],
+                "after_sulco": last["sulco_atual"],
+                "after_id": last["tire_id"],
+            } if last else None,
+        }
     except Exception as e:
         print(f"Erro ao calcular previsões: {e}")
-        return {"predictions": []}
+        return {"predictions": [], "next_cursor": None}
+
+
+@router.get("/predictions/tires/{tire_id}")
+async def get_tire_prediction(tire_id: str, supabase: Client = Depends(get_supabase)):
+    """
+    Retorna a predição pré-calculada de um pneu (snapshot do job noturno).
+    """
+    result = await execute(
+        supabase.table("tire_predictions")
+        .select("*")
+        .eq("tire_id", tire_id)
+        .maybe_single()
+    )
+
+    if not result or not result.data:
+        raise HTTPException(status_code=404, detail="Predição ainda não calculada para este pneu")
+
+    return result.data
+
+
+@router.get("/predictions/tires/{tire_id}/metrics")
+async def get_tire_live_metrics(tire_id: str, supabase: Client = Depends(get_supabase)):
+    """
+    Métricas atuais de um pneu (inclui inspeções posteriores ao snapshot noturno).
+    Memoizadas pela última inspeção: visualizações repetidas custam um lookup no cache.
+    """
+    metrics = await run_sync(live_tire_metrics, supabase, tire_id)
+    if metrics is None:
+        raise HTTPException(status_code=404, detail="Pneu não encontrado")
+
+    return {"tire_id": tire_id, **metrics}
+
+
+@router.get("/predictions/brand-benchmarks")
+async def get_brand_benchmarks(
+    tenant_id: str,
+    scope: str = Query("tenant", pattern="^(tenant|market)$"),
+    supabase: Client = Depends(get_supabase)
+):
+    """
+    Benchmark de marca/modelo (pneus descartados): contagem, média, desvio e
+    p10/p50/p90 de km rodado e CPK, lidos dos agregados incrementais.
+    scope=market combina os agregados de todos os tenants (anonimizado).
+    """
+    if scope == "market":
+        benchmarks = await run_sync(market_benchmarks, supabase)
+    else:
+        benchmarks = await run_sync(tenant_benchmarks, supabase, tenant_id)
+
+    return {"scope": scope, "benchmarks": benchmarks}
+
+
+@router.get("/predictions/forecast")
+async def get_retirement_forecast(
+    tenant_id: str,
+    months: int = Query(12, ge=1, le=24),
+    supabase: Client = Depends(get_supabase)
+):
+    """
+    Previsão mensal de descartes e gasto de reposição (total, por medida, marca e
+    veículo), lida do resultado do job noturno sem recalcular a frota.
+    """
+    result = await execute(
+        supabase.table("retirement_forecasts")
+        .select("*")
+        .eq("tenant_id", tenant_id)
+        .maybe_single()
+    )
+
+    if not result or not result.data:
+        raise HTTPException(status_code=404, detail="Previsão ainda não calculada para este tenant")
+
+    row = result.data
+    forecast = row["forecast"]
+    months = min(months, len(forecast["months"]))
+
+    def trim(series: Dict[str, Any]) -> Dict[str, Any]:
+        return {**series, "tire_count": series["tire_count"][:months], "spend": series["spend"][:months]}
+
+    return {
+        "generated_at": row["generated_at"],
+        "months": forecast["months"][:months],
+        "total": trim(forecast["total"]),
+        **{
+            dimension: [item for item in map(trim, forecast[dimension]) if any(item["tire_count"])]
+            for dimension in ("medida", "marca", "vehicle")
+        },
+    }
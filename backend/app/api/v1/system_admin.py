@@ -6,31 +6,29 @@ Gestao de empresas, usuarios e secrets.
 from fastapi import APIRouter, Depends
 from app.core.secrets import secrets_manager
 from app.core.config import settings
-from supabase import Client, create_client
+from supabase import Client
+from app.core.database import get_supabase, execute
 from typing import List, Optional
 from pydantic import BaseModel
 
 router = APIRouter()
 
-def get_supabase() -> Client:
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-
 @router.get("/dashboard")
 async def get_system_stats(supabase: Client = Depends(get_supabase)):
     """
     Retorna estatisticas globais para o System Admin.
     """
     # 1. Total de empresas (tenants)
-    tenants = supabase.table("tenants").select("id", count="exact").execute()
+    tenants = await execute(supabase.table("tenants").select("id", count="exact"))
     
     # 2. Total de veículos
-    vehicles = supabase.table("vehicles").select("id", count="exact").execute()
+    vehicles = await execute(supabase.table("vehicles").select("id", count="exact"))
     
     # 3. Total de pneus em estoque/uso
-    tires = supabase.table("tire_inventory").select("id", count="exact").execute()
+    tires = await execute(supabase.table("tire_inventory").select("id", count="exact"))
     
     # 4. Total de inspeções nos últimos 30 dias (exemplo simples)
-    inspections = supabase.table("inspections").select("id", count="exact").execute()
+    inspections = await execute(supabase.table("inspections").select("id", count="exact"))
 
     return {
         "success": True,
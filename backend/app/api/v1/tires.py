@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Query
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from uuid import UUID
+import io
 from pydantic import BaseModel
 from app.core.config import get_settings
-from supabase import Client, create_client
+from supabase import Client
+from app.core.database import get_supabase, execute
+from app.core.uploads import check_upload_size
 from app.services.fleet.bulk_import import BulkImportService
 import logging
 
@@ -10,9 +15,6 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 settings = get_settings()
 
-def get_supabase() -> Client:
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-
 # Schemas
 class TireCreate(BaseModel):
     numero_serie: str
@@ -43,11 +45,12 @@ class TireResponse(BaseModel):
 async def create_tire(tire: TireCreate, supabase: Client = Depends(get_supabase)):
     """Cadastra um pneu individualmente."""
     # 1. Verificar duplicidade
-    existing = supabase.table("tire_inventory") \
-        .select("id") \
-        .eq("tenant_id", tire.tenant_id) \
-        .eq("numero_serie", tire.numero_serie.upper()) \
-        .execute()
+    existing = await execute(
+        supabase.table("tire_inventory")
+        .select("id")
+        .eq("tenant_id", tire.tenant_id)
+        .eq("numero_serie", tire.numero_serie.upper())
+    )
     
     if existing.data:
         raise HTTPException(status_code=400, detail="Número de série já cadastrado nesta empresa")
@@ -56,7 +59,7 @@ async def create_tire(tire: TireCreate, supabase: Client = Depends(get_supabase)
     tire_data = tire.model_dump()
     tire_data["numero_serie"] = tire.numero_serie.upper()
     
-    result = supabase.table("tire_inventory").insert(tire_data).execute()
+    result = await execute(supabase.table("tire_inventory").insert(tire_data))
     if not result.data:
         raise HTTPException(status_code=500, detail="Erro ao cadastrar pneu")
     
@@ -65,21 +68,98 @@ async def create_tire(tire: TireCreate, supabase: Client = Depends(get_supabase)
 @router.get("/tires", response_model=List[TireResponse])
 async def list_tires(tenant_id: str, supabase: Client = Depends(get_supabase)):
     """Lista pneus de um tenant."""
-    result = supabase.table("tire_inventory").select("*").eq("tenant_id", tenant_id).execute()
+    result = await execute(supabase.table("tire_inventory").select("*").eq("tenant_id", tenant_id))
     return result.data
 
+# Colunas da linha do tempo (GET /tires/{tire_id}/timeline), na ordem da resposta
+TIMELINE_COLUMNS = (
+    "date", "km", "sulco_interno", "sulco_central", "sulco_externo",
+    "pressao_atual", "posicao_veiculo", "inspection_id",
+)
+
+
+@router.get("/tires/{tire_id}/timeline")
+async def get_tire_timeline(
+    tire_id: str,
+    after: Optional[datetime] = Query(None, description="Cursor: data da última medição já lida"),
+    after_id: Optional[UUID] = Query(None, description="Cursor: id da última medição já lida (desempate)"),
+    until: Optional[datetime] = Query(None, description="Limite superior (inclusive) da janela"),
+    limit: int = Query(200, ge=1, le=1000),
+    supabase: Client = Depends(get_supabase),
+):
+    """
+    Histórico de medições do pneu (data, km, sulcos, pressão, posição), em ordem
+    cronológica e formato colunar: {"columns": {"date": [...], "km": [...], ...}}.
+
+    Paginação por chave (created_at, id): next_cursor traz `after` e `after_id` da
+    última medição da página; passe ambos para a próxima (null quando não há mais).
+    Medições com o mesmo created_at (sync em lote) não são puladas nem repetidas.
+    Leitura por faixa no índice (tire_id, created_at) de inspection_details.
+    """
+    query = (
+        supabase.table("inspection_details")
+        .select(
+            "id, created_at, posicao_veiculo, sulco_interno, sulco_central, sulco_externo, "
+            "pressao_atual, inspection_id, inspections(km_hodometro)"
+        )
+        .eq("tire_id", tire_id)
+    )
+    if after and after_id:
+        ts = after.isoformat()
+        query = query.or_(f'created_at.gt."{ts}",and(created_at.eq."{ts}",id.gt.{after_id})')
+    elif after:
+        query = query.gt("created_at", after.isoformat())
+    if until:
+        query = query.lte("created_at", until.isoformat())
+
+    # Uma linha a mais só para saber se há próxima página
+    result = await execute(query.order("created_at").order("id").limit(limit + 1))
+    rows = result.data or []
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    columns: Dict[str, List[Any]] = {name: [] for name in TIMELINE_COLUMNS}
+    for row in rows:
+        columns["date"].append(row["created_at"])
+        columns["km"].append((row.get("inspections") or {}).get("km_hodometro"))
+        for name in TIMELINE_COLUMNS[2:]:
+            columns[name].append(row.get(name))
+
+    return {
+        "tire_id": tire_id,
+        "count": len(rows),
+        "columns": columns,
+        "next_cursor": (
+            {"after": rows[-1]["created_at"], "after_id": rows[-1]["id"]} if has_more else None
+        ),
+    }
+
+
 @router.post("/tires/bulk-import")
 async def import_tires(tenant_id: str, file: UploadFile = File(...), supabase: Client = Depends(get_supabase)):
     """Importação massiva de pneus via CSV."""
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Arquivo deve ser um CSV")
         
-    content = await file.read()
-    string_content = content.decode("utf-8")
+    check_upload_size(file, settings.CSV_IMPORT_MAX_BYTES)
+    # Lido linha a linha do spool do upload (sem decodificar o arquivo inteiro)
+    csv_file = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
     
     service = BulkImportService(supabase)
-    result = await service.import_tires_csv(tenant_id, string_content)
+    try:
+        result = await service.import_tires_csv(tenant_id, csv_file)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV deve estar em UTF-8")
+    finally:
+        csv_file.detach()
     
+    if result["partial"]:
+        # Blocos anteriores à falha já foram gravados: o cliente precisa saber quantos
+        raise HTTPException(status_code=400, detail={
+            "message": f"Importação interrompida: {result['committed']} pneus já foram gravados",
+            "committed": result["committed"],
+            "errors": result["errors"],
+        })
     if not result["success"] and result["counts"]["success"] == 0:
         raise HTTPException(status_code=400, detail={"message": "Falha na importação", "errors": result["errors"]})
         
@@ -2,7 +2,8 @@ from fastapi import APIRouter, HTTPException, Depends, status, Query
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 from app.core.config import get_settings
-from supabase import Client, create_client
+from supabase import Client
+from app.core.database import get_supabase, execute
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,10 +11,6 @@ router = APIRouter()
 settings = get_settings()
 
 
-def get_supabase() -> Client:
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-
-
 # ============================================================================
 # SCHEMAS (Alinhados com o Banco de Dados - português)
 # ============================================================================
@@ -77,12 +74,13 @@ async def create_vehicle(vehicle: VehicleCreate, supabase: Client = Depends(get_
     """Cadastra um novo veículo."""
     try:
         # 1. Verificar duplicidade de placa no tenant
-        existing = supabase.table("vehicles")\
-            .select("id")\
-            .eq("tenant_id", vehicle.tenant_id)\
-            .eq("placa", vehicle.placa.upper())\
-            .maybe_single()\
-            .execute()
+        existing = await execute(
+            supabase.table("vehicles")
+            .select("id")
+            .eq("tenant_id", vehicle.tenant_id)
+            .eq("placa", vehicle.placa.upper())
+            .maybe_single()
+        )
         
         if existing.data:
             raise HTTPException(status_code=400, detail="Placa já cadastrada nesta empresa")
@@ -92,7 +90,7 @@ async def create_vehicle(vehicle: VehicleCreate, supabase: Client = Depends(get_
         vehicle_data["placa"] = vehicle.placa.upper()
         
         # 3. Inserir
-        result = supabase.table("vehicles").insert(vehicle_data).execute()
+        result = await execute(supabase.table("vehicles").insert(vehicle_data))
         if not result.data:
             raise HTTPException(status_code=500, detail="Erro ao criar veículo")
         
@@ -123,7 +121,7 @@ async def list_vehicles(
         if placa_filter:
             query = query.eq("placa", placa_filter.upper())
         
-        result = query.order("placa").execute()
+        result = await execute(query.order("placa"))
         return result.data or []
     
     except Exception as e:
@@ -135,11 +133,12 @@ async def list_vehicles(
 async def get_vehicle(vehicle_id: str, supabase: Client = Depends(get_supabase)):
     """Retorna detalhes de um veículo."""
     try:
-        result = supabase.table("vehicles")\
-            .select("*")\
-            .eq("id", vehicle_id)\
-            .maybe_single()\
-            .execute()
+        result = await execute(
+            supabase.table("vehicles")
+            .select("*")
+            .eq("id", vehicle_id)
+            .maybe_single()
+        )
         
         if not result.data:
             raise HTTPException(status_code=404, detail="Veículo não encontrado")
@@ -170,10 +169,11 @@ async def update_vehicle(
         if not update_data:
             raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
         
-        result = supabase.table("vehicles")\
-            .update(update_data)\
-            .eq("id", vehicle_id)\
-            .execute()
+        result = await execute(
+            supabase.table("vehicles")
+            .update(update_data)
+            .eq("id", vehicle_id)
+        )
         
         if not result.data:
             raise HTTPException(status_code=404, detail="Veículo não encontrado")
@@ -193,16 +193,17 @@ async def delete_vehicle(vehicle_id: str, supabase: Client = Depends(get_supabas
     """Remove um veículo."""
     try:
         # Verificar se existe
-        existing = supabase.table("vehicles")\
-            .select("id")\
-            .eq("id", vehicle_id)\
-            .maybe_single()\
-            .execute()
+        existing = await execute(
+            supabase.table("vehicles")
+            .select("id")
+            .eq("id", vehicle_id)
+            .maybe_single()
+        )
         
         if not existing.data:
             raise HTTPException(status_code=404, detail="Veículo não encontrado")
         
-        supabase.table("vehicles").delete().eq("id", vehicle_id).execute()
+        await execute(supabase.table("vehicles").delete().eq("id", vehicle_id))
         logger.info(f"Veículo removido: {vehicle_id}")
         return None
     
@@ -0,0 +1,137 @@
+"""
+Cache em dois niveis: LRU em memoria (por processo) + Redis compartilhado.
+
+Cada entrada guarda um fingerprint junto do valor: o chamador informa o
+fingerprint atual (ex.: id da ultima inspecao) e um valor com fingerprint
+diferente conta como miss. Assim processos que nao receberam a invalidacao
+nunca servem dados desatualizados; a invalidacao explicita apenas libera espaco.
+O Redis e opcional: falhas de conexao degradam para o nivel local.
+
+Uso:
+    from app.core.cache import TieredCache
+    cache = TieredCache("tire_metrics", local_size=2048, ttl=86400)
+    value = cache.get(tire_id, fingerprint)
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Iterable, Optional
+import json
+import logging
+
+import redis
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_redis: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Cliente Redis compartilhado pelo processo (pool de conexoes do redis-py)."""
+    global _redis
+    if _redis is None:
+        settings = get_settings()
+        _redis = redis.Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_timeout=settings.CACHE_REDIS_TIMEOUT,
+            socket_connect_timeout=settings.CACHE_REDIS_TIMEOUT,
+        )
+    return _redis
+
+
+def close_redis() -> None:
+    """Fecha o pool do cliente Redis. Chamado no shutdown da API."""
+    global _redis
+    if _redis is not None:
+        _redis.close()
+        _redis = None
+
+
+class LRUCache:
+    """LRU em memoria, thread-safe (as rotas rodam queries no pool de threads)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TieredCache:
+    """
+    Cache com fingerprint: LRU local na frente de um Redis com TTL.
+
+    Valores precisam ser serializaveis em JSON. A expiracao no Redis vem do TTL
+    (e da politica de eviction do servidor); no nivel local, da capacidade do LRU.
+    """
+
+    def __init__(self, namespace: str, local_size: int, ttl: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = LRUCache(local_size)
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str, fingerprint: str) -> Any:
+        """Retorna o valor se o fingerprint armazenado for o atual, senao None."""
+        entry = self.local.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+
+        try:
+            raw = get_redis().get(self._redis_key(key))
+        except redis.RedisError as e:
+            logger.warning(f"Cache {self.namespace}: Redis indisponivel na leitura ({e})")
+            return None
+        if raw is None:
+            return None
+
+        stored = json.loads(raw)
+        if stored.get("fingerprint") != fingerprint:
+            return None
+        self.local.set(key, (fingerprint, stored["value"]))
+        return stored["value"]
+
+    def set(self, key: str, fingerprint: str, value: Any) -> None:
+        self.local.set(key, (fingerprint, value))
+        payload = json.dumps({"fingerprint": fingerprint, "value": value}, default=str)
+        try:
+            get_redis().set(self._redis_key(key), payload, ex=self.ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Cache {self.namespace}: Redis indisponivel na escrita ({e})")
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        """Remove as chaves dos dois niveis (o LRU de outros processos expira pelo fingerprint)."""
+        keys = list(keys)
+        if not keys:
+            return
+        for key in keys:
+            self.local.delete(key)
+        try:
+            get_redis().delete(*(self._redis_key(key) for key in keys))
+        except redis.RedisError as e:
+            logger.warning(f"Cache {self.namespace}: Redis indisponivel na invalidacao ({e})")
@@ -15,11 +15,63 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_SERVICE_KEY: str
 
+    # Pool de conexoes HTTP com o PostgREST (cliente compartilhado)
+    SUPABASE_HTTP2: bool = True
+    SUPABASE_TIMEOUT: float = 30.0
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 100
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 20
+    SUPABASE_POOL_KEEPALIVE_EXPIRY: float = 30.0
+    # Threads para executar queries sincronas fora do event loop
+    DB_MAX_WORKERS: int = 32
+
     # Criptografia (chave Fernet para secrets no banco)
     ENCRYPTION_KEY: str
+    # Cache dos secrets descriptografados no processo (segundos) e carga no startup
+    SECRETS_CACHE_TTL: int = 300
+    SECRETS_WARMUP: bool = True
 
     # Redis (Celery broker + cache)
     REDIS_URL: str = "redis://localhost:6379"
+    CACHE_REDIS_TIMEOUT: float = 0.5
+
+    # Memoizacao das metricas por pneu (LRU local + Redis)
+    TIRE_METRICS_CACHE_SIZE: int = 2048
+    TIRE_METRICS_CACHE_TTL: int = 24 * 3600
+
+    # Sincronizacao em lote do app offline (POST /inspections/sync)
+    SYNC_MAX_BODY_BYTES: int = 5 * 1024 * 1024
+    SYNC_MAX_INFLATED_BYTES: int = 20 * 1024 * 1024
+    SYNC_MAX_INSPECTIONS: int = 200
+
+    # Pre-processamento de fotos de inspecao (antes do upload e da analise por IA)
+    IMAGE_MAX_SIDE: int = 2048
+    IMAGE_JPEG_QUALITY: int = 85
+    IMAGE_THUMBNAIL_SIDE: int = 320
+    IMAGE_THUMBNAIL_QUALITY: int = 75
+
+    # Cache de analises de avaria por hash da foto (Redis)
+    VISION_CACHE_TTL: int = 30 * 24 * 3600
+    # Bits de diferenca aceitos no dHash, por pneu (maximo 3: valores maiores sao
+    # limitados, pois a busca por faixas so garante candidatos ate 3 bits).
+    # -1 (padrao) desliga: so fotos identicas (sha256) reaproveitam analise
+    VISION_DHASH_MAX_DISTANCE: int = -1
+
+    # Cliente R2 compartilhado: pool HTTP do boto3 e threads de upload/delete
+    R2_MAX_POOL_CONNECTIONS: int = 32
+    R2_MAX_WORKERS: int = 16
+    R2_CONNECT_TIMEOUT: float = 5.0
+    R2_READ_TIMEOUT: float = 60.0
+    # Upload direto do app para o R2 (URL PUT assinada)
+    R2_PRESIGN_EXPIRES: int = 300
+    # Uploads acima deste tamanho vao ao R2 em multipart (partes do mesmo tamanho)
+    R2_MULTIPART_CHUNK_BYTES: int = 8 * 1024 * 1024
+
+    # Limites de upload (multipart): corpo da requisicao e por tipo de arquivo
+    UPLOAD_MAX_REQUEST_BYTES: int = 60 * 1024 * 1024
+    PHOTO_MAX_BYTES: int = 25 * 1024 * 1024
+    CSV_IMPORT_MAX_BYTES: int = 50 * 1024 * 1024
+    NFE_XML_MAX_BYTES: int = 10 * 1024 * 1024
+    NFE_PDF_MAX_BYTES: int = 15 * 1024 * 1024
 
     # App
     APP_NAME: str = "Pneu Control API"
@@ -0,0 +1,143 @@
+"""
+Cliente Supabase compartilhado pelo processo.
+
+Um unico cliente e criado no startup da aplicacao e fechado no shutdown,
+reaproveitando as conexoes HTTP (keep-alive / HTTP/2) com o PostgREST.
+O supabase-py e sincrono: endpoints async executam as queries via `execute`,
+que roda o `.execute()` em um pool de threads limitado, sem bloquear o event loop.
+
+Uso:
+    from app.core.database import get_supabase, execute
+    supabase: Client = Depends(get_supabase)
+    result = await execute(supabase.table("vehicles").select("*"))
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import asyncio
+import logging
+
+import httpx
+from postgrest.utils import SyncClient
+from supabase import Client, create_client
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Limite de linhas por resposta do PostgREST (paginacao via range)
+PAGE_SIZE = 1000
+
+_client: Optional[Client] = None
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _build_session(current: SyncClient) -> SyncClient:
+    """Recria a sessao HTTP do PostgREST com limites de pool configuraveis."""
+    settings = get_settings()
+    return SyncClient(
+        base_url=current.base_url,
+        headers=current.headers,
+        timeout=settings.SUPABASE_TIMEOUT,
+        follow_redirects=True,
+        http2=settings.SUPABASE_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.SUPABASE_POOL_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def init_supabase() -> Client:
+    """Cria o cliente global (idempotente). Chamado no startup da API."""
+    global _client
+    if _client is None:
+        settings = get_settings()
+        client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+
+        # A sessao padrao do postgrest nao expoe limites de pool; trocamos por uma
+        # configurada. Com a service key nao ha eventos de auth que recriem o postgrest.
+        postgrest = client.postgrest
+        default_session = postgrest.session
+        postgrest.session = _build_session(default_session)
+        default_session.close()
+
+        _client = client
+        logger.info("Cliente Supabase inicializado (pool compartilhado)")
+    return _client
+
+
+def close_supabase() -> None:
+    """Fecha as conexoes do cliente global. Chamado no shutdown da API."""
+    global _client, _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if _client is not None:
+        _client.postgrest.session.close()
+        _client = None
+        logger.info("Cliente Supabase finalizado")
+
+
+def get_supabase() -> Client:
+    """Dependency do FastAPI: retorna o cliente compartilhado do processo."""
+    return init_supabase()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Pool de threads dedicado as queries (limita a concorrencia com o banco)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().DB_MAX_WORKERS,
+            thread_name_prefix="supabase",
+        )
+    return _executor
+
+
+async def execute(query) -> Any:
+    """
+    Executa uma query do PostgREST sem bloquear o event loop.
+
+    Args:
+        query: Request builder do supabase-py (sem o `.execute()` final).
+
+    Returns:
+        A resposta do `.execute()` (data/count).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), query.execute)
+
+
+async def run_sync(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Executa no mesmo pool uma funcao sincrona que faz varias queries
+    (ex.: servicos com paginacao), sem bloquear o event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), func, *args)
+
+
+def chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    """Fatia uma lista em blocos (filtros in_() e escritas em lote)."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def fetch_all(query_factory: Callable[[], Any]) -> List[Dict[str, Any]]:
+    """
+    Pagina uma query do PostgREST ate esgotar os resultados (sincrono).
+
+    Args:
+        query_factory: Funcao que monta a query (sem `.range()`/`.execute()`);
+            chamada uma vez por pagina.
+    """
+    rows: List[Dict[str, Any]] = []
+    start = 0
+    while True:
+        page = query_factory().range(start, start + PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
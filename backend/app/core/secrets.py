@@ -3,15 +3,37 @@ SecretsManager - Gerenciador de secrets criptografados.
 Busca API keys e configuracoes sensiveis da tabela system_config no Supabase.
 Usa criptografia Fernet para proteger valores em repouso.
 
+Valores descriptografados ficam em cache no processo por SECRETS_CACHE_TTL
+segundos (set_secret/delete_secret invalidam a chave neste processo; nos demais
+processos a troca vale quando o TTL expira). warm_up() pre-carrega no startup os
+secrets usados nas requisicoes.
+
 Uso:
     from app.core.secrets import secrets_manager
     api_key = await secrets_manager.get_secret('OPENROUTER_API_KEY')
+    r2 = await secrets_manager.get_secrets(['R2_ENDPOINT', 'R2_BUCKET_NAME'])
 """
 
 from cryptography.fernet import Fernet
-from supabase import create_client, Client
+from supabase import Client
 from app.core.config import get_settings
-from typing import Optional
+from app.core.database import get_supabase, execute
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Secrets lidos pelas requisicoes (vision, R2, email), carregados no startup
+WARMUP_KEYS = (
+    "OPENROUTER_API_KEY",
+    "R2_ENDPOINT",
+    "R2_ACCESS_KEY_ID",
+    "R2_SECRET_ACCESS_KEY",
+    "R2_BUCKET_NAME",
+    "R2_PUBLIC_URL",
+    "RESEND_API_KEY",
+)
 
 
 class SecretsManager:
@@ -20,16 +42,15 @@ class SecretsManager:
     def __init__(self):
         self._cipher: Optional[Fernet] = None
         self._supabase: Optional[Client] = None
+        # key -> (valor descriptografado, expira em time.monotonic())
+        self._cache: Dict[str, Tuple[str, float]] = {}
 
     def _init(self):
-        """Inicializa cipher e cliente Supabase (lazy loading)."""
+        """Inicializa cipher (lazy loading) e referencia o cliente Supabase compartilhado."""
         if self._cipher is None:
             settings = get_settings()
             self._cipher = Fernet(settings.ENCRYPTION_KEY.encode())
-            self._supabase = create_client(
-                settings.SUPABASE_URL,
-                settings.SUPABASE_SERVICE_KEY,
-            )
+        self._supabase = get_supabase()
 
     def encrypt(self, value: str) -> str:
         """Criptografa um valor com Fernet."""
@@ -41,9 +62,75 @@ class SecretsManager:
         self._init()
         return self._cipher.decrypt(encrypted_value.encode()).decode()
 
+    def _cached(self, key: str) -> Optional[str]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._cache[key]
+            return None
+        return value
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Descarta do cache uma chave (ou todas)."""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+    async def _fetch(self, keys: List[str]) -> Dict[str, str]:
+        """Busca as chaves em uma query, descriptografa e guarda no cache."""
+        self._init()
+
+        response = await execute(
+            self._supabase.table("system_config")
+            .select("key, value, is_encrypted")
+            .in_("key", keys)
+        )
+
+        expires_at = time.monotonic() + get_settings().SECRETS_CACHE_TTL
+        found = {}
+        for row in response.data or []:
+            value = self.decrypt(row["value"]) if row["is_encrypted"] else row["value"]
+            self._cache[row["key"]] = (value, expires_at)
+            found[row["key"]] = value
+        return found
+
+    async def get_secrets(self, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Busca varios secrets de uma vez (cache + uma unica query para os ausentes).
+
+        Args:
+            keys: Nomes das chaves
+
+        Returns:
+            {key: valor descriptografado}
+
+        Raises:
+            ValueError: Se alguma chave nao for encontrada.
+        """
+        keys = list(dict.fromkeys(keys))
+        values = {}
+        missing = []
+        for key in keys:
+            value = self._cached(key)
+            if value is None:
+                missing.append(key)
+            else:
+                values[key] = value
+
+        if missing:
+            values.update(await self._fetch(missing))
+            not_found = [key for key in missing if key not in values]
+            if not_found:
+                raise ValueError(f"Secret(s) {', '.join(not_found)} not found in system_config")
+
+        return {key: values[key] for key in keys}
+
     async def get_secret(self, key: str) -> str:
         """
-        Busca secret do Supabase e descriptografa se necessario.
+        Busca secret do Supabase e descriptografa se necessario (com cache).
 
         Args:
             key: Nome da chave (ex: 'OPENROUTER_API_KEY')
@@ -54,25 +141,19 @@ class SecretsManager:
         Raises:
             ValueError: Se a chave nao for encontrada.
         """
-        self._init()
-
-        response = (
-            self._supabase.table("system_config")
-            .select("value, is_encrypted")
-            .eq("key", key)
-            .single()
-            .execute()
-        )
+        value = self._cached(key)
+        if value is not None:
+            return value
+        return (await self.get_secrets([key]))[key]
 
-        if not response.data:
-            raise ValueError(f"Secret '{key}' not found in system_config")
-
-        value = response.data["value"]
-
-        if response.data["is_encrypted"]:
-            return self.decrypt(value)
+    async def warm_up(self, keys: Iterable[str] = WARMUP_KEYS) -> int:
+        """
+        Pre-carrega secrets no cache (chaves inexistentes sao ignoradas).
 
-        return value
+        Returns:
+            Quantidade de secrets carregados.
+        """
+        return len(await self._fetch(list(keys)))
 
     async def set_secret(
         self,
@@ -94,14 +175,17 @@ class SecretsManager:
 
         stored_value = self.encrypt(value) if encrypt else value
 
-        self._supabase.table("system_config").upsert(
-            {
-                "key": key,
-                "value": stored_value,
-                "description": description,
-                "is_encrypted": encrypt,
-            }
-        ).execute()
+        await execute(
+            self._supabase.table("system_config").upsert(
+                {
+                    "key": key,
+                    "value": stored_value,
+                    "description": description,
+                    "is_encrypted": encrypt,
+                }
+            )
+        )
+        self.invalidate(key)
 
     async def list_secrets(self) -> list:
         """
@@ -112,11 +196,10 @@ class SecretsManager:
         """
         self._init()
 
-        response = (
+        response = await execute(
             self._supabase.table("system_config")
             .select("key, description, is_encrypted, updated_at")
             .order("key")
-            .execute()
         )
 
         return response.data or []
@@ -124,7 +207,8 @@ class SecretsManager:
     async def delete_secret(self, key: str):
         """Remove um secret do banco."""
         self._init()
-        self._supabase.table("system_config").delete().eq("key", key).execute()
+        await execute(self._supabase.table("system_config").delete().eq("key", key))
+        self.invalidate(key)
 
 
 # Singleton global
@@ -0,0 +1,82 @@
+"""
+Limites de upload (multipart) com memoria limitada por requisicao.
+
+O Starlette ja grava cada arquivo do multipart em um SpooledTemporaryFile (ate
+1 MB em memoria, o resto em disco). Os endpoints leem direto de `file.file`, em
+streaming, em vez de `await file.read()`, que traria o arquivo inteiro para a
+memoria. Dois limites:
+    - UploadSizeLimitMiddleware: teto do corpo da requisicao, conferido no
+      Content-Length e durante a leitura (corpo chunked), antes do parse;
+    - check_upload_size: limite de cada endpoint (foto, CSV, XML, PDF), com 413.
+"""
+
+from typing import BinaryIO, Union
+import os
+
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Bloco de leitura/copia dos uploads
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def file_size(source: Union[bytes, BinaryIO]) -> int:
+    """Tamanho de bytes ou de um arquivo (sem mover a posicao de leitura)."""
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    position = source.tell()
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(position)
+    return size
+
+
+def check_upload_size(file: UploadFile, max_bytes: int) -> int:
+    """Tamanho do arquivo enviado; 413 se passar do limite do endpoint."""
+    size = file.size if file.size is not None else file_size(file.file)
+    if size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Arquivo muito grande ({size} bytes; máximo {max_bytes} bytes)",
+        )
+    return size
+
+
+class UploadSizeLimitMiddleware:
+    """413 para corpos multipart acima de max_bytes, sem ler o excedente."""
+
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/"):
+            await self.app(scope, receive, send)
+            return
+
+        declared = headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            await send({"type": "http.response.start", "status": 413,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b'{"detail":"Upload muito grande"}'})
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Sobe pelo parse do formulario como HTTPException (resposta 413)
+                    raise HTTPException(status_code=413, detail="Upload muito grande")
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -3,21 +3,55 @@ Pneu Control API v3.0
 Sistema Inteligente de Gestao e Predicao de Pneus
 """
 
+from contextlib import asynccontextmanager
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.cache import close_redis
+from app.core.config import get_settings
+from app.core.uploads import UploadSizeLimitMiddleware
+from app.core.database import init_supabase, close_supabase
+from app.core.secrets import secrets_manager
+from app.services.storage.r2 import close_r2, upload_metrics
 from app.api.v1 import (
     cnpj, system_admin, companies, suppliers, 
     vehicles, tires, invoices, inspections, 
     dashboard, predictions
 )
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ciclo de vida da API: clientes Supabase, Redis e R2 compartilhados entre requests."""
+    init_supabase()
+    if get_settings().SECRETS_WARMUP:
+        # Secrets fora da latencia das primeiras requisicoes; falha aqui nao impede o startup
+        try:
+            loaded = await secrets_manager.warm_up()
+            logger.info(f"{loaded} secrets carregados no cache")
+        except Exception as e:
+            logger.warning(f"Falha ao pre-carregar secrets: {e}")
+    yield
+    close_r2()
+    close_supabase()
+    close_redis()
+
+
 app = FastAPI(
     title="Pneu Control API",
     description="API REST para gestao preditiva de pneus de frotas pesadas",
     version="3.0.0",
+    lifespan=lifespan,
 )
 
+# Teto do corpo de uploads multipart (limites por arquivo ficam nos endpoints).
+# Adicionado antes do CORS para o 413 tambem sair com os headers de CORS.
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=get_settings().UPLOAD_MAX_REQUEST_BYTES)
+
 # CORS - permite frontend (Vercel + localhost)
 app.add_middleware(
     CORSMiddleware,
@@ -56,10 +90,8 @@ def health_check():
 async def detailed_health_check():
     """Health check detalhado com verificação de dependências."""
     from datetime import datetime
-    from app.core.config import get_settings
-    from supabase import create_client
+    from app.core.database import get_supabase, execute
     
-    settings = get_settings()
     checks = {
         "api": "healthy",
         "database": "unknown",
@@ -69,13 +101,16 @@ async def detailed_health_check():
     
     try:
         # Testar conexão com Supabase
-        supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-        result = supabase.table("tenants").select("id", count="exact").limit(1).execute()
+        supabase = get_supabase()
+        result = await execute(supabase.table("tenants").select("id", count="exact").limit(1))
         checks["database"] = "healthy"
         checks["tenants_count"] = result.count
     except Exception as e:
         checks["database"] = "unhealthy"
         checks["database_error"] = str(e)
+
+    # Uploads para o R2 deste processo (latencia e volume)
+    checks["storage_uploads"] = upload_metrics()
     
     overall_status = "healthy" if checks["database"] == "healthy" else "degraded"
     return {"status": overall_status, **checks}
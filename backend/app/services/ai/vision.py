@@ -6,6 +6,25 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def damage_fields(analysis: Dict[str, Any], new_detail: bool) -> Dict[str, Any]:
+    """
+    Colunas de inspection_details preenchidas a partir de uma análise.
+    Registro criado só para a avaria: sempre marcado; item de inspeção: segue a IA.
+    """
+    fields = {
+        "ai_analysis": analysis,
+        "ai_severity": analysis.get("severity", "baixa"),
+        "ai_status": "erro" if "error" in analysis else "concluida",
+    }
+    if new_detail:
+        fields["tem_avaria"] = True
+        fields["descricao_avaria"] = analysis.get("description", "Avaria detectada por IA")
+    else:
+        fields["tem_avaria"] = analysis.get("has_damage", False)
+        fields["descricao_avaria"] = analysis.get("description")
+    return fields
+
+
 class VisionAnalysisService:
     """
     Servico para analise de imagens utilizando OpenRouter (ex: Claude 3.5 Sonnet ou Gemini 1.5).
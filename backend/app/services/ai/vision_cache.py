@@ -0,0 +1,141 @@
+"""
+Cache dos resultados de analise de avaria por conteudo da foto (Redis).
+
+Reenvios da mesma foto (retry do app, foto repetida em outra inspecao) reutilizam
+a foto ja armazenada e a analise ja feita, sem novo upload nem chamada ao modelo:
+    - hash exato: sha256 dos bytes enviados (verificado antes de decodificar);
+    - hash perceptual (opcional, desligado por padrao): dHash de 64 bits da foto
+      pre-processada, para quase duplicatas (recompressao, redimensionamento), ate
+      VISION_DHASH_MAX_DISTANCE bits de diferenca. Escopado por pneu: fotos de
+      pneus diferentes com enquadramento parecido nunca compartilham analise.
+O dHash e dividido em 4 faixas de 16 bits indexadas em sets: com distancia <= 3,
+ao menos uma faixa coincide (busca sem varrer todos os hashes). Valores maiores
+de VISION_DHASH_MAX_DISTANCE perderiam candidatos: sao limitados a 3.
+Chaves escopadas por tenant (e pneu, no dHash), com TTL (e eviction pela
+politica do Redis).
+"""
+
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+import hashlib
+import json
+import logging
+
+import redis
+
+from app.core.cache import get_redis
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+DHASH_BANDS = 4
+DHASH_BAND_HEX = 16 // DHASH_BANDS  # 4 hex = 16 bits por faixa
+# Maior distancia com candidato garantido pelas faixas (pigeonhole)
+DHASH_MAX_DISTANCE = DHASH_BANDS - 1
+
+
+def content_hash(content: Union[bytes, BinaryIO]) -> str:
+    """sha256 dos bytes da foto (arquivos sao lidos em blocos, do inicio)."""
+    if isinstance(content, (bytes, bytearray)):
+        return hashlib.sha256(content).hexdigest()
+    content.seek(0)
+    return hashlib.file_digest(content, "sha256").hexdigest()
+
+
+@lru_cache(maxsize=None)
+def effective_max_distance(configured: int) -> int:
+    """VISION_DHASH_MAX_DISTANCE limitado ao que a busca por faixas garante (avisa uma vez)."""
+    if configured > DHASH_MAX_DISTANCE:
+        logger.warning(
+            f"VISION_DHASH_MAX_DISTANCE={configured} acima de {DHASH_MAX_DISTANCE}: "
+            f"a busca por faixas so garante candidatos ate {DHASH_MAX_DISTANCE} bits; usando {DHASH_MAX_DISTANCE}"
+        )
+        return DHASH_MAX_DISTANCE
+    return configured
+
+
+def hamming_distance(a: str, b: str) -> int:
+    """Bits diferentes entre dois hashes hexadecimais de 64 bits."""
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+class VisionResultCache:
+    """Resultados de analise (photo_url, thumbnail_url, analysis) por hash da foto."""
+
+    def __init__(self):
+        settings = get_settings()
+        self.ttl = settings.VISION_CACHE_TTL
+        self.max_distance = effective_max_distance(settings.VISION_DHASH_MAX_DISTANCE)
+
+    @staticmethod
+    def _key(tenant_id: str, kind: str, value: str) -> str:
+        return f"vision:{tenant_id}:{kind}:{value}"
+
+    @staticmethod
+    def _tire_key(tenant_id: str, tire_id: str, kind: str, value: str) -> str:
+        return f"vision:{tenant_id}:tire:{tire_id}:{kind}:{value}"
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = get_redis().get(key)
+        return json.loads(raw) if raw else None
+
+    def get_exact(self, tenant_id: str, sha256: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self._load(self._key(tenant_id, "sha", sha256))
+        except redis.RedisError as e:
+            logger.warning(f"Cache de visao indisponivel: {e}")
+            return None
+
+    def get_similar(self, tenant_id: str, tire_id: str, dhash: str) -> Optional[Dict[str, Any]]:
+        """Resultado da foto mais parecida do mesmo pneu, dentro da distancia maxima."""
+        if self.max_distance < 0 or not tire_id:
+            return None
+        try:
+            client = get_redis()
+            pipe = client.pipeline(transaction=False)
+            for band in range(DHASH_BANDS):
+                value = dhash[band * DHASH_BAND_HEX:(band + 1) * DHASH_BAND_HEX]
+                pipe.smembers(self._tire_key(tenant_id, tire_id, f"band{band}", value))
+            candidates = set().union(*pipe.execute())
+
+            ranked: List[tuple] = sorted(
+                (distance, candidate)
+                for candidate in candidates
+                if (distance := hamming_distance(dhash, candidate)) <= self.max_distance
+            )
+            for _, candidate in ranked:
+                entry = self._load(self._tire_key(tenant_id, tire_id, "dhash", candidate))
+                if entry is not None:
+                    return entry
+            return None
+        except redis.RedisError as e:
+            logger.warning(f"Cache de visao indisponivel: {e}")
+            return None
+
+    def store(
+        self,
+        tenant_id: str,
+        sha256: str,
+        dhash: Optional[str],
+        entry: Dict[str, Any],
+        tire_id: Optional[str] = None,
+    ) -> None:
+        """
+        Grava o resultado pelo sha256 e, com o pneu informado, pelo dHash
+        (apenas analises concluidas com sucesso).
+        """
+        payload = json.dumps(entry, default=str)
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.set(self._key(tenant_id, "sha", sha256), payload, ex=self.ttl)
+            if dhash and tire_id:
+                pipe.set(self._tire_key(tenant_id, tire_id, "dhash", dhash), payload, ex=self.ttl)
+                for band in range(DHASH_BANDS):
+                    band_key = self._tire_key(
+                        tenant_id, tire_id, f"band{band}", dhash[band * DHASH_BAND_HEX:(band + 1) * DHASH_BAND_HEX]
+                    )
+                    pipe.sadd(band_key, dhash)
+                    pipe.expire(band_key, self.ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Falha ao gravar cache de visao: {e}")
@@ -0,0 +1,200 @@
+"""
+Exportacao completa de inspecoes (auditoria) em CSV, NDJSON ou Parquet.
+
+Uma linha por inspection_details, com a inspecao e o veiculo embutidos. O
+PostgREST e paginado por keyset em (created_at, id) - sem offset, custo constante
+por pagina - e cada pagina e serializada e liberada antes da proxima: a memoria
+fica limitada a uma pagina, qualquer que seja o tamanho do tenant. Os geradores
+sao sincronos; o StreamingResponse os consome no threadpool.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+import csv
+import io
+import json
+
+from supabase import Client
+
+# Linhas por pagina do PostgREST (limite padrao de max-rows)
+EXPORT_PAGE_SIZE = 1000
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# (coluna exportada, tipo no Parquet)
+EXPORT_COLUMNS = (
+    ("detail_id", "string"),
+    ("created_at", "timestamp"),
+    ("inspection_id", "string"),
+    ("inspection_date", "timestamp"),
+    ("tipo", "string"),
+    ("status", "string"),
+    ("km_hodometro", "float"),
+    ("vehicle_id", "string"),
+    ("placa", "string"),
+    ("vehicle_marca", "string"),
+    ("vehicle_modelo", "string"),
+    ("tire_id", "string"),
+    ("numero_serie", "string"),
+    ("posicao_veiculo", "string"),
+    ("sulco_interno", "float"),
+    ("sulco_central", "float"),
+    ("sulco_externo", "float"),
+    ("sulco_medio", "float"),
+    ("pressao_atual", "float"),
+    ("pressao_recomendada", "float"),
+    ("alerta_sulco", "bool"),
+    ("alerta_pressao", "bool"),
+    ("tem_avaria", "bool"),
+    ("descricao_avaria", "string"),
+    ("ai_severity", "string"),
+    ("observacoes", "string"),
+)
+COLUMN_NAMES = [name for name, _ in EXPORT_COLUMNS]
+
+_SELECT = (
+    "id, created_at, inspection_id, tire_id, posicao_veiculo, "
+    "sulco_interno, sulco_central, sulco_externo, sulco_medio, pressao_atual, pressao_recomendada, "
+    "alerta_sulco, alerta_pressao, tem_avaria, descricao_avaria, ai_severity, observacoes, "
+    "inspections(created_at, tipo, status, km_hodometro, vehicle_id, vehicles(placa, marca, modelo)), "
+    "tire_inventory(numero_serie)"
+)
+
+
+def _flatten(row: Dict[str, Any]) -> Dict[str, Any]:
+    inspection = row.get("inspections") or {}
+    vehicle = inspection.get("vehicles") or {}
+    return {
+        **{name: row.get(name) for name in COLUMN_NAMES},
+        "detail_id": row["id"],
+        "inspection_date": inspection.get("created_at"),
+        "tipo": inspection.get("tipo"),
+        "status": inspection.get("status"),
+        "km_hodometro": inspection.get("km_hodometro"),
+        "vehicle_id": inspection.get("vehicle_id"),
+        "placa": vehicle.get("placa"),
+        "vehicle_marca": vehicle.get("marca"),
+        "vehicle_modelo": vehicle.get("modelo"),
+        "numero_serie": (row.get("tire_inventory") or {}).get("numero_serie"),
+    }
+
+
+def iter_export_pages(
+    supabase: Client,
+    tenant_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    page_size: int = EXPORT_PAGE_SIZE,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Paginas de linhas achatadas (COLUMN_NAMES), em ordem (created_at, id).
+    start inclusivo, end exclusivo.
+    """
+    cursor = None
+    while True:
+        query = supabase.table("inspection_details").select(_SELECT).eq("tenant_id", tenant_id)
+        if start:
+            query = query.gte("created_at", start.isoformat())
+        if end:
+            query = query.lt("created_at", end.isoformat())
+        if cursor:
+            created_at, detail_id = cursor
+            query = query.or_(
+                f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{detail_id})'
+            )
+
+        rows = query.order("created_at").order("id").limit(page_size).execute().data or []
+        if rows:
+            yield [_flatten(row) for row in rows]
+        if len(rows) < page_size:
+            return
+        cursor = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+def stream_csv(pages: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMN_NAMES)
+    writer.writeheader()
+    for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Export vazio: ainda entrega o cabecalho
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(pages: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for page in pages:
+        yield "".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in page).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino do ParquetWriter que acumula so os bytes ainda nao enviados."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Posicao absoluta: o footer do Parquet guarda offsets dos row groups
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    types = {
+        "string": pa.string(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in EXPORT_COLUMNS])
+
+
+def stream_parquet(pages: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """Um row group por pagina; os bytes saem a cada row group gravado."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    timestamps = [name for name, kind in EXPORT_COLUMNS if kind == "timestamp"]
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for page in pages:
+            for row in page:
+                for name in timestamps:
+                    if row[name]:
+                        row[name] = datetime.fromisoformat(row[name])
+            writer.write_table(pa.Table.from_pylist(page, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+STREAMERS = {
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+    "parquet": stream_parquet,
+}
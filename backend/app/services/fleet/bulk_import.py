@@ -1,9 +1,15 @@
 import csv
 import io
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, TextIO, Union
 from datetime import datetime
 from supabase import Client
 from app.core.config import settings
+from app.core.database import execute
+
+# Linhas por insert em lote (o CSV e lido e inserido bloco a bloco)
+INSERT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 50
+
 
 class BulkImportService:
     """
@@ -14,36 +20,61 @@ class BulkImportService:
     def __init__(self, supabase: Client):
         self.supabase = supabase
 
-    async def import_tires_csv(self, tenant_id: str, csv_content: str) -> Dict[str, Any]:
+    async def import_tires_csv(self, tenant_id: str, csv_content: Union[str, TextIO]) -> Dict[str, Any]:
         """
         Processa um CSV de pneus e insere em lote no banco.
         Campos esperados: serial_number, brand, model, size, initial_tread, current_tread, dot
+
+        csv_content: texto ou arquivo de texto. O arquivo é lido linha a linha e
+        inserido a cada INSERT_CHUNK_SIZE pneus: a memória não cresce com o CSV.
+
+        A importação NÃO é tudo-ou-nada: cada bloco é gravado ao ser inserido.
+        Se um bloco falhar, a importação para, "success" é False e
+        "committed" informa quantos pneus já ficaram gravados.
         """
-        f = io.StringIO(csv_content)
+        f = io.StringIO(csv_content) if isinstance(csv_content, str) else csv_content
         reader = csv.DictReader(f)
         
         tires_to_insert = []
         errors = []
         counts = {"success": 0, "error": 0}
+        insert_failed = False
+
+        def add_error(message: str) -> None:
+            # So as primeiras mensagens sao devolvidas; nao acumula o CSV inteiro de erros
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(message)
 
         # 1. Buscar pneus já existentes para evitar duplicidade (pelo serial_number)
-        existing_res = self.supabase.table("tire_inventory") \
-            .select("serial_number") \
-            .eq("tenant_id", tenant_id) \
-            .execute()
+        existing_res = await execute(
+            self.supabase.table("tire_inventory")
+            .select("serial_number")
+            .eq("tenant_id", tenant_id)
+        )
         
         existing_serials = {row["serial_number"] for row in existing_res.data}
 
+        async def flush() -> None:
+            # 2. Inserção em Lote (Batch Insert), um bloco por vez
+            nonlocal insert_failed
+            try:
+                await execute(self.supabase.table("tire_inventory").insert(tires_to_insert))
+                counts["success"] += len(tires_to_insert)
+            except Exception as e:
+                errors.append(f"Erro Crítico na Inserção: {str(e)}")
+                insert_failed = True
+            tires_to_insert.clear()
+
         for i, row in enumerate(reader):
             try:
                 serial = row.get("serial_number", "").strip()
                 if not serial:
-                    errors.append(f"Linha {i+1}: Número de série ausente.")
+                    add_error(f"Linha {i+1}: Número de série ausente.")
                     counts["error"] += 1
                     continue
 
                 if serial in existing_serials:
-                    errors.append(f"Linha {i+1}: Pneu com série '{serial}' já cadastrado.")
+                    add_error(f"Linha {i+1}: Pneu com série '{serial}' já cadastrado.")
                     counts["error"] += 1
                     continue
 
@@ -65,27 +96,25 @@ class BulkImportService:
                 existing_serials.add(serial) # Evita duplicatas dentro do próprio CSV
 
             except Exception as e:
-                errors.append(f"Linha {i+1}: Erro inesperado: {str(e)}")
+                add_error(f"Linha {i+1}: Erro inesperado: {str(e)}")
                 counts["error"] += 1
 
-        # 2. Inserção em Lote (Batch Insert)
-        if tires_to_insert:
-            try:
-                # Divide em chunks de 500 para não estourar limites do Postgres/API
-                chunk_size = 500
-                for i in range(0, len(tires_to_insert), chunk_size):
-                    chunk = tires_to_insert[i:i + chunk_size]
-                    self.supabase.table("tire_inventory").insert(chunk).execute()
-                
-                counts["success"] = len(tires_to_insert)
-            except Exception as e:
-                errors.append(f"Erro Crítico na Inserção: {str(e)}")
-                counts["success"] = 0
+            if len(tires_to_insert) >= INSERT_CHUNK_SIZE:
+                await flush()
+                # Falha no banco interrompe a importação (blocos anteriores já gravados)
+                if insert_failed:
+                    break
+
+        if tires_to_insert and not insert_failed:
+            await flush()
 
         return {
-            "success": counts["success"] > 0 or len(errors) == 0,
+            # Falha de insercao nunca e sucesso, mesmo com blocos anteriores gravados
+            "success": not insert_failed and (counts["success"] > 0 or len(errors) == 0),
+            "partial": insert_failed and counts["success"] > 0,
+            "committed": counts["success"],
             "counts": counts,
-            "errors": errors[:50] # Limita a 50 erros para não sobrecarregar log
+            "errors": errors # Limitado a MAX_REPORTED_ERRORS (+ erro de inserção) para não sobrecarregar log
         }
 
     def get_csv_template(self) -> str:
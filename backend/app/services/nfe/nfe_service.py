@@ -1,7 +1,7 @@
 import base64
 import httpx
 import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, BinaryIO, List, Optional, Union
 from app.services.nfe.parser import NFeParser
 import logging
 
@@ -17,18 +17,22 @@ class NFeService:
         self.openrouter_key = openrouter_key
         self.openrouter_url = "https://openrouter.ai/api/v1/chat/completions"
 
-    async def process_file(self, content: bytes, filename: str) -> Dict[str, Any]:
+    async def process_file(self, content: Union[bytes, BinaryIO], filename: str) -> Dict[str, Any]:
         """
         Detecta o tipo de arquivo e processa adequadamente.
+        content: bytes ou arquivo binario (o XML e parseado direto do arquivo).
         """
         if filename.lower().endswith('.xml'):
-            return self.process_xml(content.decode('utf-8'))
+            return self.process_xml(content)
         elif filename.lower().endswith('.pdf'):
+            # O OCR envia o PDF inteiro em base64 no corpo JSON: o limite de tamanho fica no endpoint
+            if not isinstance(content, (bytes, bytearray)):
+                content = content.read()
             return await self.process_pdf_ocr(content)
         else:
             raise ValueError("Formato de arquivo nao suportado. Use XML ou PDF.")
 
-    def process_xml(self, xml_content: str) -> Dict[str, Any]:
+    def process_xml(self, xml_content: Union[str, bytes, BinaryIO]) -> Dict[str, Any]:
         """
         Processa XML utilizando o NFeParser nativo e normaliza as chaves.
         """
@@ -1,5 +1,5 @@
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Any
+from typing import Any, BinaryIO, Dict, List, Union
 import re
 
 class NFeParser:
@@ -10,8 +10,12 @@ class NFeParser:
     
     NAMESPACE = {'ns': 'http://www.portalfiscal.inf.br/nfe'}
 
-    def __init__(self, xml_content: str):
-        self.root = ET.fromstring(xml_content)
+    def __init__(self, xml_content: Union[str, bytes, BinaryIO]):
+        # Arquivos sao parseados em streaming (sem copia do XML inteiro em memoria)
+        if isinstance(xml_content, (str, bytes, bytearray)):
+            self.root = ET.fromstring(xml_content)
+        else:
+            self.root = ET.parse(xml_content).getroot()
 
     def parse(self) -> Dict[str, Any]:
         infNFe = self.root.find('.//ns:infNFe', self.NAMESPACE)
@@ -0,0 +1,199 @@
+"""
+Agregados incrementais e mesclaveis para benchmarks de marca/modelo.
+
+- RunningStats: contagem, media e soma dos quadrados dos desvios (Welford),
+  com merge exato entre agregados parciais (Chan et al.).
+- QuantileSketch: quantis com erro relativo limitado usando buckets
+  logaritmicos (estilo DDSketch); o merge e a soma dos contadores por bucket.
+- BrandBenchmark: os dois acima para total_km e CPK de um grupo marca/modelo.
+
+Todos serializam para dict (JSON) e podem ser somados entre lotes, periodos ou
+tenants sem reprocessar os pneus.
+"""
+
+from typing import Any, Dict, Iterable, Optional
+import math
+
+# Erro relativo padrao dos quantis (1%)
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Quantis reportados nos benchmarks
+BENCHMARK_QUANTILES = (0.1, 0.5, 0.9)
+
+# Metricas acompanhadas por grupo marca/modelo
+BENCHMARK_METRICS = ("total_km", "cpk")
+
+
+class RunningStats:
+    """Media e variancia incrementais (algoritmo de Welford)."""
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other: "RunningStats") -> None:
+        """Combina outro agregado parcial (formula paralela de Chan)."""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    @property
+    def variance(self) -> float:
+        """Variancia amostral (0 com menos de 2 observacoes)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """
+    Sketch de quantis com erro relativo limitado (buckets logaritmicos).
+
+    Cada valor positivo x cai no bucket ceil(log_gamma(x)), com
+    gamma = (1 + a) / (1 - a); o quantil estimado fica a no maximo `a` (relativo)
+    do valor real. Valores <= 0 sao contados a parte (zero_count).
+    """
+
+    def __init__(
+        self,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+        bins: Optional[Dict[int, int]] = None,
+        zero_count: int = 0,
+    ):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = dict(bins or {})
+        self.zero_count = zero_count
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.bins.values())
+
+    def add(self, value: float) -> None:
+        if value <= 0:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Sketches com precisoes diferentes nao podem ser combinados")
+        self.zero_count += other.zero_count
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimativa do quantil q (0-1), ou None se o sketch estiver vazio."""
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # Ponto do bucket com erro relativo simetrico
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero_count": self.zero_count,
+            "bins": {str(key): count for key, count in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "QuantileSketch":
+        if not data:
+            return cls()
+        return cls(
+            relative_accuracy=float(data.get("relative_accuracy", DEFAULT_RELATIVE_ACCURACY)),
+            bins={int(key): int(count) for key, count in (data.get("bins") or {}).items()},
+            zero_count=int(data.get("zero_count") or 0),
+        )
+
+
+class BrandBenchmark:
+    """Agregado de total_km e CPK de um grupo marca/modelo."""
+
+    def __init__(self):
+        self.stats = {metric: RunningStats() for metric in BENCHMARK_METRICS}
+        self.sketches = {metric: QuantileSketch() for metric in BENCHMARK_METRICS}
+
+    @property
+    def count(self) -> int:
+        return self.stats["total_km"].count
+
+    def add(self, total_km: float, cpk: float) -> None:
+        for metric, value in (("total_km", total_km), ("cpk", cpk)):
+            self.stats[metric].add(value)
+            self.sketches[metric].add(value)
+
+    def merge(self, other: "BrandBenchmark") -> None:
+        for metric in BENCHMARK_METRICS:
+            self.stats[metric].merge(other.stats[metric])
+            self.sketches[metric].merge(other.sketches[metric])
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumo para relatorios: contagem e media/desvio/p10/p50/p90 por metrica."""
+        result: Dict[str, Any] = {"count": self.count}
+        for metric in BENCHMARK_METRICS:
+            stats, sketch = self.stats[metric], self.sketches[metric]
+            result[metric] = {
+                "mean": stats.mean,
+                "std": stats.std,
+                **{f"p{int(q * 100)}": sketch.quantile(q) for q in BENCHMARK_QUANTILES},
+            }
+        return result
+
+    def to_row(self) -> Dict[str, Any]:
+        """Colunas de brand_benchmarks (sem tenant/marca/modelo)."""
+        row: Dict[str, Any] = {"tire_count": self.count}
+        for metric in BENCHMARK_METRICS:
+            row[f"{metric}_mean"] = self.stats[metric].mean
+            row[f"{metric}_m2"] = self.stats[metric].m2
+            row[f"{metric}_sketch"] = self.sketches[metric].to_dict()
+        return row
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "BrandBenchmark":
+        benchmark = cls()
+        count = int(row.get("tire_count") or 0)
+        for metric in BENCHMARK_METRICS:
+            benchmark.stats[metric] = RunningStats(
+                count, float(row.get(f"{metric}_mean") or 0), float(row.get(f"{metric}_m2") or 0)
+            )
+            benchmark.sketches[metric] = QuantileSketch.from_dict(row.get(f"{metric}_sketch"))
+        return benchmark
+
+
+def fold_benchmarks(records: Iterable[Dict[str, Any]]) -> Dict[tuple, BrandBenchmark]:
+    """Agrupa registros {brand, model, total_km, cpk} em agregados por (marca, modelo)."""
+    groups: Dict[tuple, BrandBenchmark] = {}
+    for record in records:
+        key = (record["brand"], record["model"])
+        if key not in groups:
+            groups[key] = BrandBenchmark()
+        groups[key].add(float(record["total_km"]), float(record["cpk"]))
+    return groups
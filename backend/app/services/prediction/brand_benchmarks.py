@@ -0,0 +1,167 @@
+"""
+Benchmarks de marca/modelo persistidos como agregados incrementais (brand_benchmarks).
+
+Pneus descartados entram uma unica vez (tires_pending_benchmark): o job calcula o
+total_km rodado e o CPK realizado de cada pneu, agrega o lote por marca/modelo e
+aplica os parciais via apply_brand_benchmarks (merge de media/variancia e dos
+sketches de quantis no banco). Relatorios leem apenas os agregados; o benchmark
+de mercado combina os agregados de varios tenants sem expor dados individuais.
+"""
+
+from typing import Any, Dict, List, Optional
+import logging
+
+from supabase import Client
+
+from app.core.database import chunks, fetch_all
+from app.services.prediction.aggregates import BrandBenchmark
+from app.services.prediction.engine import PredictionService
+from app.services.prediction.snapshots import (
+    TIRE_CHUNK_SIZE,
+    load_inspection_columns,
+    load_tire_columns,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pneus descartados processados por chamada de apply_brand_benchmarks
+BENCHMARK_BATCH_SIZE = 1000
+
+# Minimo de tenants distintos para publicar um modelo no benchmark de mercado
+MIN_MARKET_TENANTS = 3
+
+BENCHMARK_COLUMNS = (
+    "marca, modelo, tire_count, total_km_mean, total_km_m2, total_km_sketch, "
+    "cpk_mean, cpk_m2, cpk_sketch"
+)
+
+
+def pending_benchmark_tire_ids(supabase: Client, tenant_id: str) -> List[str]:
+    """Pneus descartados do tenant que ainda nao entraram nos benchmarks."""
+    result = supabase.rpc("tires_pending_benchmark", {"p_tenant_id": tenant_id}).execute()
+    return list(result.data or [])
+
+
+def load_brand_models(supabase: Client, tire_ids: List[str]) -> Dict[str, tuple]:
+    """Marca/modelo por pneu ({tire_id: (marca, modelo)}); vazio vira ''."""
+    brands: Dict[str, tuple] = {}
+    for chunk in chunks(tire_ids, TIRE_CHUNK_SIZE):
+        rows = (
+            supabase.table("tire_inventory")
+            .select("id, marca, modelo")
+            .in_("id", chunk)
+            .execute()
+        ).data or []
+        for row in rows:
+            brands[row["id"]] = (row.get("marca") or "", row.get("modelo") or "")
+    return brands
+
+
+def build_benchmark_deltas(
+    batch: Dict[str, Any],
+    costs: Dict[str, float],
+    brands: Dict[str, tuple],
+) -> Dict[tuple, BrandBenchmark]:
+    """
+    Agrega o lote por (marca, modelo) com o km efetivamente rodado e o CPK realizado.
+    Pneus sem predicao valida (poucas inspecoes, sem desgaste) ficam de fora.
+    """
+    deltas: Dict[tuple, BrandBenchmark] = {}
+    for i, tire_id in enumerate(batch["tire_id"].tolist()):
+        if tire_id not in brands or batch["status"][i] != "sucesso":
+            continue
+        total_km = float(batch["total_km_run"][i])
+        if total_km <= 0:
+            continue
+        key = brands[tire_id]
+        if key not in deltas:
+            deltas[key] = BrandBenchmark()
+        deltas[key].add(total_km, costs.get(tire_id, 0.0) / total_km)
+    return deltas
+
+
+def fold_retired_tires(
+    supabase: Client,
+    tenant_id: str,
+    service: Optional[PredictionService] = None,
+) -> Dict[str, int]:
+    """
+    Incorpora aos benchmarks os pneus descartados ainda nao contabilizados.
+
+    Returns:
+        Contadores: pending (pneus descartados novos) e applied (pneus com metricas validas).
+    """
+    service = service or PredictionService()
+    tire_ids = pending_benchmark_tire_ids(supabase, tenant_id)
+    applied = 0
+
+    for chunk in chunks(tire_ids, BENCHMARK_BATCH_SIZE):
+        brands = load_brand_models(supabase, chunk)
+        tires = load_tire_columns(supabase, chunk)
+        history = load_inspection_columns(supabase, chunk)
+        batch = service.batch_tire_metrics(history["columns"], tires)
+
+        costs = dict(zip(tires["tire_id"], tires["cost"]))
+        deltas = build_benchmark_deltas(batch, costs, brands)
+        payload = [
+            {"marca": marca, "modelo": modelo, **benchmark.to_row()}
+            for (marca, modelo), benchmark in deltas.items()
+        ]
+
+        # Pneus sem metricas tambem sao marcados, para nao voltarem a cada execucao
+        supabase.rpc("apply_brand_benchmarks", {
+            "p_tenant_id": tenant_id,
+            "p_tire_ids": list(brands),
+            "p_deltas": payload,
+        }).execute()
+        applied += sum(benchmark.count for benchmark in deltas.values())
+
+    logger.info(f"Benchmarks atualizados para tenant {tenant_id}: {applied} de {len(tire_ids)} descartes")
+    return {"pending": len(tire_ids), "applied": applied}
+
+
+def _summaries(groups: Dict[tuple, BrandBenchmark], extra: Optional[Dict[tuple, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Resumo por marca/modelo, ordenado pelo CPK medio (como benchmark_brands)."""
+    summary = []
+    for (marca, modelo), benchmark in groups.items():
+        summary.append({"marca": marca, "modelo": modelo, **(extra or {}).get((marca, modelo), {}), **benchmark.summary()})
+    return sorted(summary, key=lambda row: row["cpk"]["mean"])
+
+
+def tenant_benchmarks(supabase: Client, tenant_id: str) -> List[Dict[str, Any]]:
+    """Benchmarks do tenant lidos dos agregados (sem varrer o historico)."""
+    rows = fetch_all(
+        lambda: supabase.table("brand_benchmarks")
+        .select(BENCHMARK_COLUMNS)
+        .eq("tenant_id", tenant_id)
+        .order("marca")
+        .order("modelo")
+    )
+    return _summaries({(row["marca"], row["modelo"]): BrandBenchmark.from_row(row) for row in rows})
+
+
+def market_benchmarks(supabase: Client, min_tenants: int = MIN_MARKET_TENANTS) -> List[Dict[str, Any]]:
+    """
+    Benchmark de mercado: agregados de todos os tenants combinados por marca/modelo.
+    Modelos presentes em menos de `min_tenants` tenants sao omitidos (anonimizacao).
+    """
+    rows = fetch_all(
+        lambda: supabase.table("brand_benchmarks")
+        .select(f"tenant_id, {BENCHMARK_COLUMNS}")
+        .order("marca")
+        .order("modelo")
+        .order("tenant_id")
+    )
+
+    groups: Dict[tuple, BrandBenchmark] = {}
+    tenants: Dict[tuple, set] = {}
+    for row in rows:
+        key = (row["marca"], row["modelo"])
+        if key not in groups:
+            groups[key] = BrandBenchmark()
+            tenants[key] = set()
+        groups[key].merge(BrandBenchmark.from_row(row))
+        tenants[key].add(row["tenant_id"])
+
+    published = {key: groups[key] for key in groups if len(tenants[key]) >= min_tenants}
+    return _summaries(published, {key: {"tenants": len(tenants[key])} for key in published})
@@ -1,9 +1,14 @@
-from typing import List, Dict, Any, Optional
-import pandas as pd
+from typing import List, Dict, Any, Iterable, Optional, Mapping
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 import logging
 
+from app.services.prediction.aggregates import fold_benchmarks
+from app.services.prediction.wear_model import fit_line, fit_lines
+
+# Sem pandas: o calculo por pneu roda em Python puro, o lote em NumPy e os
+# benchmarks em agregados incrementais, evitando o custo de import no cold start.
+
 logger = logging.getLogger(__name__)
 
 class PredictionService:
@@ -15,9 +20,29 @@ class PredictionService:
     # Limite de segurança legal/técnico (mm)
     MIN_TREAD_DEPTH = 3.0 
 
+    # Faixas de urgência por sulco atual (mm), usadas nas listagens de troca
+    CRITICAL_TREAD_DEPTH = 2.0
+    WARNING_TREAD_DEPTH = 5.0
+
+    # Rodagem mensal assumida quando o tenant nao informa (km/mês)
+    DEFAULT_MONTHLY_KM = 5000
+
+    # Teto das projeções de data (dias): taxas quase nulas não geram datas fora do calendário
+    MAX_PROJECTION_DAYS = 20 * 365
+
     def __init__(self, settings=None):
         self.settings = settings
 
+    def classify_urgency(self, current_tread: float) -> str:
+        """Classifica a urgência de troca pelo sulco atual (mesmo limite das predições)."""
+        if current_tread < self.CRITICAL_TREAD_DEPTH:
+            return "CRÍTICO"
+        if current_tread < self.MIN_TREAD_DEPTH:
+            return "URGENTE"
+        if current_tread < self.WARNING_TREAD_DEPTH:
+            return "ATENÇÃO"
+        return "OK"
+
     def calculate_tire_metrics(self, history: List[Dict[str, Any]], tire_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Calcula as principais métricas de performance para um pneu específico.
@@ -28,18 +53,17 @@ class PredictionService:
         if len(history) < 1:
             return {"status": "insuficiente", "message": "Sem inspeções registradas."}
 
-        # Converter para DataFrame para facilitar manipulação
-        df = pd.DataFrame(history)
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
+        # Históricos são pequenos (dezenas de pontos): ordenação em Python puro
+        points = sorted(history, key=lambda point: _to_timestamp(point['date']))
+        first, last = points[0], points[-1]
 
         # 1. Taxa de Desgaste (KM por mm)
         # Usamos o sulco inicial do cadastro como ponto de partida se disponível
-        initial_tread = tire_data.get('initial_tread', df['tread'].iloc[0])
-        initial_km = tire_data.get('initial_km', df['km'].iloc[0])
+        initial_tread = tire_data.get('initial_tread', first['tread'])
+        initial_km = tire_data.get('initial_km', first['km'])
 
-        current_tread = df['tread'].iloc[-1]
-        current_km = df['km'].iloc[-1]
+        current_tread = last['tread']
+        current_km = last['km']
 
         total_km_run = current_km - initial_km
         total_wear = initial_tread - current_tread
@@ -52,11 +76,19 @@ class PredictionService:
                 "current_wear_percent": 0
             }
 
-        km_per_mm = total_km_run / total_wear
-        
+        # Regressão sulco x km sobre todo o histórico; sem ajuste (poucos pontos ou
+        # sulco sem queda) mantemos a taxa entre primeira e última inspeção
+        fit = fit_line([point['km'] for point in points], [point['tread'] for point in points], self.MIN_TREAD_DEPTH)
+        regression = fit is not None and fit['slope'] < 0
+
         # 2. Projeção de Fim de Vida (Quilometragem Total Estimada)
-        remaining_wear = current_tread - self.MIN_TREAD_DEPTH
-        expected_remaining_km = max(0, remaining_wear * km_per_mm)
+        if regression:
+            km_per_mm = -1 / fit['slope']
+            expected_remaining_km = max(0, fit['retirement_km'] - current_km)
+        else:
+            km_per_mm = total_km_run / total_wear
+            remaining_wear = current_tread - self.MIN_TREAD_DEPTH
+            expected_remaining_km = max(0, remaining_wear * km_per_mm)
         total_estimated_km = total_km_run + expected_remaining_km
 
         # 3. Cálculo de CPK (Custo por KM)
@@ -65,11 +97,27 @@ class PredictionService:
 
         # 4. Estimativa de Data para Troca
         # Suposição média de rodagem mensal do tenant se não informado (ex: 5000km/mês)
-        avg_monthly_km = tire_data.get('avg_monthly_km', 5000)
+        avg_monthly_km = tire_data.get('avg_monthly_km', self.DEFAULT_MONTHLY_KM)
         days_remaining = (expected_remaining_km / avg_monthly_km) * 30 if avg_monthly_km > 0 else 365
+        days_remaining = min(days_remaining, self.MAX_PROJECTION_DAYS)
         
         estimated_retirement_date = datetime.now() + timedelta(days=int(days_remaining))
 
+        if regression:
+            # Intervalo de confiança (95%) da data de troca, pelo IC do km de retirada
+            retirement_dates = []
+            for bound in (fit['retirement_km_low'], fit['retirement_km_high']):
+                bound_remaining_km = max(0, bound - current_km)
+                bound_days = (bound_remaining_km / avg_monthly_km) * 30 if avg_monthly_km > 0 else 365
+                bound_days = min(bound_days, self.MAX_PROJECTION_DAYS)
+                retirement_dates.append((datetime.now() + timedelta(days=int(bound_days))).strftime("%Y-%m-%d"))
+            wear_model = _wear_model_stats(
+                len(points), fit['slope'], fit['residual_std'], fit['retirement_km'],
+                fit['retirement_km_low'], fit['retirement_km_high'], *retirement_dates,
+            )
+        else:
+            wear_model = {"method": "pontas", "points": len(points)}
+
         return {
             "status": "sucesso",
             "stats": {
@@ -78,23 +126,218 @@ class PredictionService:
                 "expected_remaining_km": round(expected_remaining_km, 0),
                 "cpk": round(cpk, 4),
                 "wear_percent": round((total_wear / (initial_tread - self.MIN_TREAD_DEPTH)) * 100, 1) if initial_tread > self.MIN_TREAD_DEPTH else 100,
-                "estimated_retirement_date": estimated_retirement_date.strftime("%Y-%m-%d")
+                "estimated_retirement_date": estimated_retirement_date.strftime("%Y-%m-%d"),
+                "wear_model": wear_model,
             }
         }
 
-    def benchmark_brands(self, fleet_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def batch_tire_metrics(self, inspections: Mapping[str, Any], tires: Optional[Mapping[str, Any]] = None) -> Dict[str, np.ndarray]:
+        """
+        Versão vetorizada de calculate_tire_metrics para uma frota inteira.
+
+        inspections: colunas (DataFrame ou dict de arrays) tire_id, date, km, tread
+        tires: colunas opcionais tire_id, cost, initial_tread, initial_km, avg_monthly_km
+               (NaN/ausente = mesmo default do calculo individual)
+
+        Retorna colunas alinhadas por pneu, sem arredondamento: tire_id, status,
+        km_per_mm, total_km_run (km já rodado), total_estimated_km, expected_remaining_km, cpk, wear_percent,
+        estimated_retirement_date (datetime64[D], NaT quando nao ha predicao) e o
+        modelo de desgaste: wear_model ("regressao"/"pontas"), wear_points, wear_slope,
+        residual_std, retirement_km, retirement_km_low/high e retirement_date_low/high
+        (NaN/NaT quando a regressao nao se aplica).
+        """
+        insp_ids = np.asarray(inspections["tire_id"]).astype(str)
+        km = np.asarray(inspections["km"], dtype=float)
+        tread = np.asarray(inspections["tread"], dtype=float)
+        dates = _to_epoch_seconds(inspections["date"])
+
+        # Pneus cadastrados sem inspeção também aparecem no resultado (status insuficiente)
+        tire_ids = np.asarray(tires["tire_id"]).astype(str) if tires is not None else np.empty(0, dtype=str)
+        all_ids, codes = np.unique(np.concatenate([insp_ids, tire_ids]), return_inverse=True)
+        insp_codes = codes[:len(insp_ids)]
+        n_tires = len(all_ids)
+
+        # Ordena por (pneu, data) e pega primeira/última inspeção de cada grupo
+        order = np.lexsort((dates, insp_codes))
+        sorted_codes = insp_codes[order]
+        has_history = np.zeros(n_tires, dtype=bool)
+        first_idx = np.zeros(n_tires, dtype=np.int64)
+        last_idx = np.zeros(n_tires, dtype=np.int64)
+        if len(order):
+            starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+            ends = np.r_[starts[1:], len(order)] - 1
+            group_codes = sorted_codes[starts]
+            has_history[group_codes] = True
+            first_idx[group_codes] = order[starts]
+            last_idx[group_codes] = order[ends]
+
+        first_km, first_tread = km[first_idx], tread[first_idx]
+        current_km, current_tread = km[last_idx], tread[last_idx]
+
+        cost = np.zeros(n_tires)
+        initial_tread = np.full(n_tires, np.nan)
+        initial_km = np.full(n_tires, np.nan)
+        avg_monthly_km = np.full(n_tires, float(self.DEFAULT_MONTHLY_KM))
+        if tires is not None and len(tire_ids):
+            tire_codes = codes[len(insp_ids):]
+            for column, target in (("cost", cost), ("initial_tread", initial_tread),
+                                   ("initial_km", initial_km), ("avg_monthly_km", avg_monthly_km)):
+                if column in tires:
+                    values = np.asarray(tires[column], dtype=float)
+                    present = ~np.isnan(values)
+                    target[tire_codes[present]] = values[present]
+        initial_tread = np.where(np.isnan(initial_tread), first_tread, initial_tread)
+        initial_km = np.where(np.isnan(initial_km), first_km, initial_km)
+
+        # Mesmas fórmulas de calculate_tire_metrics, aplicadas em todos os pneus de uma vez
+        total_km_run = current_km - initial_km
+        total_wear = initial_tread - current_tread
+        ok = has_history & (total_wear > 0) & (total_km_run > 0)
+
+        # Regressão por pneu sobre os pontos já ordenados (mesma ordem de soma do caminho individual)
+        fit = fit_lines(sorted_codes, km[order], tread[order], n_tires, self.MIN_TREAD_DEPTH)
+        regression = ok & ~np.isnan(fit["retirement_km"])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            km_per_mm = np.where(ok, total_km_run / total_wear, 0.0)
+            expected_remaining_km = np.where(ok, np.maximum(0, (current_tread - self.MIN_TREAD_DEPTH) * km_per_mm), 0.0)
+            km_per_mm = np.where(regression, -1 / fit["slope"], km_per_mm)
+            expected_remaining_km = np.where(regression, np.maximum(0, fit["retirement_km"] - current_km), expected_remaining_km)
+            total_estimated_km = np.where(ok, total_km_run + expected_remaining_km, 0.0)
+            cpk = np.where(total_estimated_km > 0, cost / total_estimated_km, 0.0)
+            days_remaining = np.where(avg_monthly_km > 0, expected_remaining_km / avg_monthly_km * 30, 365.0)
+            days_remaining = np.minimum(days_remaining, self.MAX_PROJECTION_DAYS)
+            usable_tread = initial_tread - self.MIN_TREAD_DEPTH
+            wear_percent = np.where(usable_tread > 0, total_wear / usable_tread * 100, 100.0)
+
+        today = np.datetime64(datetime.now().date(), "D")
+        retirement = today + np.trunc(days_remaining).astype(np.int64).astype("timedelta64[D]")
+        retirement = np.where(ok, retirement, np.datetime64("NaT", "D"))
+
+        bound_dates = []
+        for bound in (fit["retirement_km_low"], fit["retirement_km_high"]):
+            with np.errstate(invalid="ignore"):
+                bound_remaining_km = np.maximum(0, np.where(regression, bound, current_km) - current_km)
+                bound_days = np.where(avg_monthly_km > 0, bound_remaining_km / avg_monthly_km * 30, 365.0)
+                bound_days = np.minimum(bound_days, self.MAX_PROJECTION_DAYS)
+            bound_date = today + np.trunc(bound_days).astype(np.int64).astype("timedelta64[D]")
+            bound_dates.append(np.where(regression, bound_date, np.datetime64("NaT", "D")))
+
+        status = np.where(ok, "sucesso", np.where(has_history, "aguardando_dados", "insuficiente"))
+
+        return {
+            "tire_id": all_ids,
+            "status": status,
+            "km_per_mm": km_per_mm,
+            "total_km_run": np.where(ok, total_km_run, 0.0),
+            "total_estimated_km": total_estimated_km,
+            "expected_remaining_km": expected_remaining_km,
+            "cpk": cpk,
+            "wear_percent": np.where(ok, wear_percent, 0.0),
+            "estimated_retirement_date": retirement,
+            "wear_model": np.where(regression, "regressao", "pontas"),
+            "wear_points": fit["points"],
+            "wear_slope": np.where(regression, fit["slope"], np.nan),
+            "residual_std": np.where(regression, fit["residual_std"], np.nan),
+            "retirement_km": np.where(regression, fit["retirement_km"], np.nan),
+            "retirement_km_low": np.where(regression, fit["retirement_km_low"], np.nan),
+            "retirement_km_high": np.where(regression, fit["retirement_km_high"], np.nan),
+            "retirement_date_low": bound_dates[0],
+            "retirement_date_high": bound_dates[1],
+        }
+
+    def calculate_fleet_metrics(self, inspections: Mapping[str, Any], tires: Optional[Mapping[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Calcula as métricas de todos os pneus em uma passada vetorizada.
+        Retorna {tire_id: resultado}, no mesmo formato de calculate_tire_metrics.
+        """
+        batch = self.batch_tire_metrics(inspections, tires)
+        results: Dict[str, Dict[str, Any]] = {}
+        for i, tire_id in enumerate(batch["tire_id"].tolist()):
+            status = batch["status"][i]
+            if status == "insuficiente":
+                results[tire_id] = {"status": "insuficiente", "message": "Sem inspeções registradas."}
+            elif status == "aguardando_dados":
+                results[tire_id] = {"status": "aguardando_dados", "km_per_mm": 0, "current_wear_percent": 0}
+            else:
+                if batch["wear_model"][i] == "regressao":
+                    wear_model = _wear_model_stats(
+                        int(batch["wear_points"][i]), float(batch["wear_slope"][i]), float(batch["residual_std"][i]),
+                        float(batch["retirement_km"][i]), float(batch["retirement_km_low"][i]),
+                        float(batch["retirement_km_high"][i]), str(batch["retirement_date_low"][i]),
+                        str(batch["retirement_date_high"][i]),
+                    )
+                else:
+                    wear_model = {"method": "pontas", "points": int(batch["wear_points"][i])}
+                results[tire_id] = {
+                    "status": "sucesso",
+                    "stats": {
+                        "km_per_mm": round(float(batch["km_per_mm"][i]), 2),
+                        "total_estimated_km": round(float(batch["total_estimated_km"][i]), 0),
+                        "expected_remaining_km": round(float(batch["expected_remaining_km"][i]), 0),
+                        "cpk": round(float(batch["cpk"][i]), 4),
+                        "wear_percent": round(float(batch["wear_percent"][i]), 1),
+                        "estimated_retirement_date": str(batch["estimated_retirement_date"][i]),
+                        "wear_model": wear_model,
+                    }
+                }
+        return results
+
+    def benchmark_brands(self, fleet_data: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Compara o desempenho de diferentes marcas com base nos pneus já finalizados ou avançados.
+
+        fleet_data: registros (lista ou gerador) com brand, model, total_km, cpk.
+        Processado em uma passada com agregados mescláveis; para relatórios
+        recorrentes use os agregados persistidos (services.prediction.brand_benchmarks).
         """
-        if not fleet_data:
-            return []
+        groups = fold_benchmarks(fleet_data)
+        summary = []
+        for (brand, model), benchmark in groups.items():
+            stats = benchmark.summary()
+            summary.append({
+                "brand": brand,
+                "model": model,
+                "count": stats["count"],
+                "total_km": stats["total_km"]["mean"],
+                "cpk": stats["cpk"]["mean"],
+                "percentiles": {metric: {q: stats[metric][q] for q in ("p10", "p50", "p90")}
+                                for metric in ("total_km", "cpk")},
+            })
+
+        return sorted(summary, key=lambda row: row["cpk"])
+
+
+def _wear_model_stats(points: int, slope: float, residual_std: float, retirement_km: float,
+                      retirement_km_low: float, retirement_km_high: float,
+                      retirement_date_low: str, retirement_date_high: str) -> Dict[str, Any]:
+    """Resumo arredondado da regressão de desgaste (mesmo formato no caminho individual e em lote)."""
+    return {
+        "method": "regressao",
+        "points": points,
+        "slope_mm_per_1000km": round(slope * 1000, 4),
+        "residual_std_mm": round(residual_std, 3),
+        "retirement_km": round(retirement_km, 0),
+        "retirement_km_ci": [round(retirement_km_low, 0), round(retirement_km_high, 0)],
+        "retirement_date_ci": [retirement_date_low, retirement_date_high],
+    }
+
+
+def _to_epoch_seconds(values: Any) -> np.ndarray:
+    """Converte datas (datetime64, datetime ou string ISO) em segundos desde epoch."""
+    arr = np.asarray(values)
+    if arr.dtype.kind == "M":
+        return arr.astype("datetime64[us]").astype(np.int64) / 1e6
+
+    return np.fromiter((_to_timestamp(v) for v in arr), dtype=float, count=len(arr))
 
-        df = pd.DataFrame(fleet_data)
-        # fleet_data deve conter: brand, model, total_km, cpk
-        
-        summary = df.groupby(['brand', 'model']).agg({
-            'total_km': 'mean',
-            'cpk': 'mean'
-        }).reset_index()
 
-        return summary.sort_values('cpk').to_dict('records')
+def _to_timestamp(value: Any) -> float:
+    """Converte uma data (string ISO, date ou datetime) em segundos desde epoch (naive = UTC)."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
@@ -0,0 +1,141 @@
+"""
+Previsao de descartes e compras de pneus por mes (retirement_forecasts).
+
+Parte das datas previstas de troca dos snapshots (tire_predictions) e agrupa os
+pneus em uso por mes, total e por medida, marca e veiculo, com o gasto projetado
+de reposicao (valor_compra do pneu atual). O agrupamento e vetorizado: datas
+viram meses (datetime64[M]) e cada dimensao e um np.bincount sobre
+(mes, categoria), o que processa 100k+ pneus em milissegundos.
+O job grava um documento por tenant; o time de compras so le o resultado.
+"""
+
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+import logging
+
+import numpy as np
+from supabase import Client
+
+from app.core.database import fetch_all
+
+logger = logging.getLogger(__name__)
+
+# Horizonte padrao da previsao (meses a partir do mes atual)
+DEFAULT_HORIZON_MONTHS = 24
+
+# Dimensoes de agrupamento: nome no documento -> coluna de entrada
+FORECAST_DIMENSIONS = {"medida": "medida", "marca": "marca", "vehicle": "vehicle"}
+
+
+def bucket_retirements(
+    columns: Dict[str, Any],
+    start: date,
+    horizon_months: int = DEFAULT_HORIZON_MONTHS,
+) -> Dict[str, Any]:
+    """
+    Agrupa descartes previstos por mes e dimensao.
+
+    columns: retirement_date (datetime64/ISO), cost e uma coluna por dimensao
+             (medida, marca, vehicle). Datas ja vencidas contam no primeiro mes
+             (troca imediata); datas alem do horizonte ficam de fora.
+
+    Returns:
+        Documento colunar: months (YYYY-MM), total {tire_count, spend} e, por
+        dimensao, [{value, tire_count, spend}] com um valor por mes.
+    """
+    start_month = np.datetime64(start, "M")
+    months = np.arange(start_month, start_month + horizon_months)
+
+    retirement = np.asarray(columns["retirement_date"], dtype="datetime64[D]")
+    cost = np.asarray(columns["cost"], dtype=float)
+    valid = ~np.isnat(retirement)
+    month_idx = np.zeros(len(retirement), dtype=np.int64)
+    month_idx[valid] = (retirement[valid].astype("datetime64[M]") - start_month).astype(np.int64)
+    month_idx = np.maximum(month_idx, 0)
+    selected = valid & (month_idx < horizon_months)
+
+    month_idx = month_idx[selected]
+    cost = cost[selected]
+
+    forecast: Dict[str, Any] = {
+        "months": [str(month) for month in months],
+        "total": {
+            "tire_count": np.bincount(month_idx, minlength=horizon_months).tolist(),
+            "spend": np.round(np.bincount(month_idx, cost, minlength=horizon_months), 2).tolist(),
+        },
+    }
+
+    for name, column in FORECAST_DIMENSIONS.items():
+        values = np.asarray(columns[column], dtype=object)[selected]
+        labels, codes = np.unique(values.astype(str), return_inverse=True)
+        # Uma celula por (categoria, mes): bincount sobre o indice combinado
+        cells = codes * horizon_months + month_idx
+        size = len(labels) * horizon_months
+        counts = np.bincount(cells, minlength=size).reshape(len(labels), horizon_months)
+        spend = np.round(np.bincount(cells, cost, minlength=size), 2).reshape(len(labels), horizon_months)
+
+        # Categorias com mais pneus previstos primeiro
+        ranking = np.argsort(-counts.sum(axis=1), kind="stable")
+        forecast[name] = [
+            {"value": labels[i], "tire_count": counts[i].tolist(), "spend": spend[i].tolist()}
+            for i in ranking.tolist()
+        ]
+
+    return forecast
+
+
+def load_forecast_columns(supabase: Client, tenant_id: str) -> Dict[str, List[Any]]:
+    """Datas previstas dos pneus em uso com medida, marca, veiculo e custo (colunar)."""
+    rows = fetch_all(
+        lambda: supabase.table("tire_predictions")
+        .select(
+            "estimated_retirement_date, "
+            "tire_inventory!inner(medida, marca, valor_compra, status, vehicle_id, vehicles(placa))"
+        )
+        .eq("tenant_id", tenant_id)
+        .eq("status", "sucesso")
+        .eq("tire_inventory.status", "em_uso")
+        .order("tire_id")
+    )
+
+    columns: Dict[str, List[Any]] = {"retirement_date": [], "cost": [], "medida": [], "marca": [], "vehicle": []}
+    for row in rows:
+        tire = row.get("tire_inventory") or {}
+        vehicle = tire.get("vehicles") or {}
+        columns["retirement_date"].append(row.get("estimated_retirement_date") or "NaT")
+        columns["cost"].append(float(tire.get("valor_compra") or 0))
+        columns["medida"].append(tire.get("medida") or "Desconhecida")
+        columns["marca"].append(tire.get("marca") or "Desconhecida")
+        columns["vehicle"].append(vehicle.get("placa") or tire.get("vehicle_id") or "Sem veículo")
+    return columns
+
+
+def refresh_tenant_forecast(
+    supabase: Client,
+    tenant_id: str,
+    horizon_months: int = DEFAULT_HORIZON_MONTHS,
+    today: Optional[date] = None,
+) -> Dict[str, int]:
+    """
+    Recalcula e grava a previsao do tenant (uma linha em retirement_forecasts).
+
+    Returns:
+        Contadores: tires (pneus considerados) e forecast_tires (dentro do horizonte).
+    """
+    columns = load_forecast_columns(supabase, tenant_id)
+    start = today or datetime.now().date()
+    forecast = bucket_retirements(columns, start, horizon_months)
+    forecast_tires = int(sum(forecast["total"]["tire_count"]))
+
+    supabase.table("retirement_forecasts").upsert({
+        "tenant_id": tenant_id,
+        "start_month": forecast["months"][0] + "-01",
+        "horizon_months": horizon_months,
+        "tire_count": forecast_tires,
+        "projected_spend": round(float(sum(forecast["total"]["spend"])), 2),
+        "forecast": forecast,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+    }, on_conflict="tenant_id").execute()
+
+    logger.info(f"Previsao de descartes atualizada para tenant {tenant_id}: {forecast_tires} pneus em {horizon_months} meses")
+    return {"tires": len(columns["retirement_date"]), "forecast_tires": forecast_tires}
@@ -0,0 +1,116 @@
+"""
+Memoizacao de PredictionService.calculate_tire_metrics por pneu.
+
+A chave e o tire_id; o fingerprint combina a ultima inspection_details do pneu,
+os dados do cadastro usados no calculo (custo, sulco inicial...) e o dia atual
+(a data prevista de troca e relativa a hoje). Sem inspecao nova nem alteracao no
+cadastro, a consulta custa uma leitura pequena e um lookup no LRU local ou no Redis.
+create_inspection invalida os pneus inspecionados (invalidate_tire_metrics).
+"""
+
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from supabase import Client
+
+from app.core.cache import TieredCache
+from app.core.config import get_settings
+from app.services.prediction.engine import PredictionService
+from app.services.prediction.snapshots import load_inspection_columns
+
+_cache: Optional[TieredCache] = None
+
+
+def get_tire_metrics_cache() -> TieredCache:
+    """Cache compartilhado pelo processo (criado sob demanda)."""
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        _cache = TieredCache(
+            "tire_metrics",
+            local_size=settings.TIRE_METRICS_CACHE_SIZE,
+            ttl=settings.TIRE_METRICS_CACHE_TTL,
+        )
+    return _cache
+
+
+def tire_fingerprint(last_detail_id: Optional[str], tire_data: Dict[str, Any]) -> str:
+    """Versao das entradas do calculo: ultima inspecao + cadastro + dia de referencia."""
+    return "|".join(str(part) for part in (
+        last_detail_id,
+        tire_data.get("cost"),
+        tire_data.get("initial_tread"),
+        tire_data.get("initial_km"),
+        tire_data.get("avg_monthly_km"),
+        date.today().isoformat(),
+    ))
+
+
+def memoized_tire_metrics(
+    tire_id: str,
+    last_detail_id: Optional[str],
+    tire_data: Dict[str, Any],
+    load_history: Callable[[], List[Dict[str, Any]]],
+    service: Optional[PredictionService] = None,
+) -> Dict[str, Any]:
+    """
+    calculate_tire_metrics com cache; load_history so e chamado em caso de miss.
+    """
+    cache = get_tire_metrics_cache()
+    fingerprint = tire_fingerprint(last_detail_id, tire_data)
+    cached = cache.get(tire_id, fingerprint)
+    if cached is not None:
+        return cached
+
+    service = service or PredictionService()
+    metrics = service.calculate_tire_metrics(load_history(), tire_data)
+    cache.set(tire_id, fingerprint, metrics)
+    return metrics
+
+
+def invalidate_tire_metrics(tire_ids: Iterable[str]) -> None:
+    """Descarta as metricas memoizadas dos pneus (nova inspecao registrada)."""
+    get_tire_metrics_cache().invalidate(set(tire_ids))
+
+
+def live_tire_metrics(
+    supabase: Client,
+    tire_id: str,
+    service: Optional[PredictionService] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Metricas atuais de um pneu: uma unica leitura (cadastro + ultima inspecao
+    embutida) monta o fingerprint; o historico completo so e lido em caso de miss.
+
+    Returns:
+        Resultado de calculate_tire_metrics, ou None se o pneu nao existir.
+    """
+    # inspection_details embutido, ordenado e limitado no PostgREST: so a ultima
+    tire = (
+        supabase.table("tire_inventory")
+        .select("id, valor_compra, sulco_inicial, inspection_details(id)")
+        .eq("id", tire_id)
+        .order("created_at", desc=True, foreign_table="inspection_details")
+        .limit(1, foreign_table="inspection_details")
+        .maybe_single()
+        .execute()
+    )
+    if not tire or not tire.data:
+        return None
+
+    last = tire.data.get("inspection_details") or []
+    last_detail_id = last[0]["id"] if last else None
+
+    # Mesmas entradas do job de snapshots (load_tire_columns)
+    tire_data: Dict[str, Any] = {"cost": float(tire.data.get("valor_compra") or 0)}
+    if tire.data.get("sulco_inicial"):
+        tire_data["initial_tread"] = float(tire.data["sulco_inicial"])
+
+    def load_history() -> List[Dict[str, Any]]:
+        columns = load_inspection_columns(supabase, [tire_id])["columns"]
+        return [
+            {"date": columns["date"][i], "km": columns["km"][i], "tread": columns["tread"][i]}
+            for i in range(len(columns["tire_id"]))
+        ]
+
+    return memoized_tire_metrics(tire_id, last_detail_id, tire_data, load_history, service)
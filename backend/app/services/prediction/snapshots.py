@@ -0,0 +1,175 @@
+"""
+Snapshots de predicao por pneu (tabela tire_predictions).
+
+O job noturno recalcula apenas os pneus com inspection_details mais novas que o
+ultimo snapshot (funcao tires_pending_prediction), roda o PredictionService em
+lote e grava o resultado com upsert em blocos. A API le os snapshots prontos.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import logging
+
+import numpy as np
+from supabase import Client
+
+from app.core.database import chunks, fetch_all
+from app.services.prediction.engine import PredictionService
+
+logger = logging.getLogger(__name__)
+
+# Pneus por query com filtro in_() (mantem a URL em tamanho seguro)
+TIRE_CHUNK_SIZE = 200
+# Linhas por upsert em lote
+UPSERT_CHUNK_SIZE = 500
+
+
+def pending_tire_ids(supabase: Client, tenant_id: str) -> List[str]:
+    """Pneus do tenant com inspecoes mais novas que o snapshot (ou sem snapshot)."""
+    result = supabase.rpc("tires_pending_prediction", {"p_tenant_id": tenant_id}).execute()
+    return list(result.data or [])
+
+
+def load_inspection_columns(supabase: Client, tire_ids: List[str]) -> Dict[str, Any]:
+    """
+    Busca o historico completo dos pneus em formato colunar para o engine.
+
+    Retorna as colunas tire_id, date, km, tread (apenas medicoes utilizaveis) e o
+    ultimo inspection_details visto por pneu ({tire_id: (detail_id, created_at)}).
+    """
+    columns: Dict[str, List[Any]] = {"tire_id": [], "date": [], "km": [], "tread": []}
+    latest: Dict[str, tuple] = {}
+
+    for chunk in chunks(tire_ids, TIRE_CHUNK_SIZE):
+        rows = fetch_all(
+            lambda: supabase.table("inspection_details")
+            .select("id, tire_id, created_at, sulco_medio, inspections(km_hodometro)")
+            .in_("tire_id", chunk)
+            .order("id")
+        )
+        for row in rows:
+            tire_id = row["tire_id"]
+            if tire_id not in latest or row["created_at"] > latest[tire_id][1]:
+                latest[tire_id] = (row["id"], row["created_at"])
+
+            km = (row.get("inspections") or {}).get("km_hodometro")
+            tread = row.get("sulco_medio")
+            # Registros so de avaria (sem sulco/hodometro) nao entram no calculo
+            if km is None or not tread:
+                continue
+            columns["tire_id"].append(tire_id)
+            columns["date"].append(row["created_at"])
+            columns["km"].append(float(km))
+            columns["tread"].append(float(tread))
+
+    return {"columns": columns, "latest": latest}
+
+
+def load_tire_columns(supabase: Client, tire_ids: List[str]) -> Dict[str, List[Any]]:
+    """Custo e sulco inicial dos pneus, em formato colunar para o engine."""
+    columns: Dict[str, List[Any]] = {"tire_id": [], "cost": [], "initial_tread": []}
+    for chunk in chunks(tire_ids, TIRE_CHUNK_SIZE):
+        rows = (
+            supabase.table("tire_inventory")
+            .select("id, valor_compra, sulco_inicial")
+            .in_("id", chunk)
+            .execute()
+        ).data or []
+        for row in rows:
+            columns["tire_id"].append(row["id"])
+            columns["cost"].append(float(row.get("valor_compra") or 0))
+            sulco_inicial = row.get("sulco_inicial")
+            columns["initial_tread"].append(float(sulco_inicial) if sulco_inicial else np.nan)
+    return columns
+
+
+def build_snapshot_rows(
+    tenant_id: str,
+    batch: Dict[str, np.ndarray],
+    latest: Dict[str, tuple],
+) -> List[Dict[str, Any]]:
+    """Converte o resultado colunar do engine em linhas de tire_predictions."""
+    computed_at = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for i, tire_id in enumerate(batch["tire_id"].tolist()):
+        if tire_id not in latest:
+            continue
+        detail_id, created_at = latest[tire_id]
+        status = str(batch["status"][i])
+        row = {
+            "tire_id": tire_id,
+            "tenant_id": tenant_id,
+            "last_inspection_detail_id": detail_id,
+            "last_inspection_at": created_at,
+            "status": status,
+            "km_per_mm": None,
+            "total_estimated_km": None,
+            "expected_remaining_km": None,
+            "cpk": None,
+            "wear_percent": None,
+            "estimated_retirement_date": None,
+            "wear_model": None,
+            "wear_points": int(batch["wear_points"][i]),
+            "wear_slope": None,
+            "residual_std": None,
+            "retirement_km": None,
+            "retirement_km_low": None,
+            "retirement_km_high": None,
+            "retirement_date_low": None,
+            "retirement_date_high": None,
+            "computed_at": computed_at,
+        }
+        if status == "sucesso":
+            row.update({
+                "km_per_mm": round(float(batch["km_per_mm"][i]), 2),
+                "total_estimated_km": round(float(batch["total_estimated_km"][i]), 0),
+                "expected_remaining_km": round(float(batch["expected_remaining_km"][i]), 0),
+                "cpk": round(float(batch["cpk"][i]), 4),
+                "wear_percent": round(float(batch["wear_percent"][i]), 1),
+                "estimated_retirement_date": str(batch["estimated_retirement_date"][i]),
+                "wear_model": str(batch["wear_model"][i]),
+            })
+            if row["wear_model"] == "regressao":
+                row.update({
+                    "wear_slope": float(batch["wear_slope"][i]),
+                    "residual_std": round(float(batch["residual_std"][i]), 3),
+                    "retirement_km": round(float(batch["retirement_km"][i]), 0),
+                    "retirement_km_low": round(float(batch["retirement_km_low"][i]), 0),
+                    "retirement_km_high": round(float(batch["retirement_km_high"][i]), 0),
+                    "retirement_date_low": str(batch["retirement_date_low"][i]),
+                    "retirement_date_high": str(batch["retirement_date_high"][i]),
+                })
+        rows.append(row)
+    return rows
+
+
+def refresh_tenant_predictions(
+    supabase: Client,
+    tenant_id: str,
+    service: Optional[PredictionService] = None,
+) -> Dict[str, int]:
+    """
+    Recalcula os snapshots desatualizados de um tenant.
+
+    Returns:
+        Contadores: pending (pneus recalculados) e upserted (linhas gravadas).
+    """
+    service = service or PredictionService()
+    tire_ids = pending_tire_ids(supabase, tenant_id)
+    if not tire_ids:
+        return {"pending": 0, "upserted": 0}
+
+    history = load_inspection_columns(supabase, tire_ids)
+    tires = load_tire_columns(supabase, tire_ids)
+    batch = service.batch_tire_metrics(history["columns"], tires)
+
+    # Ignora pneus removidos do inventario entre a deteccao e o calculo
+    known = set(tires["tire_id"])
+    latest = {tire_id: seen for tire_id, seen in history["latest"].items() if tire_id in known}
+    rows = build_snapshot_rows(tenant_id, batch, latest)
+
+    for chunk in chunks(rows, UPSERT_CHUNK_SIZE):
+        supabase.table("tire_predictions").upsert(chunk, on_conflict="tire_id").execute()
+
+    logger.info(f"Snapshots atualizados para tenant {tenant_id}: {len(rows)} de {len(tire_ids)} pendentes")
+    return {"pending": len(tire_ids), "upserted": len(rows)}
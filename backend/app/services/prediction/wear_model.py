@@ -0,0 +1,140 @@
+"""
+Modelo de desgaste por minimos quadrados (sulco x km).
+
+Ajusta uma reta sobre todo o historico de inspecoes de cada pneu, em vez de usar
+apenas o primeiro e o ultimo ponto, e estima o km em que o sulco atinge o limite
+com intervalo de confianca (regressao inversa, 95%).
+
+Ha duas implementacoes com as mesmas operacoes de ponto flutuante, na mesma ordem:
+`fit_line` (Python puro, um pneu) e `fit_lines` (NumPy, frota inteira). Por isso
+o caminho individual e o em lote produzem resultados identicos.
+"""
+
+from typing import Dict, List, Optional
+import math
+
+import numpy as np
+
+# Minimo de pontos para a regressao (com 2 pontos nao ha erro residual)
+MIN_REGRESSION_POINTS = 3
+
+# Quantis 97,5% da t de Student (IC bilateral de 95%) por graus de liberdade
+_T_975 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+
+def t_critical(df: int) -> float:
+    """Valor critico t (95% bilateral) para df graus de liberdade."""
+    if df <= len(_T_975):
+        return _T_975[df - 1]
+    if df <= 40:
+        return 2.021
+    if df <= 60:
+        return 2.000
+    if df <= 120:
+        return 1.980
+    return 1.960
+
+
+# Tabela vetorizavel de t_critical (df 1..121; acima disso o valor e constante)
+_T_LOOKUP = np.array([t_critical(df) for df in range(1, 122)])
+
+
+def fit_line(kms: List[float], treads: List[float], min_tread: float) -> Optional[Dict[str, float]]:
+    """
+    Ajusta sulco = intercept + slope * km para um pneu.
+
+    Returns:
+        Dict com slope, intercept, residual_std, retirement_km e os limites do IC
+        (retirement_km_low/high), ou None se nao houver pontos/variacao suficientes.
+    """
+    n = len(kms)
+    if n < MIN_REGRESSION_POINTS:
+        return None
+
+    # Somas sequenciais explicitas (sum() usa soma compensada no Python 3.12+)
+    total_x = 0.0
+    total_y = 0.0
+    for x, y in zip(kms, treads):
+        total_x += x
+        total_y += y
+    mean_x = total_x / n
+    mean_y = total_y / n
+
+    sxx = 0.0
+    sxy = 0.0
+    for x, y in zip(kms, treads):
+        dx = x - mean_x
+        sxx += dx * dx
+        sxy += dx * (y - mean_y)
+    if sxx <= 0:
+        return None
+
+    slope = sxy / sxx
+    intercept = mean_y - slope * mean_x
+
+    sse = 0.0
+    for x, y in zip(kms, treads):
+        residual = y - (intercept + slope * x)
+        sse += residual * residual
+    residual_std = math.sqrt(sse / (n - 2))
+
+    fit = {"points": n, "slope": slope, "intercept": intercept, "residual_std": residual_std,
+           "retirement_km": math.nan, "retirement_km_low": math.nan, "retirement_km_high": math.nan}
+    if slope < 0:
+        retirement_km = (min_tread - intercept) / slope
+        dx0 = retirement_km - mean_x
+        margin = t_critical(n - 2) * residual_std / -slope * math.sqrt(1 / n + dx0 * dx0 / sxx)
+        fit.update({
+            "retirement_km": retirement_km,
+            "retirement_km_low": retirement_km - margin,
+            "retirement_km_high": retirement_km + margin,
+        })
+    return fit
+
+
+def fit_lines(codes: np.ndarray, kms: np.ndarray, treads: np.ndarray, n_groups: int, min_tread: float) -> Dict[str, np.ndarray]:
+    """
+    Versao em lote de fit_line: uma regressao por grupo (pneu) em uma passada.
+
+    codes: indice do grupo de cada ponto; os pontos devem vir na mesma ordem usada
+    pelo caminho individual (por pneu e data) para que as somas coincidam.
+
+    Retorna arrays por grupo: points, slope, intercept, residual_std, retirement_km,
+    retirement_km_low, retirement_km_high (NaN onde nao ha ajuste).
+    """
+    points = np.bincount(codes, minlength=n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_x = np.bincount(codes, kms, minlength=n_groups) / points
+        mean_y = np.bincount(codes, treads, minlength=n_groups) / points
+
+        dx = kms - mean_x[codes]
+        sxx = np.bincount(codes, dx * dx, minlength=n_groups)
+        sxy = np.bincount(codes, dx * (treads - mean_y[codes]), minlength=n_groups)
+
+        fitted = (points >= MIN_REGRESSION_POINTS) & (sxx > 0)
+        slope = np.where(fitted, sxy / sxx, np.nan)
+        intercept = mean_y - slope * mean_x
+
+        residual = treads - (intercept[codes] + slope[codes] * kms)
+        sse = np.bincount(codes, residual * residual, minlength=n_groups)
+        residual_std = np.where(fitted, np.sqrt(sse / (points - 2)), np.nan)
+
+        declining = fitted & (slope < 0)
+        retirement_km = np.where(declining, (min_tread - intercept) / slope, np.nan)
+        dx0 = retirement_km - mean_x
+        t_values = _T_LOOKUP[np.clip(points - 2, 1, len(_T_LOOKUP)) - 1]
+        margin = t_values * residual_std / -slope * np.sqrt(1 / points + dx0 * dx0 / sxx)
+
+    return {
+        "points": points,
+        "slope": slope,
+        "intercept": np.where(fitted, intercept, np.nan),
+        "residual_std": residual_std,
+        "retirement_km": retirement_km,
+        "retirement_km_low": np.where(declining, retirement_km - margin, np.nan),
+        "retirement_km_high": np.where(declining, retirement_km + margin, np.nan),
+    }
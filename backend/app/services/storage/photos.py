@@ -0,0 +1,141 @@
+"""
+Armazenamento de fotos de avaria: cache de analise, pre-processamento e upload.
+
+Duas entradas para o mesmo fluxo:
+    - store_photo: bytes recebidos pela API (multipart);
+    - ingest_uploaded_photo: foto enviada pelo app direto ao R2 com URL assinada
+      (presigned_photo_upload), processada no worker Celery - os bytes nao passam
+      pelos nos da API.
+Chaves: inspections/{tenant}/{pneu}/{uuid}.jpg e _thumb.jpg; o original enviado
+direto fica em {uuid}_original ate ser processado e e removido em seguida.
+"""
+
+from typing import Any, BinaryIO, Dict, Union
+import asyncio
+import re
+import tempfile
+import uuid
+
+from app.core.config import get_settings
+from app.core.database import run_sync
+from app.core.uploads import UPLOAD_CHUNK_SIZE
+from app.services.ai.vision_cache import VisionResultCache, content_hash
+from app.services.storage.images import InvalidImageError, prepare_photo_async
+from app.services.storage.r2 import R2Service
+
+# Tipos aceitos no upload direto (os que o Pillow decodifica sem plugins)
+UPLOAD_CONTENT_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+ORIGINAL_SUFFIX = "_original"
+
+
+class PhotoUploadError(ValueError):
+    """Upload direto ausente, fora do escopo do pneu ou acima do limite."""
+
+
+def photo_key_base(tenant_id: str, tire_id: str) -> str:
+    return f"inspections/{tenant_id}/{tire_id}/{uuid.uuid4()}"
+
+
+def _original_key_pattern(tenant_id: str, tire_id: str) -> re.Pattern:
+    return re.compile(
+        rf"^inspections/{re.escape(tenant_id)}/{re.escape(tire_id)}/[0-9a-f\-]{{36}}{ORIGINAL_SUFFIX}$"
+    )
+
+
+async def presigned_photo_upload(tenant_id: str, tire_id: str, content_type: str) -> Dict[str, Any]:
+    """URL PUT assinada para uma nova foto do pneu (chave escopada por tenant/pneu)."""
+    settings = get_settings()
+    object_key = f"{photo_key_base(tenant_id, tire_id)}{ORIGINAL_SUFFIX}"
+    upload_url = await R2Service().presigned_upload_url(object_key, content_type, settings.R2_PRESIGN_EXPIRES)
+    return {
+        "object_key": object_key,
+        "upload_url": upload_url,
+        "method": "PUT",
+        "headers": {"Content-Type": content_type},
+        "expires_in": settings.R2_PRESIGN_EXPIRES,
+        "max_bytes": settings.PHOTO_MAX_BYTES,
+    }
+
+
+async def check_uploaded_photo(tenant_id: str, tire_id: str, object_key: str) -> int:
+    """Valida escopo, existencia e tamanho de uma foto enviada direto. Retorna o tamanho."""
+    if not _original_key_pattern(tenant_id, tire_id).match(object_key):
+        raise PhotoUploadError("object_key não pertence a este tenant/pneu")
+    size = await R2Service().file_size(object_key)
+    if size is None:
+        raise PhotoUploadError("Foto não encontrada no storage (upload não concluído?)")
+    if size > get_settings().PHOTO_MAX_BYTES:
+        await R2Service().delete_file(object_key)
+        raise PhotoUploadError("Foto acima do tamanho máximo")
+    return size
+
+
+async def store_photo(
+    tenant_id: str,
+    tire_id: str,
+    key_base: str,
+    content: Union[bytes, BinaryIO],
+) -> Dict[str, Any]:
+    """
+    Reaproveita a analise de uma foto igual/parecida ou pre-processa e envia ao R2.
+    content: bytes ou arquivo binario (lido em streaming: hash e decoder).
+
+    Returns:
+        photo_url, thumbnail_url, cached (entrada do VisionResultCache ou None) e
+        cache_key (para a task gravar a analise; None quando veio do cache).
+
+    Raises:
+        InvalidImageError: conteudo nao e uma imagem suportada.
+    """
+    vision_cache = VisionResultCache()
+    sha256 = await asyncio.to_thread(content_hash, content)
+    cached = await run_sync(vision_cache.get_exact, tenant_id, sha256)
+
+    if cached is None:
+        photo = await prepare_photo_async(content)
+        cached = await run_sync(vision_cache.get_similar, tenant_id, tire_id, photo["dhash"])
+
+    if cached is not None:
+        return {
+            "photo_url": cached["photo_url"],
+            "thumbnail_url": cached.get("thumbnail_url"),
+            "cached": cached,
+            "cache_key": None,
+        }
+
+    storage = R2Service()
+    photo_url, thumbnail_url = await asyncio.gather(
+        storage.upload_file(photo["image"], f"{key_base}.jpg", photo["content_type"]),
+        storage.upload_file(photo["thumbnail"], f"{key_base}_thumb.jpg", photo["content_type"]),
+    )
+    return {
+        "photo_url": photo_url,
+        "thumbnail_url": thumbnail_url,
+        "cached": None,
+        "cache_key": {
+            "tenant_id": tenant_id,
+            "tire_id": tire_id,
+            "sha256": sha256,
+            "dhash": photo["dhash"],
+            "thumbnail_url": thumbnail_url,
+        },
+        "original_bytes": photo["original_bytes"],
+        "processed_bytes": photo["processed_bytes"],
+        "width": photo["width"],
+        "height": photo["height"],
+    }
+
+
+async def ingest_uploaded_photo(tenant_id: str, tire_id: str, object_key: str) -> Dict[str, Any]:
+    """store_photo sobre uma foto enviada direto ao R2; remove o original depois."""
+    storage = R2Service()
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_CHUNK_SIZE) as content:
+        await storage.download_file(object_key, content)
+        try:
+            result = await store_photo(tenant_id, tire_id, object_key[:-len(ORIGINAL_SUFFIX)], content)
+        except InvalidImageError:
+            await storage.delete_file(object_key)
+            raise
+    await storage.delete_file(object_key)
+    return result
@@ -1,72 +1,258 @@
+"""
+Cloudflare R2 (S3-compatible) para fotos de inspecoes e avarias.
+
+Um unico cliente boto3 por processo (pool HTTP com R2_MAX_POOL_CONNECTIONS
+conexoes reaproveitadas), reconstruido quando os secrets do R2 mudam: cada uso
+consulta o cache do secrets_manager (sem I/O dentro do TTL), entao uma rotacao
+via set_secret vale neste processo na hora e nos demais quando o TTL expira. As chamadas do boto3
+sao bloqueantes: uploads e deletes rodam em um pool de threads limitado
+(R2_MAX_WORKERS), fora do event loop. Latencia e bytes de upload ficam em
+upload_metrics() (exposto em /health/detailed).
+
+Uploads diretos do app: presigned_upload_url() gera uma URL PUT de curta duracao
+para uma chave; os bytes vao do aparelho direto ao bucket, sem passar pela API.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, Optional, Union
+import asyncio
+import io
+import logging
+import threading
+import time
+
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from app.core.config import get_settings
 from app.core.secrets import secrets_manager
-from typing import Optional
-import logging
+from app.core.uploads import file_size
 
 logger = logging.getLogger(__name__)
 
-class R2Service:
+# Amostras de latencia mantidas para os percentis
+LATENCY_WINDOW = 1000
+
+# Secrets do R2 lidos do system_config (ordem usada em _client_secrets)
+R2_SECRET_KEYS = (
+    "R2_ENDPOINT", "R2_ACCESS_KEY_ID", "R2_SECRET_ACCESS_KEY", "R2_BUCKET_NAME", "R2_PUBLIC_URL",
+)
+
+_client = None
+_client_secrets: Optional[Dict[str, str]] = None
+_bucket_name: Optional[str] = None
+_public_url: Optional[str] = None
+_client_lock = asyncio.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class UploadMetrics:
+    """Contadores de upload (thread-safe: registrados pelas threads do pool)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.errors = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, size: int, seconds: float, ok: bool) -> None:
+        with self._lock:
+            if not ok:
+                self.errors += 1
+                return
+            self.uploads += 1
+            self.bytes += size
+            self.seconds += seconds
+            self._latencies.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            uploads, errors, total_bytes, seconds = self.uploads, self.errors, self.bytes, self.seconds
+
+        def percentile(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+
+        return {
+            "uploads": uploads,
+            "errors": errors,
+            "bytes": total_bytes,
+            "avg_ms": round(seconds / uploads * 1000, 1) if uploads else None,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+            "throughput_mib_s": round(total_bytes / seconds / 2 ** 20, 2) if seconds else None,
+        }
+
+
+_metrics = UploadMetrics()
+
+
+def upload_metrics() -> Dict[str, Any]:
+    """Metricas de upload do processo desde o startup."""
+    return _metrics.snapshot()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Pool dedicado ao R2 (nao disputa threads com as queries do Supabase)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().R2_MAX_WORKERS,
+            thread_name_prefix="r2",
+        )
+    return _executor
+
+
+async def _get_client():
     """
-    Servico para interacao com Cloudflare R2 (S3-compatible).
-    Utilizado para armazenamento de fotos de inspecoes e avarias.
-    Recupera secrets do SecretsManager.
+    Cliente compartilhado, criado com os secrets do banco e recriado (sob o lock)
+    quando eles mudam. Se o banco falhar na revalidacao, segue com o cliente atual.
     """
-    
-    def __init__(self):
-        self._s3_client = None
-        self._public_url = None
-        self._bucket_name = None
+    global _client, _client_secrets, _bucket_name, _public_url
+    try:
+        secrets = await secrets_manager.get_secrets(R2_SECRET_KEYS)
+    except Exception as e:
+        if _client is not None:
+            logger.warning(f"Falha ao revalidar secrets do R2, mantendo o cliente atual: {str(e)}")
+            return _client
+        logger.error(f"Erro ao configurar R2Service: {str(e)}")
+        raise ValueError(f"Configuracao do R2 incompleta: {str(e)}")
 
-    async def _get_client(self):
-        """Inicializacao assincrona do cliente S3 com secrets do banco."""
-        if self._s3_client:
-            return self._s3_client
+    if _client is not None and secrets == _client_secrets:
+        return _client
 
+    async with _client_lock:
+        if _client is not None and secrets == _client_secrets:
+            return _client
         try:
-            endpoint_url = await secrets_manager.get_secret("R2_ENDPOINT")
-            access_key_id = await secrets_manager.get_secret("R2_ACCESS_KEY_ID")
-            secret_access_key = await secrets_manager.get_secret("R2_SECRET_ACCESS_KEY")
-            self._bucket_name = await secrets_manager.get_secret("R2_BUCKET_NAME")
-            self._public_url = await secrets_manager.get_secret("R2_PUBLIC_URL")
-
-            self._s3_client = boto3.client(
+            settings = get_settings()
+            client = boto3.client(
                 's3',
-                endpoint_url=endpoint_url,
-                aws_access_key_id=access_key_id,
-                aws_secret_access_key=secret_access_key,
-                config=Config(signature_version='s3v4'),
+                endpoint_url=secrets["R2_ENDPOINT"],
+                aws_access_key_id=secrets["R2_ACCESS_KEY_ID"],
+                aws_secret_access_key=secrets["R2_SECRET_ACCESS_KEY"],
+                config=Config(
+                    signature_version='s3v4',
+                    max_pool_connections=settings.R2_MAX_POOL_CONNECTIONS,
+                    connect_timeout=settings.R2_CONNECT_TIMEOUT,
+                    read_timeout=settings.R2_READ_TIMEOUT,
+                    retries={"max_attempts": 3, "mode": "standard"},
+                ),
                 region_name='auto'
             )
-            return self._s3_client
         except Exception as e:
             logger.error(f"Erro ao configurar R2Service: {str(e)}")
             raise ValueError(f"Configuracao do R2 incompleta: {str(e)}")
 
-    async def upload_file(self, file_content: bytes, filename: str, content_type: str) -> str:
+        # O cliente anterior nao e fechado aqui: transferencias em andamento ainda o
+        # usam; suas conexoes sao liberadas quando ele sai de uso
+        rotated = _client is not None
+        _bucket_name, _public_url = secrets["R2_BUCKET_NAME"], secrets["R2_PUBLIC_URL"]
+        _client, _client_secrets = client, secrets
+        if rotated:
+            logger.info("Secrets do R2 alterados: cliente R2 recriado")
+        else:
+            logger.info("Cliente R2 inicializado (pool compartilhado)")
+        return _client
+
+
+def close_r2() -> None:
+    """Finaliza o pool de threads e as conexoes do cliente. Chamado no shutdown da API."""
+    global _client, _client_secrets, _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if _client is not None:
+        _client.close()
+        _client = None
+        _client_secrets = None
+        logger.info("Cliente R2 finalizado")
+
+
+def _transfer_config() -> TransferConfig:
+    """Arquivos maiores que uma parte vao em multipart, lidos parte a parte do arquivo."""
+    chunk = get_settings().R2_MULTIPART_CHUNK_BYTES
+    return TransferConfig(multipart_threshold=chunk, multipart_chunksize=chunk, max_concurrency=4)
+
+
+def _put_object(client, key: str, body: Union[bytes, BinaryIO], content_type: str) -> None:
+    start = time.perf_counter()
+    size = file_size(body)
+    fileobj = io.BytesIO(body) if isinstance(body, (bytes, bytearray)) else body
+    fileobj.seek(0)
+    ok = False
+    try:
+        client.upload_fileobj(
+            fileobj, _bucket_name, key,
+            ExtraArgs={"ContentType": content_type},
+            Config=_transfer_config(),
+        )
+        ok = True
+    finally:
+        _metrics.record(size, time.perf_counter() - start, ok)
+
+
+class R2Service:
+    """
+    Servico para interacao com Cloudflare R2 (S3-compatible).
+    Utilizado para armazenamento de fotos de inspecoes e avarias.
+    Instancias sao leves: todas usam o cliente e o pool do processo.
+    """
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), func, *args)
+
+    async def upload_file(self, file_content: Union[bytes, BinaryIO], filename: str, content_type: str) -> str:
         """
-        Upload de arquivo para o bucket R2.
+        Upload de arquivo para o bucket R2 (bytes ou arquivo binario; arquivos
+        grandes vao em multipart, sem carregar o conteudo inteiro na memoria).
         Retorna a URL publica do arquivo.
         """
-        client = await self._get_client()
-        
-        # boto3.put_object eh sincrono, mas estamos em um contexto async. 
-        # Em producao idealmente rodaríamos em um threadpool se o volume fosse alto.
-        client.put_object(
-            Bucket=self._bucket_name,
-            Key=filename,
-            Body=file_content,
-            ContentType=content_type
+        client = await _get_client()
+        await self._run(_put_object, client, filename, file_content, content_type)
+        return f"{_public_url}/{filename}"
+
+    async def presigned_upload_url(self, filename: str, content_type: str, expires_in: int) -> str:
+        """
+        URL PUT assinada para enviar um arquivo direto ao bucket, valida por
+        expires_in segundos. O envio precisa usar o mesmo Content-Type.
+        Assinatura local (sem chamada de rede).
+        """
+        client = await _get_client()
+        return client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": _bucket_name, "Key": filename, "ContentType": content_type},
+            ExpiresIn=expires_in,
         )
-        
-        return f"{self._public_url}/{filename}"
+
+    async def file_size(self, filename: str) -> Optional[int]:
+        """Tamanho do arquivo no bucket em bytes, ou None se nao existir."""
+        client = await _get_client()
+        try:
+            head = await self._run(lambda: client.head_object(Bucket=_bucket_name, Key=filename))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return head["ContentLength"]
+
+    async def download_file(self, filename: str, fileobj: BinaryIO) -> None:
+        """Grava o conteudo de um arquivo do bucket em fileobj (download em partes)."""
+        client = await _get_client()
+        await self._run(lambda: client.download_fileobj(_bucket_name, filename, fileobj, Config=_transfer_config()))
 
     async def delete_file(self, filename: str):
         """
         Remove arquivo do bucket R2.
         """
-        client = await self._get_client()
-        client.delete_object(
-            Bucket=self._bucket_name,
-            Key=filename
-        )
+        client = await _get_client()
+        await self._run(lambda: client.delete_object(Bucket=_bucket_name, Key=filename))
@@ -1,6 +1,9 @@
 from celery import Celery
 from celery.schedules import crontab
 from app.core.config import settings
+from app.core.database import get_supabase
+import asyncio
+from datetime import datetime, timezone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,6 +34,16 @@ celery_app.conf.beat_schedule = {
         "task": "tasks.update_all_predictions",
         "schedule": crontab(hour=2, minute=0),
     },
+    # Incorporar pneus descartados aos benchmarks de marca/modelo às 3h
+    "update-brand-benchmarks-daily": {
+        "task": "tasks.update_all_brand_benchmarks",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    # Previsão mensal de descartes/compras às 4h (após os snapshots de predição)
+    "update-retirement-forecasts-daily": {
+        "task": "tasks.update_all_retirement_forecasts",
+        "schedule": crontab(hour=4, minute=0),
+    },
     # Verificar alertas de sulco crítico a cada 6 horas
     "check-critical-tires": {
         "task": "tasks.check_critical_tires",
@@ -42,12 +55,15 @@ celery_app.conf.beat_schedule = {
 @celery_app.task(name="tasks.update_tire_predictions")
 def update_tire_predictions(tenant_id: str):
     """
-    Task de background para recalcular as predicoes de todos os pneus de um tenant.
+    Task de background para recalcular as predicoes de um tenant.
+    Incremental: so pneus com inspecoes novas desde o ultimo snapshot (tire_predictions).
     """
+    from app.services.prediction.snapshots import refresh_tenant_predictions
+
     try:
         logger.info(f"Recalculando predicoes para o tenant: {tenant_id}")
-        # TODO: Implementar lógica real de predição
-        return {"status": "success", "tenant_id": tenant_id}
+        counts = refresh_tenant_predictions(get_supabase(), tenant_id)
+        return {"status": "success", "tenant_id": tenant_id, **counts}
     except Exception as e:
         logger.error(f"Erro ao recalcular predicoes: {e}")
         raise
@@ -59,11 +75,9 @@ def update_all_predictions():
     Task periódica que atualiza predições de todos os tenants.
     Executada pelo Celery Beat diariamente.
     """
-    from supabase import create_client
-    
     try:
         logger.info("Iniciando atualização de predições para todos tenants")
-        supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+        supabase = get_supabase()
         
         # Buscar todos os tenants ativos
         tenants = supabase.table("tenants").select("id").eq("status", "active").execute()
@@ -86,11 +100,9 @@ def check_critical_tires():
     Verifica pneus com sulco crítico (<2mm) e envia alertas.
     Executada pelo Celery Beat a cada 6 horas.
     """
-    from supabase import create_client
-    
     try:
         logger.info("Verificando pneus com sulco crítico")
-        supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+        supabase = get_supabase()
         
         # Buscar pneus críticos
         critical = supabase.table("tire_inventory")\
@@ -107,3 +119,172 @@ def check_critical_tires():
         logger.error(f"Erro ao verificar pneus críticos: {e}")
         raise
 
+
+@celery_app.task(name="tasks.rebuild_wear_rollups")
+def rebuild_wear_rollups(tenant_id: str = None):
+    """
+    Reconstroi os rollups mensais de desgaste (wear_monthly_rollups).
+    O trigger em inspection_details mantem os rollups no dia a dia; esta task
+    serve para backfill inicial ou correcao apos exclusao de inspecoes.
+    """
+    try:
+        logger.info(f"Reconstruindo rollups de desgaste (tenant: {tenant_id or 'todos'})")
+        supabase = get_supabase()
+        result = supabase.rpc("rebuild_wear_rollups", {"p_tenant_id": tenant_id}).execute()
+        return {"status": "success", "tenant_id": tenant_id, "rows": result.data}
+    except Exception as e:
+        logger.error(f"Erro ao reconstruir rollups de desgaste: {e}")
+        raise
+
+
+@celery_app.task(name="tasks.update_brand_benchmarks")
+def update_brand_benchmarks(tenant_id: str):
+    """
+    Incorpora os pneus descartados do tenant aos agregados de brand_benchmarks.
+    Incremental: cada pneu entra uma unica vez.
+    """
+    from app.services.prediction.brand_benchmarks import fold_retired_tires
+
+    try:
+        logger.info(f"Atualizando benchmarks de marca para o tenant: {tenant_id}")
+        counts = fold_retired_tires(get_supabase(), tenant_id)
+        return {"status": "success", "tenant_id": tenant_id, **counts}
+    except Exception as e:
+        logger.error(f"Erro ao atualizar benchmarks de marca: {e}")
+        raise
+
+
+@celery_app.task(name="tasks.update_all_brand_benchmarks")
+def update_all_brand_benchmarks():
+    """
+    Task periódica que agenda a atualização dos benchmarks de todos os tenants.
+    Executada pelo Celery Beat diariamente.
+    """
+    try:
+        supabase = get_supabase()
+        tenants = supabase.table("tenants").select("id").eq("status", "active").execute()
+
+        count = 0
+        for tenant in tenants.data:
+            update_brand_benchmarks.delay(tenant["id"])
+            count += 1
+
+        logger.info(f"Agendada atualização de benchmarks para {count} tenants")
+        return {"status": "success", "tenants_processed": count}
+    except Exception as e:
+        logger.error(f"Erro ao agendar benchmarks de marca: {e}")
+        raise
+
+
+@celery_app.task(name="tasks.update_retirement_forecast")
+def update_retirement_forecast(tenant_id: str, horizon_months: int = 24):
+    """
+    Recalcula a previsão mensal de descartes e gasto de reposição do tenant
+    a partir dos snapshots de predição (retirement_forecasts).
+    """
+    from app.services.prediction.forecast import refresh_tenant_forecast
+
+    try:
+        logger.info(f"Atualizando previsão de descartes para o tenant: {tenant_id}")
+        counts = refresh_tenant_forecast(get_supabase(), tenant_id, horizon_months)
+        return {"status": "success", "tenant_id": tenant_id, **counts}
+    except Exception as e:
+        logger.error(f"Erro ao atualizar previsão de descartes: {e}")
+        raise
+
+
+@celery_app.task(name="tasks.update_all_retirement_forecasts")
+def update_all_retirement_forecasts():
+    """
+    Task periódica que agenda a previsão de descartes de todos os tenants.
+    Executada pelo Celery Beat diariamente.
+    """
+    try:
+        supabase = get_supabase()
+        tenants = supabase.table("tenants").select("id").eq("status", "active").execute()
+
+        count = 0
+        for tenant in tenants.data:
+            update_retirement_forecast.delay(tenant["id"])
+            count += 1
+
+        logger.info(f"Agendada previsão de descartes para {count} tenants")
+        return {"status": "success", "tenants_processed": count}
+    except Exception as e:
+        logger.error(f"Erro ao agendar previsões de descartes: {e}")
+        raise
+
+
+# Rate limit próprio: o default global (10/m) seguraria a fila de análises
+@celery_app.task(name="tasks.analyze_damage_photo", rate_limit="60/m")
+def analyze_damage_photo(detail_id: str, photo_url: str, new_detail: bool = True, cache: dict = None):
+    """
+    Analisa a foto de avaria com IA (OpenRouter Vision) e grava o resultado em
+    inspection_details (ai_analysis, ai_severity, ai_status).
+    Disparada pelo POST /inspections/analyze-damage (job_id = detail_id) ou por
+    process_damage_upload.
+    cache: {tenant_id, tire_id, sha256, dhash, thumbnail_url} para reaproveitar a análise
+    em reenvios da mesma foto (VisionResultCache).
+    """
+    from app.services.ai.vision import VisionAnalysisService, damage_fields
+    from app.services.ai.vision_cache import VisionResultCache
+
+    supabase = get_supabase()
+    try:
+        analysis = asyncio.run(VisionAnalysisService().analyze_tire_photo(photo_url))
+        logger.info(f"Análise IA concluída para {detail_id}: severity={analysis.get('severity')}")
+
+        update = {**damage_fields(analysis, new_detail), "ai_analyzed_at": datetime.now(timezone.utc).isoformat()}
+        supabase.table("inspection_details").update(update).eq("id", detail_id).execute()
+
+        if cache and update["ai_status"] == "concluida":
+            VisionResultCache().store(cache["tenant_id"], cache["sha256"], cache.get("dhash"), {
+                "photo_url": photo_url,
+                "thumbnail_url": cache.get("thumbnail_url"),
+                "analysis": analysis,
+            }, tire_id=cache.get("tire_id"))
+        return {"status": "success", "detail_id": detail_id, "ai_status": update["ai_status"]}
+    except Exception as e:
+        logger.error(f"Erro na análise de avaria {detail_id}: {e}")
+        _mark_damage_error(supabase, detail_id, e)
+        raise
+
+
+@celery_app.task(name="tasks.process_damage_upload", rate_limit="60/m")
+def process_damage_upload(detail_id: str, tenant_id: str, tire_id: str, object_key: str, new_detail: bool = True):
+    """
+    Foto de avaria enviada pelo app direto ao R2 (URL assinada): baixa o original,
+    consulta o cache de análises, pré-processa e grava foto + miniatura, e então
+    agenda analyze_damage_photo. Os bytes da foto não passam pela API.
+    """
+    from app.services.ai.vision import damage_fields
+    from app.services.storage.photos import ingest_uploaded_photo
+
+    supabase = get_supabase()
+    try:
+        photo = asyncio.run(ingest_uploaded_photo(tenant_id, tire_id, object_key))
+        update = {"photo_lateral_url": photo["photo_url"], "photo_thumbnail_url": photo["thumbnail_url"]}
+
+        if photo["cached"] is not None:
+            update.update(damage_fields(photo["cached"]["analysis"], new_detail))
+            update["ai_analyzed_at"] = datetime.now(timezone.utc).isoformat()
+            supabase.table("inspection_details").update(update).eq("id", detail_id).execute()
+            logger.info(f"Análise de avaria {detail_id} reaproveitada do cache")
+            return {"status": "success", "detail_id": detail_id, "ai_status": update["ai_status"], "cached": True}
+
+        supabase.table("inspection_details").update(update).eq("id", detail_id).execute()
+    except Exception as e:
+        logger.error(f"Erro ao processar foto enviada {object_key} ({detail_id}): {e}")
+        _mark_damage_error(supabase, detail_id, e)
+        raise
+
+    analyze_damage_photo.delay(detail_id, photo["photo_url"], new_detail, photo["cache_key"])
+    return {"status": "success", "detail_id": detail_id, "ai_status": "pendente", "cached": False}
+
+
+def _mark_damage_error(supabase, detail_id: str, error: Exception) -> None:
+    supabase.table("inspection_details").update({
+        "ai_status": "erro",
+        "ai_analysis": {"error": str(error), "damages": [], "severity": "erro"},
+        "ai_analyzed_at": datetime.now(timezone.utc).isoformat(),
+    }).eq("id", detail_id).execute()
@@ -0,0 +1,110 @@
+"""
+Benchmark do caminho rapido do PredictionService: tempo de import e custo por chamada.
+
+Compara calculate_tire_metrics (Python puro) com a implementacao anterior baseada
+em pandas (DataFrame + to_datetime + sort_values a cada chamada), e o import do
+modulo do engine com o import do pandas que deixou de acontecer no startup.
+
+Uso (a partir de backend/):
+    python -m benchmarks.engine_fast_path --calls 2000 --points 30
+"""
+
+import argparse
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+
+IMPORT_SNIPPET = (
+    "import sys, time; t = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - t, 'pandas' in sys.modules)"
+)
+
+
+def measure_import(module: str, repeat: int) -> Dict[str, Any]:
+    """Importa o modulo em interpretadores novos e retorna a mediana (ms)."""
+    timings = []
+    pandas_loaded = False
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+        timings.append(float(out[0]) * 1000)
+        pandas_loaded = out[1] == "True"
+    return {"median_ms": statistics.median(timings), "pandas_loaded": pandas_loaded}
+
+
+def make_history(points: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Historico sintetico de um pneu (datas fora de ordem, como vem do banco)."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    km, tread = 0.0, 18.0
+    history = []
+    for i in range(points):
+        km += rng.uniform(3000, 6000)
+        tread -= rng.uniform(0.2, 0.5)
+        history.append({
+            "date": (start + timedelta(days=30 * i)).isoformat(),
+            "km": km,
+            "tread": tread,
+        })
+    rng.shuffle(history)
+    return history
+
+
+def pandas_reference(history: List[Dict[str, Any]], tire_data: Dict[str, Any]) -> float:
+    """Trecho do caminho antigo que dominava o custo por chamada."""
+    import pandas as pd
+
+    df = pd.DataFrame(history)
+    df["date"] = pd.to_datetime(df["date"])
+    df = df.sort_values("date")
+    initial_tread = tire_data.get("initial_tread", df["tread"].iloc[0])
+    return (df["km"].iloc[-1] - df["km"].iloc[0]) / (initial_tread - df["tread"].iloc[-1])
+
+
+def measure_call(fn, calls: int) -> float:
+    """Tempo medio por chamada (microssegundos)."""
+    fn()  # aquecimento
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--points", type=int, default=30)
+    parser.add_argument("--import-repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine_import = measure_import("app.services.prediction.engine", args.import_repeat)
+    pandas_import = measure_import("pandas", args.import_repeat)
+
+    print("== Import (interpretador novo, mediana) ==")
+    print(f"engine: {engine_import['median_ms']:8.1f} ms  (pandas carregado: {engine_import['pandas_loaded']})")
+    print(f"pandas: {pandas_import['median_ms']:8.1f} ms  (evitado no startup)")
+
+    from app.services.prediction.engine import PredictionService
+
+    service = PredictionService()
+    history = make_history(args.points)
+    tire_data = {"cost": 1800.0, "initial_tread": 18.0}
+
+    fast = measure_call(lambda: service.calculate_tire_metrics(history, tire_data), args.calls)
+    reference = measure_call(lambda: pandas_reference(history, tire_data), max(1, args.calls // 10))
+
+    print(f"\n== calculate_tire_metrics ({args.points} inspecoes) ==")
+    print(f"python puro:       {fast:10.1f} us/chamada")
+    print(f"referencia pandas: {reference:10.1f} us/chamada")
+    print(f"ganho:             {reference / fast:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Suite de benchmarks do PredictionService sobre frotas sinteticas.
+
+Mede throughput (pneus/s) e pico de memoria (tracemalloc) de:
+    - calculate_tire_metrics (um pneu por chamada, frota inteira em loop)
+    - batch_tire_metrics e calculate_fleet_metrics (caminho vetorizado)
+    - benchmark_brands
+para 1k/10k/100k pneus, e compara com um baseline salvo. Serve de guarda de
+regressao antes de colocar uma nova versao do engine no job noturno.
+
+Uso (a partir de backend/):
+    python -m benchmarks.engine_suite --save-baseline benchmarks/baselines/engine_suite.json
+    python -m benchmarks.engine_suite --compare benchmarks/baselines/engine_suite.json
+    python -m benchmarks.engine_suite --sizes 1000 10000 --repeat 5 --tolerance 0.3
+
+Sai com codigo 1 se algum caso ficar mais lento (ou usar mais memoria) que o
+baseline alem da tolerancia. Baselines so sao comparaveis no mesmo ambiente: o
+baseline guarda Python (major.minor), numpy, maquina e parametros da frota, e a
+comparacao e recusada (codigo 2) se algum diferir, salvo --allow-env-mismatch.
+Grave o baseline na stack fixada (requirements.txt / Dockerfile).
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.synthetic_fleet import generate_fleet, tire_data, tire_history
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+# Campos de meta que precisam coincidir para a comparacao valer
+ENVIRONMENT_KEYS = ("python", "numpy", "machine", "inspections_per_tire", "noise_mm", "seed")
+
+
+def build_cases(service, fleet: Dict[str, Any]) -> Dict[str, Callable[[], Any]]:
+    """Casos medidos; entradas ja montadas (so o engine entra na medicao)."""
+    tires = len(fleet["tires"]["tire_id"])
+    histories = [tire_history(fleet, i) for i in range(tires)]
+    tire_rows = [tire_data(fleet, i) for i in range(tires)]
+
+    def per_tire() -> None:
+        for history, data in zip(histories, tire_rows):
+            service.calculate_tire_metrics(history, data)
+
+    return {
+        "calculate_tire_metrics": per_tire,
+        "batch_tire_metrics": lambda: service.batch_tire_metrics(fleet["inspections"], fleet["tires"]),
+        "calculate_fleet_metrics": lambda: service.calculate_fleet_metrics(fleet["inspections"], fleet["tires"]),
+        "benchmark_brands": lambda: service.benchmark_brands(fleet["fleet_records"]),
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Melhor tempo entre `repeat` execucoes e pico de memoria de uma execucao extra."""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(timings), "peak_mib": peak / 2 ** 20}
+
+
+def run_suite(sizes: List[int], repeat: int, inspections_per_tire: int, noise_mm: float, seed: int) -> Dict[str, Any]:
+    from app.services.prediction.engine import PredictionService
+
+    service = PredictionService()
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in sizes:
+        fleet = generate_fleet(size, inspections_per_tire=inspections_per_tire, noise_mm=noise_mm, seed=seed)
+        for case, fn in build_cases(service, fleet).items():
+            stats = measure(fn, repeat)
+            stats["tires_per_s"] = size / stats["seconds"]
+            results[f"{case}@{size}"] = stats
+            print(f"{case:<24} {size:>8} pneus  {stats['seconds'] * 1000:10.1f} ms  "
+                  f"{stats['tires_per_s']:12.0f} pneus/s  {stats['peak_mib']:8.1f} MiB")
+        del fleet
+        gc.collect()
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": ".".join(platform.python_version_tuple()[:2]),
+            "numpy": np.__version__,
+            "machine": f"{platform.system()} {platform.machine()}",
+            "inspections_per_tire": inspections_per_tire,
+            "noise_mm": noise_mm,
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def environment_mismatches(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Campos de ambiente/frota em que a execucao atual difere do baseline."""
+    return [
+        f"{key}: baseline={baseline['meta'].get(key)!r} atual={current['meta'].get(key)!r}"
+        for key in ENVIRONMENT_KEYS
+        if baseline["meta"].get(key) != current["meta"].get(key)
+    ]
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Lista as regressoes (throughput menor ou memoria maior que o baseline alem da tolerancia)."""
+    regressions = []
+    print(f"\n== Comparacao com baseline de {baseline['meta'].get('created_at', '?')} (tolerancia {tolerance:.0%}) ==")
+    for key, stats in current["results"].items():
+        reference = baseline["results"].get(key)
+        if reference is None:
+            print(f"{key:<34} sem baseline")
+            continue
+        speed = stats["tires_per_s"] / reference["tires_per_s"]
+        memory = stats["peak_mib"] / reference["peak_mib"] if reference["peak_mib"] else 1.0
+        flags = []
+        if speed < 1 - tolerance:
+            flags.append("LENTO")
+        if memory > 1 + tolerance:
+            flags.append("MEMORIA")
+        print(f"{key:<34} throughput {speed:6.2f}x  memoria {memory:6.2f}x  {' '.join(flags)}")
+        if flags:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--inspections-per-tire", type=int, default=8)
+    parser.add_argument("--noise-mm", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="grava o resultado desta execucao em JSON")
+    parser.add_argument("--save-baseline", help="grava o resultado como novo baseline")
+    parser.add_argument("--compare", help="baseline JSON para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--allow-env-mismatch", action="store_true",
+                        help="compara mesmo com ambiente diferente do baseline (so informativo)")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.sizes, args.repeat, args.inspections_per_tire, args.noise_mm, args.seed)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"Resultado gravado em {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        mismatches = environment_mismatches(current, baseline)
+        if mismatches:
+            print("\nAmbiente diferente do baseline:\n  " + "\n  ".join(mismatches))
+            if not args.allow_env_mismatch:
+                print("Comparacao recusada: grave um baseline neste ambiente (--save-baseline).")
+                return 2
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressao(oes): {', '.join(regressions)}")
+            return 1
+        print("\nSem regressoes.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
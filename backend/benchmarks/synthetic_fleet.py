@@ -0,0 +1,103 @@
+"""
+Gerador de frotas sinteticas para os benchmarks do PredictionService.
+
+Reprodutivel pela seed: cada pneu tem taxa de desgaste propria (variando por
+marca), inspecoes espacadas em km e dias com ruido de medicao no sulco, e datas
+embaralhadas dentro do historico (como chegam do banco).
+"""
+
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+DEFAULT_BRANDS = ("Michelin", "Bridgestone", "Goodyear", "Pirelli", "Continental", "Firestone")
+DEFAULT_MODELS = ("X Multi", "R268", "KMax", "FR85", "HSR2")
+
+
+def generate_fleet(
+    tires: int,
+    inspections_per_tire: int = 8,
+    noise_mm: float = 0.3,
+    brands: Sequence[str] = DEFAULT_BRANDS,
+    models: Sequence[str] = DEFAULT_MODELS,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """
+    Gera uma frota sintetica.
+
+    Args:
+        tires: numero de pneus.
+        inspections_per_tire: media de inspecoes por pneu (Poisson, minimo 1).
+        noise_mm: desvio padrao do ruido de medicao do sulco.
+        brands / models: categorias sorteadas por pneu.
+        seed: semente do gerador.
+
+    Returns:
+        inspections: colunas tire_id, date, km, tread (entrada de batch_tire_metrics)
+        tires: colunas tire_id, cost, initial_tread
+        offsets: inicio do historico de cada pneu nas colunas de inspections
+        fleet_records: registros brand, model, total_km, cpk (entrada de benchmark_brands)
+    """
+    rng = np.random.default_rng(seed)
+    tire_ids = np.array([f"tire-{i:07d}" for i in range(tires)])
+    counts = np.maximum(1, rng.poisson(inspections_per_tire, tires))
+    offsets = np.r_[0, np.cumsum(counts)]
+    total = int(offsets[-1])
+    owner = np.repeat(np.arange(tires), counts)
+    position = np.arange(total) - offsets[owner]
+
+    brand_idx = rng.integers(0, len(brands), tires)
+    model_idx = rng.integers(0, len(models), tires)
+    # Desgaste por pneu (mm a cada 1000 km), com efeito de marca
+    brand_effect = rng.uniform(0.8, 1.2, len(brands))
+    wear_rate = rng.uniform(0.06, 0.14, tires) * brand_effect[brand_idx]
+    initial_tread = rng.choice([16.0, 18.0, 20.0], tires)
+    cost = rng.uniform(1400, 3200, tires).round(2)
+    start_km = rng.uniform(0, 300_000, tires)
+    start_day = rng.integers(0, 365, tires)
+
+    km_step = rng.uniform(3000, 9000, total)
+    km_step[offsets[:-1]] = 0
+    km_run = np.cumsum(km_step)
+    km_run -= np.repeat(km_run[offsets[:-1]], counts)
+    km = start_km[owner] + km_run
+    tread = initial_tread[owner] - wear_rate[owner] * km_run / 1000 + rng.normal(0, noise_mm, total)
+    days = start_day[owner] + position * 30 + rng.integers(0, 10, total)
+    dates = np.datetime64("2023-01-01", "D") + days.astype("timedelta64[D]")
+
+    # Embaralha a ordem dentro de cada pneu (o engine nao pode depender dela)
+    shuffle = np.lexsort((rng.random(total), owner))
+
+    total_km = wear_rate ** -1 * (initial_tread - 3.0) * 1000
+    fleet_records: List[Dict[str, Any]] = [
+        {"brand": brands[b], "model": models[m], "total_km": float(k), "cpk": float(c / k)}
+        for b, m, k, c in zip(brand_idx.tolist(), model_idx.tolist(), total_km.tolist(), cost.tolist())
+    ]
+
+    return {
+        "inspections": {
+            "tire_id": tire_ids[owner][shuffle],
+            "date": np.datetime_as_string(dates[shuffle], unit="s").astype(object) + "Z",
+            "km": km[shuffle].round(1),
+            "tread": np.maximum(tread[shuffle], 0.5).round(2),
+        },
+        "tires": {"tire_id": tire_ids, "cost": cost, "initial_tread": initial_tread},
+        "offsets": offsets,
+        "fleet_records": fleet_records,
+    }
+
+
+def tire_history(fleet: Dict[str, Any], index: int) -> List[Dict[str, Any]]:
+    """Historico de um pneu no formato de calculate_tire_metrics."""
+    inspections = fleet["inspections"]
+    start, end = int(fleet["offsets"][index]), int(fleet["offsets"][index + 1])
+    return [
+        {"date": inspections["date"][i], "km": float(inspections["km"][i]), "tread": float(inspections["tread"][i])}
+        for i in range(start, end)
+    ]
+
+
+def tire_data(fleet: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """Dados de cadastro de um pneu no formato de calculate_tire_metrics."""
+    tires = fleet["tires"]
+    return {"cost": float(tires["cost"][index]), "initial_tread": float(tires["initial_tread"][index])}
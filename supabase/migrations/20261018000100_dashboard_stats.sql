@@ -0,0 +1,53 @@
+-- Estatisticas do dashboard em um unico round trip (GET /api/v1/dashboard/stats).
+-- Os tres contadores de tire_inventory saem de uma unica varredura com FILTER.
+
+create index if not exists idx_tire_inventory_tenant_status
+    on public.tire_inventory (tenant_id, status);
+
+create index if not exists idx_inspection_details_tenant_pressure_alert
+    on public.inspection_details (tenant_id, created_at)
+    where alerta_pressao;
+
+create index if not exists idx_inspections_tenant_created_at
+    on public.inspections (tenant_id, created_at);
+
+create or replace function public.dashboard_stats(p_tenant_id uuid)
+returns json
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    with tires as (
+        select
+            count(*) filter (where status = 'em_uso') as tires_in_use,
+            count(*) filter (where status <> 'descarte') as total_tires,
+            count(*) filter (where status = 'em_uso' and sulco_atual < 3.0) as urgent_replacements
+        from tire_inventory
+        where tenant_id = p_tenant_id
+    )
+    select json_build_object(
+        'tires_in_use', tires.tires_in_use,
+        'total_tires', tires.total_tires,
+        'urgent_replacements', tires.urgent_replacements,
+        'pressure_alerts', (
+            select count(*)
+            from inspection_details
+            where tenant_id = p_tenant_id
+              and alerta_pressao
+              and created_at >= now() - interval '7 days'
+        ),
+        'recent_inspections', (
+            select count(*)
+            from inspections
+            where tenant_id = p_tenant_id
+              and created_at >= now() - interval '30 days'
+        )
+    )
+    from tires;
+$$;
+
+-- Somente o backend (service key) executa: a funcao e security definer e recebe
+-- o tenant do chamador; anon/authenticated nao podem chamar via PostgREST.
+revoke execute on function public.dashboard_stats(uuid) from public, anon, authenticated;
+grant execute on function public.dashboard_stats(uuid) to service_role;
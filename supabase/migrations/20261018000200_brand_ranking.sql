@@ -0,0 +1,45 @@
+-- Ranking de marcas agregado no banco (GET /api/v1/dashboard/brand-ranking).
+-- Retorna apenas o top-N, opcionalmente quebrado por modelo e/ou medida,
+-- evitando trafegar todos os pneus em uso (e o corte de linhas do PostgREST).
+
+create index if not exists idx_tire_inventory_tenant_status_marca
+    on public.tire_inventory (tenant_id, status, marca)
+    include (modelo, medida, sulco_inicial, sulco_atual);
+
+create or replace function public.brand_ranking(
+    p_tenant_id uuid,
+    p_limit integer default 10,
+    p_by_model boolean default false,
+    p_by_size boolean default false
+)
+returns table (
+    marca text,
+    modelo text,
+    medida text,
+    quantidade bigint,
+    vida_media_percent numeric
+)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select
+        coalesce(t.marca, 'Desconhecida') as marca,
+        case when p_by_model then t.modelo end as modelo,
+        case when p_by_size then t.medida end as medida,
+        count(*) as quantidade,
+        round(avg(coalesce(t.sulco_atual, 0) / t.sulco_inicial * 100)::numeric, 1) as vida_media_percent
+    from tire_inventory t
+    where t.tenant_id = p_tenant_id
+      and t.status = 'em_uso'
+      and t.sulco_inicial > 0
+    group by 1, 2, 3
+    order by vida_media_percent desc, quantidade desc
+    limit greatest(p_limit, 1);
+$$;
+
+-- Somente o backend (service key) executa: a funcao e security definer e recebe
+-- o tenant do chamador; anon/authenticated nao podem chamar via PostgREST.
+revoke execute on function public.brand_ranking(uuid, integer, boolean, boolean) from public, anon, authenticated;
+grant execute on function public.brand_ranking(uuid, integer, boolean, boolean) to service_role;
@@ -0,0 +1,56 @@
+-- Snapshot das predicoes por pneu, recalculado incrementalmente pelo job noturno
+-- (tasks.update_tire_predictions). Cada linha guarda a ultima inspection_details
+-- considerada; so pneus com inspecoes mais novas que o snapshot sao recalculados.
+
+create table if not exists public.tire_predictions (
+    tire_id uuid primary key references public.tire_inventory (id) on delete cascade,
+    tenant_id uuid not null references public.tenants (id) on delete cascade,
+    last_inspection_detail_id uuid,
+    last_inspection_at timestamptz not null,
+    status text not null,
+    km_per_mm numeric,
+    total_estimated_km numeric,
+    expected_remaining_km numeric,
+    cpk numeric,
+    wear_percent numeric,
+    estimated_retirement_date date,
+    computed_at timestamptz not null default now()
+);
+
+create index if not exists idx_tire_predictions_tenant
+    on public.tire_predictions (tenant_id);
+
+-- Permite achar a ultima inspecao de cada pneu do tenant com index-only scan
+create index if not exists idx_inspection_details_tenant_tire_created_at
+    on public.inspection_details (tenant_id, tire_id, created_at);
+
+-- Retorna um array (valor unico) para nao sofrer o limite de linhas do PostgREST
+create or replace function public.tires_pending_prediction(p_tenant_id uuid)
+returns uuid[]
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select coalesce(array_agg(latest.tire_id), '{}')
+    from (
+        select d.tire_id, max(d.created_at) as last_at
+        from inspection_details d
+        where d.tenant_id = p_tenant_id
+          and d.tire_id is not null
+        group by d.tire_id
+    ) latest
+    left join tire_predictions p on p.tire_id = latest.tire_id
+    where p.tire_id is null
+       or latest.last_at > p.last_inspection_at;
+$$;
+
+-- Somente o backend (service key) executa: a funcao e security definer e recebe
+-- o tenant do chamador; anon/authenticated nao podem chamar via PostgREST.
+revoke execute on function public.tires_pending_prediction(uuid) from public, anon, authenticated;
+grant execute on function public.tires_pending_prediction(uuid) to service_role;
+
+-- Tabela escrita e lida apenas pelo backend (service key, que ignora RLS):
+-- RLS sem policies bloqueia anon/authenticated via PostgREST.
+alter table public.tire_predictions enable row level security;
+revoke all on table public.tire_predictions from anon, authenticated;
@@ -0,0 +1,247 @@
+-- Rollup mensal de sulco por tenant/marca/posicao (GET /api/v1/predictions/wear-history).
+-- Mantido incrementalmente por trigger de statement em inspection_details (uma
+-- agregacao por INSERT, inclusive em lote; UPDATE/DELETE recalculam os buckets
+-- afetados) e reconstruido por rebuild_wear_rollups.
+-- Medicoes sem sulco (registros so de avaria) nao entram no rollup.
+
+create table if not exists public.wear_monthly_rollups (
+    tenant_id uuid not null references public.tenants (id) on delete cascade,
+    month date not null,
+    marca text not null default '',
+    posicao_veiculo text not null default '',
+    sulco_sum numeric not null default 0,
+    sulco_count bigint not null default 0,
+    sulco_min numeric,
+    sulco_max numeric,
+    primary key (tenant_id, month, marca, posicao_veiculo)
+);
+
+create or replace function public.apply_wear_rollups()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into wear_monthly_rollups as r (
+        tenant_id, month, marca, posicao_veiculo,
+        sulco_sum, sulco_count, sulco_min, sulco_max
+    )
+    select
+        n.tenant_id,
+        date_trunc('month', n.created_at at time zone 'UTC')::date,
+        coalesce(t.marca, ''),
+        coalesce(n.posicao_veiculo, ''),
+        sum(n.sulco_medio),
+        count(*),
+        min(n.sulco_medio),
+        max(n.sulco_medio)
+    from new_rows n
+    left join tire_inventory t on t.id = n.tire_id
+    where n.sulco_medio > 0
+    group by 1, 2, 3, 4
+    on conflict (tenant_id, month, marca, posicao_veiculo) do update set
+        sulco_sum = r.sulco_sum + excluded.sulco_sum,
+        sulco_count = r.sulco_count + excluded.sulco_count,
+        sulco_min = least(r.sulco_min, excluded.sulco_min),
+        sulco_max = greatest(r.sulco_max, excluded.sulco_max);
+    return null;
+end;
+$$;
+
+drop trigger if exists trg_inspection_details_wear_rollups on public.inspection_details;
+create trigger trg_inspection_details_wear_rollups
+    after insert on public.inspection_details
+    referencing new table as new_rows
+    for each statement
+    execute function public.apply_wear_rollups();
+
+-- Correcoes (UPDATE de sulco/posicao/pneu/data) e remocoes: recalcula a partir de
+-- inspection_details so os buckets (tenant, mes, marca, posicao) afetados, antes e
+-- depois da alteracao. UPDATE so de outras colunas (ex.: analise de avaria) nao
+-- muda nenhum bucket (transition tables nao aceitam lista de colunas no trigger).
+create or replace function public.refresh_wear_rollups()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_keys jsonb;
+begin
+    if tg_op = 'UPDATE' then
+        select jsonb_agg(k) into v_keys
+        from (
+            select jsonb_build_object(
+                'tenant_id', r.tenant_id,
+                'month', date_trunc('month', r.created_at at time zone 'UTC')::date,
+                'marca', coalesce(t.marca, ''),
+                'posicao_veiculo', coalesce(r.posicao_veiculo, '')
+            ) as k
+            from old_rows o
+            join new_rows n on n.id = o.id
+            cross join lateral (values
+                (o.tenant_id, o.created_at, o.tire_id, o.posicao_veiculo, o.sulco_medio),
+                (n.tenant_id, n.created_at, n.tire_id, n.posicao_veiculo, n.sulco_medio)
+            ) as r(tenant_id, created_at, tire_id, posicao_veiculo, sulco_medio)
+            left join tire_inventory t on t.id = r.tire_id
+            where (o.tenant_id, o.created_at, o.tire_id, o.posicao_veiculo, o.sulco_medio)
+                  is distinct from (n.tenant_id, n.created_at, n.tire_id, n.posicao_veiculo, n.sulco_medio)
+              and r.sulco_medio > 0
+        ) changed;
+    else
+        select jsonb_agg(jsonb_build_object(
+            'tenant_id', o.tenant_id,
+            'month', date_trunc('month', o.created_at at time zone 'UTC')::date,
+            'marca', coalesce(t.marca, ''),
+            'posicao_veiculo', coalesce(o.posicao_veiculo, '')
+        )) into v_keys
+        from old_rows o
+        left join tire_inventory t on t.id = o.tire_id
+        where o.sulco_medio > 0;
+    end if;
+
+    if v_keys is null then
+        return null;
+    end if;
+
+    delete from wear_monthly_rollups r
+    using (
+        select distinct k.tenant_id, k.month, k.marca, k.posicao_veiculo
+        from jsonb_to_recordset(v_keys) as k(tenant_id uuid, month date, marca text, posicao_veiculo text)
+    ) k
+    where r.tenant_id = k.tenant_id
+      and r.month = k.month
+      and r.marca = k.marca
+      and r.posicao_veiculo = k.posicao_veiculo;
+
+    -- Faixa do mes por tenant: idx_inspection_details_tenant_created_at_id
+    insert into wear_monthly_rollups (
+        tenant_id, month, marca, posicao_veiculo,
+        sulco_sum, sulco_count, sulco_min, sulco_max
+    )
+    select
+        k.tenant_id, k.month, k.marca, k.posicao_veiculo,
+        sum(d.sulco_medio),
+        count(*),
+        min(d.sulco_medio),
+        max(d.sulco_medio)
+    from (
+        select distinct k.tenant_id, k.month, k.marca, k.posicao_veiculo
+        from jsonb_to_recordset(v_keys) as k(tenant_id uuid, month date, marca text, posicao_veiculo text)
+    ) k
+    join inspection_details d
+        on d.tenant_id = k.tenant_id
+       and d.created_at >= (k.month::timestamp at time zone 'UTC')
+       and d.created_at < ((k.month + interval '1 month')::timestamp at time zone 'UTC')
+       and coalesce(d.posicao_veiculo, '') = k.posicao_veiculo
+    left join tire_inventory t on t.id = d.tire_id
+    where d.sulco_medio > 0
+      and coalesce(t.marca, '') = k.marca
+    group by 1, 2, 3, 4;
+
+    return null;
+end;
+$$;
+
+drop trigger if exists trg_inspection_details_wear_rollups_update on public.inspection_details;
+create trigger trg_inspection_details_wear_rollups_update
+    after update on public.inspection_details
+    referencing old table as old_rows new table as new_rows
+    for each statement
+    execute function public.refresh_wear_rollups();
+
+drop trigger if exists trg_inspection_details_wear_rollups_delete on public.inspection_details;
+create trigger trg_inspection_details_wear_rollups_delete
+    after delete on public.inspection_details
+    referencing old table as old_rows
+    for each statement
+    execute function public.refresh_wear_rollups();
+
+-- Backfill: recalcula os rollups de um tenant (ou de todos, se p_tenant_id for null)
+create or replace function public.rebuild_wear_rollups(p_tenant_id uuid default null)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_rows integer;
+begin
+    delete from wear_monthly_rollups
+    where p_tenant_id is null or tenant_id = p_tenant_id;
+
+    insert into wear_monthly_rollups (
+        tenant_id, month, marca, posicao_veiculo,
+        sulco_sum, sulco_count, sulco_min, sulco_max
+    )
+    select
+        d.tenant_id,
+        date_trunc('month', d.created_at at time zone 'UTC')::date,
+        coalesce(t.marca, ''),
+        coalesce(d.posicao_veiculo, ''),
+        sum(d.sulco_medio),
+        count(*),
+        min(d.sulco_medio),
+        max(d.sulco_medio)
+    from inspection_details d
+    left join tire_inventory t on t.id = d.tire_id
+    where d.sulco_medio > 0
+      and (p_tenant_id is null or d.tenant_id = p_tenant_id)
+    group by 1, 2, 3, 4;
+
+    get diagnostics v_rows = row_count;
+    return v_rows;
+end;
+$$;
+
+-- Serie mensal ja somada (opcionalmente filtrada por marca/posicao): poucas linhas
+create or replace function public.wear_history(
+    p_tenant_id uuid,
+    p_since date,
+    p_marca text default null,
+    p_posicao text default null
+)
+returns table (
+    month date,
+    sulco_sum numeric,
+    sulco_count bigint,
+    sulco_min numeric,
+    sulco_max numeric
+)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select
+        r.month,
+        sum(r.sulco_sum),
+        sum(r.sulco_count)::bigint,
+        min(r.sulco_min),
+        max(r.sulco_max)
+    from wear_monthly_rollups r
+    where r.tenant_id = p_tenant_id
+      and r.month >= date_trunc('month', p_since)::date
+      and (p_marca is null or r.marca = p_marca)
+      and (p_posicao is null or r.posicao_veiculo = p_posicao)
+    group by r.month
+    order by r.month;
+$$;
+
+-- Somente o backend (service key) executa: a funcao e security definer e recebe
+-- o tenant do chamador; anon/authenticated nao podem chamar via PostgREST.
+revoke execute on function public.apply_wear_rollups() from public, anon, authenticated;
+grant execute on function public.apply_wear_rollups() to service_role;
+revoke execute on function public.refresh_wear_rollups() from public, anon, authenticated;
+grant execute on function public.refresh_wear_rollups() to service_role;
+revoke execute on function public.rebuild_wear_rollups(uuid) from public, anon, authenticated;
+grant execute on function public.rebuild_wear_rollups(uuid) to service_role;
+revoke execute on function public.wear_history(uuid, date, text, text) from public, anon, authenticated;
+grant execute on function public.wear_history(uuid, date, text, text) to service_role;
+
+-- Tabela mantida pelas funcoes security definer e lida apenas pelo backend
+-- (service key, que ignora RLS):
+-- RLS sem policies bloqueia anon/authenticated via PostgREST.
+alter table public.wear_monthly_rollups enable row level security;
+revoke all on table public.wear_monthly_rollups from anon, authenticated;
@@ -0,0 +1,6 @@
+-- Indice de urgencia: pneus do tenant ordenados pela data prevista de troca
+-- (GET /api/v1/predictions/tire-lifecycle). Top-N/paginacao viram um range scan.
+
+create index if not exists idx_tire_predictions_tenant_urgency
+    on public.tire_predictions (tenant_id, estimated_retirement_date, tire_id)
+    where status = 'sucesso';
@@ -0,0 +1,20 @@
+-- Modelo de desgaste por regressao (sulco x km sobre todo o historico do pneu):
+-- inclinacao, erro residual e intervalo de confianca (95%) do km/data de troca.
+-- Colunas nulas quando a predicao usa apenas primeira/ultima inspecao ('pontas').
+
+alter table public.tire_predictions
+    add column if not exists wear_model text,
+    add column if not exists wear_points integer,
+    add column if not exists wear_slope numeric,
+    add column if not exists residual_std numeric,
+    add column if not exists retirement_km numeric,
+    add column if not exists retirement_km_low numeric,
+    add column if not exists retirement_km_high numeric,
+    add column if not exists retirement_date_low date,
+    add column if not exists retirement_date_high date;
+
+-- Forca o recalculo dos snapshots existentes no proximo job noturno
+-- (tires_pending_prediction compara com last_inspection_at)
+update public.tire_predictions
+set last_inspection_at = '-infinity'
+where wear_model is null;
@@ -0,0 +1,149 @@
+-- Benchmarks de marca/modelo mantidos como agregados incrementais
+-- (services/prediction/brand_benchmarks.py). Cada pneu descartado entra uma unica
+-- vez: contagem, media e M2 (soma dos quadrados dos desvios) de total_km e CPK,
+-- mais sketches de quantis (buckets logaritmicos) para p10/p50/p90.
+-- Todos os campos sao mesclaveis entre tenants (benchmark de mercado anonimizado).
+
+create table if not exists public.brand_benchmarks (
+    tenant_id uuid not null references public.tenants (id) on delete cascade,
+    marca text not null,
+    modelo text not null,
+    tire_count bigint not null default 0,
+    total_km_mean double precision not null default 0,
+    total_km_m2 double precision not null default 0,
+    total_km_sketch jsonb not null default '{}',
+    cpk_mean double precision not null default 0,
+    cpk_m2 double precision not null default 0,
+    cpk_sketch jsonb not null default '{}',
+    updated_at timestamptz not null default now(),
+    primary key (tenant_id, marca, modelo)
+);
+
+-- Pneus ja contabilizados (garante que cada descarte entra uma vez)
+create table if not exists public.brand_benchmark_tires (
+    tire_id uuid primary key references public.tire_inventory (id) on delete cascade,
+    tenant_id uuid not null references public.tenants (id) on delete cascade,
+    applied_at timestamptz not null default now()
+);
+
+create index if not exists idx_brand_benchmark_tires_tenant
+    on public.brand_benchmark_tires (tenant_id);
+
+-- Pneus descartados do tenant ainda fora dos benchmarks
+-- (array, valor unico, para nao sofrer o limite de linhas do PostgREST)
+create or replace function public.tires_pending_benchmark(p_tenant_id uuid)
+returns uuid[]
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select coalesce(array_agg(t.id), '{}')
+    from tire_inventory t
+    where t.tenant_id = p_tenant_id
+      and t.status = 'descarte'
+      and not exists (select 1 from brand_benchmark_tires b where b.tire_id = t.id);
+$$;
+
+-- Soma de dois sketches de quantis: contadores somados bucket a bucket
+create or replace function public.merge_quantile_sketch(a jsonb, b jsonb)
+returns jsonb
+language sql
+immutable
+as $$
+    select case
+        when a is null or a = '{}'::jsonb then b
+        when b is null or b = '{}'::jsonb then a
+        else jsonb_build_object(
+            'relative_accuracy', a -> 'relative_accuracy',
+            'zero_count', coalesce((a ->> 'zero_count')::bigint, 0) + coalesce((b ->> 'zero_count')::bigint, 0),
+            'bins', coalesce((
+                select jsonb_object_agg(merged.key, merged.total)
+                from (
+                    select bins.key, sum(bins.value::bigint) as total
+                    from (
+                        select * from jsonb_each_text(a -> 'bins')
+                        union all
+                        select * from jsonb_each_text(b -> 'bins')
+                    ) bins
+                    group by bins.key
+                ) merged
+            ), '{}'::jsonb)
+        )
+    end;
+$$;
+
+-- Aplica os agregados parciais de um lote de pneus descartados em uma transacao.
+-- p_deltas: [{marca, modelo, tire_count, total_km_mean, total_km_m2, total_km_sketch,
+--             cpk_mean, cpk_m2, cpk_sketch}, ...]
+-- Media/M2 combinados pela formula paralela de Chan; falha se algum pneu ja foi
+-- contabilizado (execucao concorrente), sem aplicar nada.
+create or replace function public.apply_brand_benchmarks(
+    p_tenant_id uuid,
+    p_tire_ids uuid[],
+    p_deltas jsonb
+)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_inserted integer;
+begin
+    insert into brand_benchmark_tires (tire_id, tenant_id)
+    select tire_id, p_tenant_id
+    from unnest(p_tire_ids) as tire_id
+    on conflict (tire_id) do nothing;
+
+    get diagnostics v_inserted = row_count;
+    if v_inserted <> coalesce(cardinality(p_tire_ids), 0) then
+        raise exception 'apply_brand_benchmarks: pneus ja contabilizados para o tenant %', p_tenant_id;
+    end if;
+
+    insert into brand_benchmarks as b (
+        tenant_id, marca, modelo, tire_count,
+        total_km_mean, total_km_m2, total_km_sketch,
+        cpk_mean, cpk_m2, cpk_sketch, updated_at
+    )
+    select
+        p_tenant_id, d.marca, d.modelo, d.tire_count,
+        d.total_km_mean, d.total_km_m2, d.total_km_sketch,
+        d.cpk_mean, d.cpk_m2, d.cpk_sketch, now()
+    from jsonb_to_recordset(p_deltas) as d(
+        marca text, modelo text, tire_count bigint,
+        total_km_mean double precision, total_km_m2 double precision, total_km_sketch jsonb,
+        cpk_mean double precision, cpk_m2 double precision, cpk_sketch jsonb
+    )
+    where d.tire_count > 0
+    on conflict (tenant_id, marca, modelo) do update set
+        tire_count = b.tire_count + excluded.tire_count,
+        total_km_mean = b.total_km_mean
+            + (excluded.total_km_mean - b.total_km_mean) * excluded.tire_count / (b.tire_count + excluded.tire_count),
+        total_km_m2 = b.total_km_m2 + excluded.total_km_m2
+            + (excluded.total_km_mean - b.total_km_mean) ^ 2 * b.tire_count * excluded.tire_count / (b.tire_count + excluded.tire_count),
+        total_km_sketch = merge_quantile_sketch(b.total_km_sketch, excluded.total_km_sketch),
+        cpk_mean = b.cpk_mean
+            + (excluded.cpk_mean - b.cpk_mean) * excluded.tire_count / (b.tire_count + excluded.tire_count),
+        cpk_m2 = b.cpk_m2 + excluded.cpk_m2
+            + (excluded.cpk_mean - b.cpk_mean) ^ 2 * b.tire_count * excluded.tire_count / (b.tire_count + excluded.tire_count),
+        cpk_sketch = merge_quantile_sketch(b.cpk_sketch, excluded.cpk_sketch),
+        updated_at = now();
+
+    return v_inserted;
+end;
+$$;
+
+-- Somente o backend (service key) executa: a funcao e security definer e recebe
+-- o tenant do chamador; anon/authenticated nao podem chamar via PostgREST.
+revoke execute on function public.tires_pending_benchmark(uuid) from public, anon, authenticated;
+grant execute on function public.tires_pending_benchmark(uuid) to service_role;
+revoke execute on function public.apply_brand_benchmarks(uuid, uuid[], jsonb) from public, anon, authenticated;
+grant execute on function public.apply_brand_benchmarks(uuid, uuid[], jsonb) to service_role;
+
+-- Tabelas escritas e lidas apenas pelo backend (service key, que ignora RLS):
+-- RLS sem policies bloqueia anon/authenticated via PostgREST.
+alter table public.brand_benchmarks enable row level security;
+alter table public.brand_benchmark_tires enable row level security;
+revoke all on table public.brand_benchmarks from anon, authenticated;
+revoke all on table public.brand_benchmark_tires from anon, authenticated;
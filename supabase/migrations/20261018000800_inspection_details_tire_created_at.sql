@@ -0,0 +1,5 @@
+-- Ultima inspecao de um pneu sem filtro de tenant (fingerprint das metricas
+-- memoizadas em GET /api/v1/predictions/tires/{id}/metrics): index scan reverso.
+
+create index if not exists idx_inspection_details_tire_created_at
+    on public.inspection_details (tire_id, created_at);
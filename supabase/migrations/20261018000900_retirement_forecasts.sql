@@ -0,0 +1,18 @@
+-- Previsao de descartes/compras por mes (services/prediction/forecast.py), gravada
+-- pelo job tasks.update_retirement_forecast. Um documento por tenant:
+-- meses, totais e quebras por medida/marca/veiculo com o gasto projetado.
+
+create table if not exists public.retirement_forecasts (
+    tenant_id uuid primary key references public.tenants (id) on delete cascade,
+    start_month date not null,
+    horizon_months integer not null,
+    tire_count integer not null default 0,
+    projected_spend numeric not null default 0,
+    forecast jsonb not null,
+    generated_at timestamptz not null default now()
+);
+
+-- Tabela escrita e lida apenas pelo backend (service key, que ignora RLS):
+-- RLS sem policies bloqueia anon/authenticated via PostgREST.
+alter table public.retirement_forecasts enable row level security;
+revoke all on table public.retirement_forecasts from anon, authenticated;
@@ -0,0 +1,61 @@
+-- Gravacao transacional de uma inspecao completa (POST /api/v1/inspections).
+-- Substitui 2 + 2N chamadas HTTP por uma: cabecalho, hodometro do veiculo, todos os
+-- inspection_details em um INSERT e o sulco atual dos pneus em um UPDATE set-based.
+-- Falha em qualquer etapa desfaz a inspecao inteira.
+--
+-- p_inspection: linha de inspections (id, tenant_id, vehicle_id, inspector_id,
+--               km_hodometro, tipo, status)
+-- p_items: linhas de inspection_details; sulco_medio (calculado pela API) so e
+--          usado para atualizar tire_inventory.sulco_atual (a coluna e GENERATED)
+
+create or replace function public.create_inspection(p_inspection jsonb, p_items jsonb)
+returns uuid
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_inspection inspections;
+begin
+    v_inspection := jsonb_populate_record(null::inspections, p_inspection);
+
+    insert into inspections (id, tenant_id, vehicle_id, inspector_id, km_hodometro, tipo, status)
+    values (
+        v_inspection.id, v_inspection.tenant_id, v_inspection.vehicle_id, v_inspection.inspector_id,
+        v_inspection.km_hodometro, v_inspection.tipo, v_inspection.status
+    );
+
+    update vehicles
+    set km_atual = v_inspection.km_hodometro
+    where id = v_inspection.vehicle_id
+      and tenant_id = v_inspection.tenant_id;
+
+    insert into inspection_details (
+        id, tenant_id, inspection_id, tire_id, posicao_veiculo,
+        sulco_interno, sulco_central, sulco_externo,
+        pressao_atual, pressao_recomendada,
+        tem_avaria, descricao_avaria, checklist_avarias,
+        alerta_sulco, alerta_pressao, observacoes
+    )
+    select
+        d.id, v_inspection.tenant_id, v_inspection.id, d.tire_id, d.posicao_veiculo,
+        d.sulco_interno, d.sulco_central, d.sulco_externo,
+        d.pressao_atual, d.pressao_recomendada,
+        d.tem_avaria, d.descricao_avaria, d.checklist_avarias,
+        d.alerta_sulco, d.alerta_pressao, d.observacoes
+    from jsonb_populate_recordset(null::inspection_details, p_items) d;
+
+    update tire_inventory t
+    set sulco_atual = i.sulco_medio
+    from jsonb_to_recordset(p_items) as i(tire_id uuid, sulco_medio numeric)
+    where t.id = i.tire_id
+      and t.tenant_id = v_inspection.tenant_id;
+
+    return v_inspection.id;
+end;
+$$;
+
+-- Somente o backend (service key) executa: a funcao e security definer, grava em
+-- qualquer tenant (tenant_id vem do payload) e atualiza hodometro e sulco atual.
+revoke execute on function public.create_inspection(jsonb, jsonb) from public, anon, authenticated;
+grant execute on function public.create_inspection(jsonb, jsonb) to service_role;
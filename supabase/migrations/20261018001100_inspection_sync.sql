@@ -0,0 +1,120 @@
+-- Sincronizacao em lote do app offline (POST /api/v1/inspections/sync).
+-- Cada inspecao traz um client_id gerado no aparelho; reenvios (reconexao,
+-- timeout) sao reconhecidos por (tenant_id, client_id) e nao duplicam dados.
+
+alter table public.inspections
+    add column if not exists client_id text;
+
+create unique index if not exists idx_inspections_tenant_client_id
+    on public.inspections (tenant_id, client_id)
+    where client_id is not null;
+
+-- create_inspection passa a gravar o client_id (quando informado)
+create or replace function public.create_inspection(p_inspection jsonb, p_items jsonb)
+returns uuid
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_inspection inspections;
+begin
+    v_inspection := jsonb_populate_record(null::inspections, p_inspection);
+
+    insert into inspections (id, tenant_id, vehicle_id, inspector_id, km_hodometro, tipo, status, client_id)
+    values (
+        v_inspection.id, v_inspection.tenant_id, v_inspection.vehicle_id, v_inspection.inspector_id,
+        v_inspection.km_hodometro, v_inspection.tipo, v_inspection.status, v_inspection.client_id
+    );
+
+    update vehicles
+    set km_atual = v_inspection.km_hodometro
+    where id = v_inspection.vehicle_id
+      and tenant_id = v_inspection.tenant_id;
+
+    insert into inspection_details (
+        id, tenant_id, inspection_id, tire_id, posicao_veiculo,
+        sulco_interno, sulco_central, sulco_externo,
+        pressao_atual, pressao_recomendada,
+        tem_avaria, descricao_avaria, checklist_avarias,
+        alerta_sulco, alerta_pressao, observacoes
+    )
+    select
+        d.id, v_inspection.tenant_id, v_inspection.id, d.tire_id, d.posicao_veiculo,
+        d.sulco_interno, d.sulco_central, d.sulco_externo,
+        d.pressao_atual, d.pressao_recomendada,
+        d.tem_avaria, d.descricao_avaria, d.checklist_avarias,
+        d.alerta_sulco, d.alerta_pressao, d.observacoes
+    from jsonb_populate_recordset(null::inspection_details, p_items) d;
+
+    update tire_inventory t
+    set sulco_atual = i.sulco_medio
+    from jsonb_to_recordset(p_items) as i(tire_id uuid, sulco_medio numeric)
+    where t.id = i.tire_id
+      and t.tenant_id = v_inspection.tenant_id;
+
+    return v_inspection.id;
+end;
+$$;
+
+-- Grava um lote de inspecoes em uma chamada, com resultado por item.
+-- p_batch: [{client_id, inspection: {...}, items: [...]}, ...] (mesmo formato de create_inspection)
+-- status: 'created' | 'duplicate' (client_id ja sincronizado) | 'error' (so o item e desfeito)
+create or replace function public.sync_inspections(p_batch jsonb)
+returns table (client_id text, inspection_id uuid, status text, error text)
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_entry jsonb;
+    v_tenant_id uuid;
+begin
+    for v_entry in select value from jsonb_array_elements(p_batch) loop
+        client_id := v_entry ->> 'client_id';
+        v_tenant_id := null;
+        inspection_id := null;
+        error := null;
+
+        -- Cast do tenant e busca do duplicado tambem no bloco: entrada malformada
+        -- vira 'error' so nela, sem abortar o lote
+        begin
+            v_tenant_id := (v_entry -> 'inspection' ->> 'tenant_id')::uuid;
+
+            select i.id into inspection_id
+            from inspections i
+            where i.tenant_id = v_tenant_id and i.client_id = sync_inspections.client_id;
+
+            if found then
+                status := 'duplicate';
+            else
+                inspection_id := create_inspection(
+                    (v_entry -> 'inspection') || jsonb_build_object('client_id', client_id),
+                    v_entry -> 'items'
+                );
+                status := 'created';
+            end if;
+        exception
+            when unique_violation then
+                -- Outra requisicao gravou o mesmo client_id em paralelo
+                select i.id into inspection_id
+                from inspections i
+                where i.tenant_id = v_tenant_id and i.client_id = sync_inspections.client_id;
+                status := case when found then 'duplicate' else 'error' end;
+                error := case when found then null else sqlerrm end;
+            when others then
+                inspection_id := null;
+                status := 'error';
+                error := sqlerrm;
+        end;
+        return next;
+    end loop;
+end;
+$$;
+
+-- Somente o backend (service key) executa: funcoes security definer que gravam em
+-- qualquer tenant (tenant_id vem do payload).
+revoke execute on function public.create_inspection(jsonb, jsonb) from public, anon, authenticated;
+grant execute on function public.create_inspection(jsonb, jsonb) to service_role;
+revoke execute on function public.sync_inspections(jsonb) from public, anon, authenticated;
+grant execute on function public.sync_inspections(jsonb) to service_role;
@@ -0,0 +1,26 @@
+-- Analise de avaria assincrona (POST /api/v1/inspections/analyze-damage + task
+-- tasks.analyze_damage_photo). A linha de inspection_details e o job: o cliente
+-- consulta ai_status por polling ou assina as mudancas via Supabase Realtime.
+
+alter table public.inspection_details
+    add column if not exists ai_status text,
+    add column if not exists ai_analyzed_at timestamptz;
+
+-- Analises ainda em processamento (monitoramento / reprocessamento)
+create index if not exists idx_inspection_details_ai_pending
+    on public.inspection_details (created_at)
+    where ai_status = 'pendente';
+
+do $$
+begin
+    if exists (select 1 from pg_publication where pubname = 'supabase_realtime')
+       and not exists (
+           select 1 from pg_publication_tables
+           where pubname = 'supabase_realtime'
+             and schemaname = 'public'
+             and tablename = 'inspection_details'
+       ) then
+        alter publication supabase_realtime add table public.inspection_details;
+    end if;
+end;
+$$;
@@ -0,0 +1,5 @@
+-- Miniatura da foto de inspecao (gerada no pre-processamento do upload),
+-- usada em listagens no lugar da foto em resolucao de analise.
+
+alter table public.inspection_details
+    add column if not exists photo_thumbnail_url text;
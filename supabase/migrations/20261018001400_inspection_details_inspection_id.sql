@@ -0,0 +1,7 @@
+-- Itens de uma inspecao embutidos na consulta da inspecao
+-- (GET /api/v1/inspections/{id}): a FK inspection_id nao tinha indice.
+-- A linha do tempo do pneu (GET /api/v1/tires/{id}/timeline) le por faixa em
+-- idx_inspection_details_tire_created_at (tire_id, created_at).
+
+create index if not exists idx_inspection_details_inspection_id
+    on public.inspection_details (inspection_id);
@@ -0,0 +1,6 @@
+-- Exportacao de inspecoes (GET /api/v1/inspections/export): paginacao por keyset
+-- em (created_at, id) dentro do tenant, com filtro de periodo. Cada pagina e um
+-- range scan a partir do cursor, sem offset.
+
+create index if not exists idx_inspection_details_tenant_created_at_id
+    on public.inspection_details (tenant_id, created_at, id);
@@ -0,0 +1,86 @@
+-- Data real das inspecoes feitas offline (POST /api/v1/inspections/sync).
+-- O app envia inspected_at; a API grava como created_at da inspecao e dos itens,
+-- em vez da hora da sincronizacao (regressao de desgaste, rollups, linha do tempo
+-- e previsoes usam created_at).
+-- Uma inspecao mais antiga sincronizada depois de uma mais nova nao volta o
+-- hodometro do veiculo nem o sulco atual dos pneus.
+
+-- Ultima inspecao do veiculo (guarda do hodometro)
+create index if not exists idx_inspections_vehicle_created_at
+    on public.inspections (vehicle_id, created_at);
+
+create or replace function public.create_inspection(p_inspection jsonb, p_items jsonb)
+returns uuid
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_inspection inspections;
+    v_created_at timestamptz;
+begin
+    v_inspection := jsonb_populate_record(null::inspections, p_inspection);
+    -- Sem data informada: clock_timestamp (distinto por inspecao, inclusive no mesmo lote)
+    v_created_at := coalesce(v_inspection.created_at, clock_timestamp());
+
+    insert into inspections (id, tenant_id, vehicle_id, inspector_id, km_hodometro, tipo, status, client_id, created_at)
+    values (
+        v_inspection.id, v_inspection.tenant_id, v_inspection.vehicle_id, v_inspection.inspector_id,
+        v_inspection.km_hodometro, v_inspection.tipo, v_inspection.status, v_inspection.client_id, v_created_at
+    );
+
+    -- Hodometro so avanca com a inspecao mais recente do veiculo
+    update vehicles v
+    set km_atual = v_inspection.km_hodometro
+    where v.id = v_inspection.vehicle_id
+      and v.tenant_id = v_inspection.tenant_id
+      and not exists (
+          select 1 from inspections i
+          where i.vehicle_id = v_inspection.vehicle_id
+            and i.created_at > v_created_at
+      );
+
+    insert into inspection_details (
+        id, tenant_id, inspection_id, tire_id, posicao_veiculo,
+        sulco_interno, sulco_central, sulco_externo,
+        pressao_atual, pressao_recomendada,
+        tem_avaria, descricao_avaria, checklist_avarias,
+        alerta_sulco, alerta_pressao, observacoes, created_at
+    )
+    select
+        d.id, v_inspection.tenant_id, v_inspection.id, d.tire_id, d.posicao_veiculo,
+        d.sulco_interno, d.sulco_central, d.sulco_externo,
+        d.pressao_atual, d.pressao_recomendada,
+        d.tem_avaria, d.descricao_avaria, d.checklist_avarias,
+        d.alerta_sulco, d.alerta_pressao, d.observacoes, v_created_at
+    from jsonb_populate_recordset(null::inspection_details, p_items) d;
+
+    -- Sulco atual so com a medicao mais recente de cada pneu (registros so de
+    -- avaria, sem sulco, nao contam como medicao mais nova)
+    update tire_inventory t
+    set sulco_atual = i.sulco_medio
+    from jsonb_to_recordset(p_items) as i(tire_id uuid, sulco_medio numeric)
+    where t.id = i.tire_id
+      and t.tenant_id = v_inspection.tenant_id
+      and not exists (
+          select 1 from inspection_details d
+          where d.tire_id = i.tire_id
+            and d.created_at > v_created_at
+            and d.sulco_medio > 0
+      );
+
+    -- Medicao retroativa nao muda o max(created_at) do pneu: invalida o snapshot
+    -- para tires_pending_prediction recalcular
+    update tire_predictions p
+    set last_inspection_at = '-infinity'
+    from jsonb_to_recordset(p_items) as i(tire_id uuid)
+    where p.tire_id = i.tire_id
+      and p.last_inspection_at >= v_created_at;
+
+    return v_inspection.id;
+end;
+$$;
+
+-- create or replace mantem os privilegios; reafirmados aqui por clareza
+revoke execute on function public.create_inspection(jsonb, jsonb) from public, anon, authenticated;
+grant execute on function public.create_inspection(jsonb, jsonb) to service_role;
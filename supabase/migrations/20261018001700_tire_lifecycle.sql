@@ -0,0 +1,137 @@
+-- Lista de urgencia de troca (GET /api/v1/predictions/tire-lifecycle) incluindo
+-- pneus em uso sem snapshot de sucesso (sem snapshot ainda, ou aguardando_dados
+-- com uma unica inspecao). Ordem:
+--   1. urgency_date, tire_id: data prevista de troca (snapshots com sucesso);
+--      pneus sem previsao com sulco abaixo de p_min_tread contam como troca hoje;
+--   2. demais pneus sem previsao, por sulco_atual (nulos por ultimo), tire_id.
+--
+-- Paginacao por chave (sem offset): o cursor e a ultima linha da pagina
+-- (p_after_date = urgency_date, p_after_sulco = sulco_atual, p_after_id = tire_id);
+-- p_after_date nulo com p_after_id informado = cursor ja no trecho 2.
+-- Cada ramo le uma faixa ordenada de indice (idx_tire_predictions_tenant_urgency
+-- ou idx_tire_inventory_tenant_status_sulco) e para em p_limit linhas: o custo
+-- de uma pagina nao depende da profundidade.
+
+create index if not exists idx_tire_inventory_tenant_status_sulco
+    on public.tire_inventory (tenant_id, status, sulco_atual, id);
+
+create or replace function public.tire_lifecycle(
+    p_tenant_id uuid,
+    p_min_tread numeric,
+    p_limit integer default 10,
+    p_after_date date default null,
+    p_after_sulco numeric default null,
+    p_after_id uuid default null
+)
+returns table (
+    tire_id uuid,
+    numero_serie text,
+    marca text,
+    modelo text,
+    sulco_inicial numeric,
+    sulco_atual numeric,
+    expected_remaining_km numeric,
+    estimated_retirement_date date,
+    has_prediction boolean,
+    urgency_date date
+)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    -- Cursor no trecho 2 (sem data de troca): p_after_date nulo e p_after_id informado.
+    -- Sem cursor, os limites inferiores sao (-infinity, uuid nulo) e (p_min_tread, uuid nulo).
+    with unpredicted as not materialized (
+        -- Pneus em uso sem snapshot de sucesso
+        select t.*
+        from tire_inventory t
+        where t.tenant_id = p_tenant_id
+          and t.status = 'em_uso'
+          and t.sulco_inicial > 0
+          and not exists (
+              select 1 from tire_predictions p
+              where p.tire_id = t.id and p.status = 'sucesso'
+          )
+    ),
+    -- 1a. Snapshots com sucesso, na ordem do indice de urgencia
+    predicted as (
+        select
+            t.id, t.numero_serie, t.marca, t.modelo, t.sulco_inicial, t.sulco_atual,
+            p.expected_remaining_km, p.estimated_retirement_date, true as has_prediction,
+            p.estimated_retirement_date as urgency_date
+        from tire_predictions p
+        join tire_inventory t on t.id = p.tire_id
+        where not (p_after_id is not null and p_after_date is null)
+          and p.tenant_id = p_tenant_id
+          and p.status = 'sucesso'
+          and (p.estimated_retirement_date, p.tire_id) > (
+              coalesce(p_after_date, '-infinity'::date),
+              coalesce(p_after_id, '00000000-0000-0000-0000-000000000000'::uuid)
+          )
+          and t.status = 'em_uso'
+        order by p.estimated_retirement_date, p.tire_id
+        limit p_limit
+    ),
+    -- 1b. Sem previsao e abaixo do sulco minimo: troca hoje
+    worn as (
+        select
+            u.id, u.numero_serie, u.marca, u.modelo, u.sulco_inicial, u.sulco_atual,
+            null::numeric, null::date, false, current_date
+        from unpredicted u
+        where not (p_after_id is not null and p_after_date is null)
+          and u.sulco_atual < p_min_tread
+          and (current_date, u.id) > (
+              coalesce(p_after_date, '-infinity'::date),
+              coalesce(p_after_id, '00000000-0000-0000-0000-000000000000'::uuid)
+          )
+        order by u.id
+        limit p_limit
+    ),
+    -- 2a. Sem previsao, pelo sulco atual
+    by_tread as (
+        select
+            u.id, u.numero_serie, u.marca, u.modelo, u.sulco_inicial, u.sulco_atual,
+            null::numeric, null::date, false, null::date
+        from unpredicted u
+        where not (p_after_id is not null and p_after_date is null and p_after_sulco is null)
+          and (u.sulco_atual, u.id) > (
+              case when p_after_date is null and p_after_id is not null
+                   then p_after_sulco else p_min_tread end,
+              case when p_after_date is null and p_after_id is not null
+                   then p_after_id else '00000000-0000-0000-0000-000000000000'::uuid end
+          )
+        order by u.sulco_atual, u.id
+        limit p_limit
+    ),
+    -- 2b. Sem previsao e sem sulco medido
+    no_tread as (
+        select
+            u.id, u.numero_serie, u.marca, u.modelo, u.sulco_inicial, u.sulco_atual,
+            null::numeric, null::date, false, null::date
+        from unpredicted u
+        where u.sulco_atual is null
+          and u.id > case when p_after_date is null and p_after_sulco is null and p_after_id is not null
+                          then p_after_id else '00000000-0000-0000-0000-000000000000'::uuid end
+        order by u.id
+        limit p_limit
+    )
+    select
+        r.id, r.numero_serie::text, r.marca::text, r.modelo::text,
+        r.sulco_inicial::numeric, r.sulco_atual::numeric,
+        r.expected_remaining_km, r.estimated_retirement_date, r.has_prediction, r.urgency_date
+    from (
+        select * from predicted
+        union all select * from worn
+        union all select * from by_tread
+        union all select * from no_tread
+    ) r
+    order by
+        r.urgency_date nulls last,
+        case when r.urgency_date is null then r.sulco_atual end nulls last,
+        r.id
+    limit p_limit;
+$$;
+
+revoke execute on function public.tire_lifecycle(uuid, numeric, integer, date, numeric, uuid) from public, anon, authenticated;
+grant execute on function public.tire_lifecycle(uuid, numeric, integer, date, numeric, uuid) to service_role;